@@ -9,7 +9,7 @@ import pandas as pd
 from flask import request, send_file
 from flask_restx import Namespace, Resource, fields
 from services.crawler_service import CrawlerService
-from utils.jwt_utils import token_required, get_current_user_id
+from utils.jwt_utils import token_required, admin_required, get_current_user_id
 
 # 创建命名空间
 crawler_ns = Namespace('crawler', description='舆情爬虫相关接口')
@@ -20,7 +20,9 @@ crawl_request = crawler_ns.model('CrawlRequest', {
     'platform': fields.String(required=True, description='平台: xhs/zhihu'),
     'cookie': fields.String(description='知乎 Cookie（可选）'),
     'batch_size': fields.Integer(default=50, description='批次大小'),
-    'offset': fields.Integer(default=0, description='偏移量')
+    'offset': fields.Integer(default=0, description='偏移量'),
+    'concurrency': fields.Integer(default=1, description='知乎并发策略数（1 为串行）'),
+    'cursor_id': fields.String(description='知乎续爬游标 ID（上一批次返回）')
 })
 
 response_model = crawler_ns.model('Response', {
@@ -29,6 +31,21 @@ response_model = crawler_ns.model('Response', {
     'data': fields.Raw(description='数据')
 })
 
+crawl_response_model = crawler_ns.inherit('CrawlResponse', response_model, {
+    'cursor_id': fields.String(description='知乎续爬游标 ID，下一批次传回'),
+    'has_more': fields.Boolean(description='是否还有未爬完的搜索策略')
+})
+
+cookie_request = crawler_ns.model('CookieRequest', {
+    'cookie': fields.String(required=True, description='知乎 Cookie'),
+    'label': fields.String(description='备注名（可选）'),
+    'budget': fields.Integer(description='每个时间窗口最多请求次数（可选，0 表示不限）')
+})
+
+cookie_update_request = crawler_ns.model('CookieUpdateRequest', {
+    'enabled': fields.Boolean(required=True, description='是否启用')
+})
+
 history_model = crawler_ns.model('AnalysisHistory', {
     'id': fields.Integer(description='ID'),
     'keyword': fields.String(description='关键词'),
@@ -42,7 +59,7 @@ history_model = crawler_ns.model('AnalysisHistory', {
 class Crawl(Resource):
     @crawler_ns.doc('crawl', security='Bearer')
     @crawler_ns.expect(crawl_request)
-    @crawler_ns.marshal_with(response_model)
+    @crawler_ns.marshal_with(crawl_response_model)
     @token_required
     def post(self):
         """
@@ -58,6 +75,8 @@ class Crawl(Resource):
         cookie = data.get('cookie', '')
         batch_size = int(data.get('batch_size', 50))
         offset = int(data.get('offset', 0))
+        concurrency = int(data.get('concurrency', 1))
+        cursor_id = data.get('cursor_id')
         
         if not keyword:
             return {'code': 400, 'message': '请输入关键词', 'data': None}, 400
@@ -71,13 +90,17 @@ class Crawl(Resource):
             platform=platform,
             cookie=cookie,
             max_count=batch_size,
-            offset=offset
+            offset=offset,
+            concurrency=concurrency,
+            cursor_id=cursor_id
         )
         
         return {
             'code': 200,
             'message': f'本批次获取 {result["count"]} 条数据',
-            'data': result['data']
+            'data': result['data'],
+            'cursor_id': result['cursor_id'],
+            'has_more': result['has_more']
         }
 
 
@@ -168,3 +191,101 @@ class AnalysisHistory(Resource):
         
         history = CrawlerService.get_analysis_history(user_id, limit)
         return {'code': 200, 'message': 'success', 'data': history}
+
+
+@crawler_ns.route('/strategy_stats')
+class StrategyStats(Resource):
+    @crawler_ns.doc('get_strategy_stats', security='Bearer', params={'keyword': '关键词（不传返回全部关键词汇总）'})
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    def get(self):
+        """获取知乎各搜索策略的请求页数和新增条数"""
+        keyword = request.args.get('keyword')
+        data = CrawlerService.get_strategy_stats(keyword)
+        return {'code': 200, 'message': 'success', 'data': data}
+
+
+@crawler_ns.route('/proxy_stats')
+class ProxyStats(Resource):
+    @crawler_ns.doc('get_proxy_stats', security='Bearer')
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    def get(self):
+        """获取代理池中每个代理及每个来源的成功率和延迟"""
+        data = CrawlerService.get_proxy_stats()
+        return {'code': 200, 'message': 'success', 'data': data}
+
+
+@crawler_ns.route('/http_stats')
+class HttpStats(Resource):
+    @crawler_ns.doc('get_http_stats', security='Bearer')
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    def get(self):
+        """获取对外 HTTP 请求（OAuth、COS、代理API）按主机的延迟和错误统计"""
+        data = CrawlerService.get_http_stats()
+        return {'code': 200, 'message': 'success', 'data': data}
+
+
+@crawler_ns.route('/browser_stats')
+class BrowserStats(Resource):
+    @crawler_ns.doc('get_browser_stats', security='Bearer')
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    def get(self):
+        """获取小红书浏览器池中每个浏览器的使用次数和状态"""
+        data = CrawlerService.get_browser_stats()
+        return {'code': 200, 'message': 'success', 'data': data}
+
+
+@crawler_ns.route('/cookies')
+class Cookies(Resource):
+    @crawler_ns.doc('list_cookies', security='Bearer')
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    @admin_required
+    def get(self):
+        """获取知乎 Cookie 池中每个账号的预算使用和冷却状态（仅管理员）"""
+        data = CrawlerService.list_cookies()
+        return {'code': 200, 'message': 'success', 'data': data}
+    
+    @crawler_ns.doc('add_cookie', security='Bearer')
+    @crawler_ns.expect(cookie_request)
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    @admin_required
+    def post(self):
+        """向知乎 Cookie 池添加账号，爬取时未传 Cookie 则轮换使用池中账号（仅管理员）"""
+        data = request.json or {}
+        budget = data.get('budget')
+        try:
+            cookie_id = CrawlerService.add_cookie(data.get('cookie', ''), label=data.get('label'),
+                                                  budget=int(budget) if budget is not None else None)
+        except ValueError as e:
+            return {'code': 400, 'message': str(e), 'data': None}, 400
+        return {'code': 200, 'message': '添加成功', 'data': {'id': cookie_id}}
+
+
+@crawler_ns.route('/cookies/<string:cookie_id>')
+class CookieItem(Resource):
+    @crawler_ns.doc('update_cookie', security='Bearer')
+    @crawler_ns.expect(cookie_update_request)
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    @admin_required
+    def patch(self, cookie_id):
+        """启用/停用 Cookie（重新启用会清除登录失效标记）（仅管理员）"""
+        data = request.json or {}
+        if not CrawlerService.set_cookie_enabled(cookie_id, bool(data.get('enabled', True))):
+            return {'code': 404, 'message': 'Cookie 不存在', 'data': None}, 404
+        return {'code': 200, 'message': 'success', 'data': None}
+    
+    @crawler_ns.doc('delete_cookie', security='Bearer')
+    @crawler_ns.marshal_with(response_model)
+    @token_required
+    @admin_required
+    def delete(self, cookie_id):
+        """从 Cookie 池移除账号（仅管理员）"""
+        if not CrawlerService.remove_cookie(cookie_id):
+            return {'code': 404, 'message': 'Cookie 不存在', 'data': None}, 404
+        return {'code': 200, 'message': 'success', 'data': None}
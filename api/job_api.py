@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+爬取任务 API (Job API)
+后台执行爬虫：提交后立即返回任务 ID，前端轮询进度、分页读取结果，可随时取消
+"""
+import re
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from services.job_service import JobService, JOB_RESULT_LIMIT, JOB_MAX_COUNT, JOB_MAX_CONCURRENCY, JOB_MAX_WORKERS
+from utils.jwt_utils import token_required, get_current_user_id
+
+# 创建命名空间
+job_ns = Namespace('jobs', description='后台爬取任务接口')
+
+# 定义模型
+job_request = job_ns.model('JobRequest', {
+    'keyword': fields.String(description='搜索关键词（多个关键词用逗号分隔，或使用 keywords）'),
+    'keywords': fields.List(fields.String, description='关键词列表'),
+    'platform': fields.String(required=True, description='平台: xhs/zhihu'),
+    'batch_size': fields.Integer(default=50, description=f'每个关键词的最大爬取数量（1~{JOB_MAX_COUNT}）'),
+    'cookie': fields.String(description='知乎 Cookie（可选）'),
+    'concurrency': fields.Integer(description=f'知乎并发策略数（1~{JOB_MAX_CONCURRENCY}）'),
+    'with_details': fields.Boolean(default=False, description='知乎是否抓取完整正文和评论'),
+    'workers': fields.Integer(description=f'小红书多关键词时的工作进程数（1~{JOB_MAX_WORKERS}）')
+})
+
+response_model = job_ns.model('JobResponse', {
+    'code': fields.Integer(description='状态码'),
+    'message': fields.String(description='消息'),
+    'data': fields.Raw(description='数据')
+})
+
+
+def _parse_keywords(data):
+    keywords = data.get('keywords') or data.get('keyword') or []
+    if isinstance(keywords, str):
+        keywords = re.split(r'[,，]', keywords)
+    return list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+
+
+def _int_param(data, name, default, low, high):
+    """
+    读取整数参数，截断到 [low, high]；未传时返回 default
+    :raises ValueError: 不是整数
+    """
+    value = data.get(name)
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        raise ValueError(name)
+    try:
+        return max(low, min(int(value), high))
+    except (TypeError, ValueError):
+        raise ValueError(name)
+
+
+@job_ns.route('')
+class JobList(Resource):
+    @job_ns.doc('list_jobs', security='Bearer')
+    @job_ns.marshal_with(response_model)
+    @token_required
+    def get(self):
+        """获取当前用户最近的爬取任务"""
+        user_id = get_current_user_id()
+        return {'code': 200, 'message': 'success', 'data': JobService.list(user_id)}
+
+    @job_ns.doc('submit_job', security='Bearer')
+    @job_ns.expect(job_request)
+    @job_ns.marshal_with(response_model)
+    @token_required
+    def post(self):
+        """
+        提交爬取任务
+
+        立即返回任务（含 id），之后通过 /jobs/<id> 轮询进度，/jobs/<id>/result 读取结果
+        """
+        user_id = get_current_user_id()
+        data = request.json or {}
+
+        keywords = _parse_keywords(data)
+        platform = data.get('platform')
+        try:
+            max_count = _int_param(data, 'batch_size', 50, 1, JOB_MAX_COUNT)
+            concurrency = _int_param(data, 'concurrency', None, 1, JOB_MAX_CONCURRENCY)
+            workers = _int_param(data, 'workers', None, 1, JOB_MAX_WORKERS)
+        except ValueError as e:
+            return {'code': 400, 'message': f'参数 {e} 必须是整数', 'data': None}, 400
+
+        if not keywords:
+            return {'code': 400, 'message': '请输入关键词', 'data': None}, 400
+
+        if platform not in ['xhs', 'zhihu']:
+            return {'code': 400, 'message': '平台必须是 xhs 或 zhihu', 'data': None}, 400
+
+        job = JobService.submit(
+            user_id=user_id,
+            platform=platform,
+            keywords=keywords,
+            max_count=max_count,
+            cookie=data.get('cookie'),
+            concurrency=concurrency,
+            with_details=bool(data.get('with_details', False)),
+            workers=workers
+        )
+        if job is None:
+            return {'code': 429, 'message': '进行中的任务过多，请等待完成后再提交', 'data': None}, 429
+
+        return {'code': 200, 'message': '任务已提交', 'data': job}
+
+
+@job_ns.route('/<string:job_id>')
+class JobItem(Resource):
+    @job_ns.doc('get_job', security='Bearer')
+    @job_ns.marshal_with(response_model)
+    @token_required
+    def get(self, job_id):
+        """获取任务状态和进度（status、count、message、elapsed）"""
+        job = JobService.get(get_current_user_id(), job_id)
+        if job is None:
+            return {'code': 404, 'message': '任务不存在', 'data': None}, 404
+        return {'code': 200, 'message': 'success', 'data': job}
+
+
+@job_ns.route('/<string:job_id>/cancel')
+class JobCancel(Resource):
+    @job_ns.doc('cancel_job', security='Bearer')
+    @job_ns.marshal_with(response_model)
+    @token_required
+    def post(self, job_id):
+        """取消任务（当前条目完成后停止，已获取的结果保留）"""
+        job = JobService.cancel(get_current_user_id(), job_id)
+        if job is None:
+            return {'code': 404, 'message': '任务不存在', 'data': None}, 404
+        return {'code': 200, 'message': '任务已取消' if job['status'] == 'cancelled' else '任务已结束', 'data': job}
+
+
+@job_ns.route('/<string:job_id>/result')
+class JobResult(Resource):
+    @job_ns.doc('get_job_result', security='Bearer', params={
+        'offset': '起始条数（默认 0）',
+        'limit': f'读取条数（默认且最多 {JOB_RESULT_LIMIT}）'
+    })
+    @job_ns.marshal_with(response_model)
+    @token_required
+    def get(self, job_id):
+        """
+        分页读取任务结果
+
+        任务运行中时返回已获取的部分结果；用返回的 next_offset 继续读取
+        """
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', JOB_RESULT_LIMIT, type=int)
+        result = JobService.result(get_current_user_id(), job_id, offset=offset, limit=limit)
+        if result is None:
+            return {'code': 404, 'message': '任务不存在', 'data': None}, 404
+        return {'code': 200, 'message': f'获取 {len(result["items"])} 条数据', 'data': result}
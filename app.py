@@ -22,6 +22,7 @@ from sqlalchemy.orm import sessionmaker
 from utils.cos_uploader import upload_csv_to_cos, cos_client, BUCKET_NAME
 import requests
 import datetime
+from utils.http_client import http_client
 
 # 创建应用
 import io
@@ -58,6 +59,7 @@ from api.user_api import user_ns
 from api.crawler_api import crawler_ns
 from api.audit_api import audit_ns
 from api.watch_api import watch_ns
+from api.job_api import job_ns
 
 # 初始化 API 并注册命名空间
 # 注意：Api 已配置 prefix='/api'，所以 namespace 路径不需要再加 /api
@@ -67,6 +69,7 @@ api.add_namespace(user_ns, path='/user')
 api.add_namespace(crawler_ns, path='/crawler')
 api.add_namespace(audit_ns, path='/audit')
 api.add_namespace(watch_ns, path='/watch')
+api.add_namespace(job_ns, path='/jobs')
 
 # ==================== 头像静态文件路由 ====================
 import os
@@ -172,7 +175,7 @@ def gitee_callback():
     return redirect(f'/?token={jwt_token}&username={quote(user.username)}&avatar_url={quote(user.avatar_url or "")}&status={status}')
 
 # 全局数据存储
-from services.in_memory_store import GLOBAL_DATA, GLOBAL_CRAWL_INFO
+from services.in_memory_store import GLOBAL_DATA, GLOBAL_CRAWL_INFO, load_or_create_cursor, save_cursor
 
 @app.route('/api/download_template')
 def download_template():
@@ -190,11 +193,13 @@ def download_template():
     return send_file(buffer, as_attachment=True, download_name='data_template.csv', mimetype='text/csv')
 
 @app.route('/api/crawl_batch', methods=['POST'])
+@token_required
 def crawl_batch():
-    """分批爬取接口"""
+    """分批爬取接口（知乎游标按用户隔离）"""
     global GLOBAL_DATA, GLOBAL_CRAWL_INFO
     from spiders.xhs_spider import search_and_crawl_xhs
     from spiders.zhihu_spider import search_and_crawl_zhihu
+    from spiders.zhihu_detail import fetch_zhihu_details
     from utils.cleaner import clean_comments
 
     data = request.json
@@ -203,6 +208,9 @@ def crawl_batch():
     user_cookie = data.get('cookie')
     batch_size = int(data.get('batch_size', 50))
     offset = int(data.get('offset', 0))
+    concurrency = int(data.get('concurrency', 1))
+    cursor_id = data.get('cursor_id')
+    with_details = bool(data.get('with_details', False))
     
     if not keyword:
         return jsonify({"code": 400, "msg": "请输入关键词"})
@@ -211,18 +219,135 @@ def crawl_batch():
     if keyword not in GLOBAL_CRAWL_INFO['keywords']:
         GLOBAL_CRAWL_INFO['keywords'].append(keyword)
     
-    print(f"分批爬取: {platform} - {keyword} - 批次大小: {batch_size}, 偏移: {offset}")
+    print(f"分批爬取: {platform} - {keyword} - 批次大小: {batch_size}, 偏移: {offset}, 游标: {cursor_id}")
     
     raw_data = []
+    has_more = True
     if platform == 'xhs':
         raw_data = search_and_crawl_xhs(keyword, max_count=batch_size)
     elif platform == 'zhihu':
-        raw_data = search_and_crawl_zhihu(keyword, max_count=batch_size, cookie_str=user_cookie, offset=offset)
+        # 知乎按游标续爬：每批从上一批停下的策略和页继续
+        cursor = load_or_create_cursor(keyword, cursor_id, data.get('cursor'), offset,
+                                       user_id=get_current_user_id())
+        raw_data = search_and_crawl_zhihu(keyword, max_count=batch_size, cookie_str=user_cookie,
+                                          concurrency=concurrency, cursor=cursor)
+        if with_details:
+            # 第二阶段：抓取完整正文和评论，替换搜索摘要
+            raw_data = fetch_zhihu_details(raw_data, cookie_str=user_cookie)
+        cursor_id = save_cursor(cursor, cursor_id, user_id=get_current_user_id())
+        has_more = not cursor.done
     
     cleaned_data = clean_comments(raw_data)
     GLOBAL_DATA.extend(cleaned_data)
     
-    return jsonify({"code": 200, "msg": f"本批次获取 {len(cleaned_data)} 条数据", "data": cleaned_data})
+    return jsonify({"code": 200, "msg": f"本批次获取 {len(cleaned_data)} 条数据", "data": cleaned_data,
+                    "cursor_id": cursor_id, "has_more": has_more})
+
+
+@app.route('/api/crawl_multi', methods=['POST'])
+@token_required
+def crawl_multi():
+    """
+    多关键词分批爬取接口
+    知乎：所有关键词共用一个Session和速率预算，交错请求
+    小红书（platform=xhs）：关键词分给多个工作进程，各用一个浏览器并行爬取，结果全局去重
+    """
+    global GLOBAL_DATA, GLOBAL_CRAWL_INFO
+    from spiders.zhihu_spider import search_and_crawl_zhihu_multi
+    from spiders.xhs_runner import search_and_crawl_xhs_sharded
+    from utils.cleaner import clean_comments
+
+    data = request.json or {}
+    keywords = data.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = re.split(r'[,，]', keywords)
+    keywords = [k.strip() for k in keywords if k and k.strip()]
+    user_cookie = data.get('cookie')
+    batch_size = int(data.get('batch_size', 50))
+    concurrency = data.get('concurrency')
+    cursor_ids = data.get('cursor_ids') or {}
+    platform = data.get('platform', 'zhihu')
+
+    if not keywords:
+        return jsonify({"code": 400, "msg": "请输入关键词"})
+
+    GLOBAL_CRAWL_INFO['platform'] = platform
+    for keyword in keywords:
+        if keyword not in GLOBAL_CRAWL_INFO['keywords']:
+            GLOBAL_CRAWL_INFO['keywords'].append(keyword)
+
+    if platform == 'xhs':
+        workers = data.get('workers')
+        print(f"多关键词分片爬取: xhs - {keywords} - 每个关键词批次大小: {batch_size}, 工作进程: {workers}")
+        raw_data = search_and_crawl_xhs_sharded(keywords, max_count=batch_size,
+                                                workers=int(workers) if workers else None)
+        cleaned_data = clean_comments(raw_data)
+        GLOBAL_DATA.extend(cleaned_data)
+        return jsonify({"code": 200, "msg": f"本批次获取 {len(cleaned_data)} 条数据", "data": cleaned_data})
+
+    print(f"多关键词分批爬取: zhihu - {keywords} - 每个关键词批次大小: {batch_size}, 游标: {cursor_ids}")
+
+    user_id = get_current_user_id()
+    cursors = {k: load_or_create_cursor(k, cursor_ids.get(k), user_id=user_id) for k in keywords}
+    raw_data = search_and_crawl_zhihu_multi(keywords, max_count=batch_size, cookie_str=user_cookie,
+                                            concurrency=int(concurrency) if concurrency else None, cursors=cursors)
+    cursor_ids = {k: save_cursor(cursor, cursor_ids.get(k), user_id=user_id) for k, cursor in cursors.items()}
+    has_more = {k: not cursor.done for k, cursor in cursors.items()}
+
+    cleaned_data = clean_comments(raw_data)
+    GLOBAL_DATA.extend(cleaned_data)
+
+    return jsonify({"code": 200, "msg": f"本批次获取 {len(cleaned_data)} 条数据", "data": cleaned_data,
+                    "cursor_ids": cursor_ids, "has_more": has_more})
+
+
+@app.route('/api/crawl_stream', methods=['POST'])
+def crawl_stream():
+    """流式爬取接口（SSE）：爬虫每产出一条并清洗通过的数据立即推送给前端"""
+    from spiders.xhs_spider import iter_search_xhs
+    from spiders.zhihu_spider import iter_search_zhihu
+    from spiders.zhihu_detail import iter_fetch_zhihu_details
+    from utils.cleaner import iter_clean_comments
+
+    data = request.json or {}
+    keyword = data.get('keyword')
+    platform = data.get('platform')
+    user_cookie = data.get('cookie')
+    max_count = int(data.get('max_count', 50))
+    concurrency = int(data.get('concurrency', 1))
+    with_details = bool(data.get('with_details', False))
+
+    if not keyword:
+        return jsonify({"code": 400, "msg": "请输入关键词"})
+    if platform not in ('xhs', 'zhihu'):
+        return jsonify({"code": 400, "msg": "平台必须是 xhs 或 zhihu"})
+
+    GLOBAL_CRAWL_INFO['platform'] = platform
+    if keyword not in GLOBAL_CRAWL_INFO['keywords']:
+        GLOBAL_CRAWL_INFO['keywords'].append(keyword)
+
+    if platform == 'xhs':
+        raw_iter = iter_search_xhs(keyword, max_count=max_count)
+    else:
+        raw_iter = iter_search_zhihu(keyword, max_count=max_count, cookie_str=user_cookie, concurrency=concurrency)
+        if with_details:
+            # 边搜索边抓取完整正文和评论
+            raw_iter = iter_fetch_zhihu_details(raw_iter, cookie_str=user_cookie)
+
+    def generate():
+        count = 0
+        try:
+            for item in iter_clean_comments(raw_iter):
+                count += 1
+                GLOBAL_DATA.append(item)
+                yield f"data: {json.dumps({'status': 'item', 'index': count, 'item': item}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'status': 'complete', 'count': count, 'msg': f'爬取完成，共 {count} 条数据'}, ensure_ascii=False)}\n\n"
+        finally:
+            # 客户端断开时关闭爬虫生成器，释放浏览器/爬取线程
+            raw_iter.close()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/save_crawl_result', methods=['POST'])
@@ -394,7 +519,11 @@ def get_csv(csv_id):
         return {"code": 404, "msg": "记录不存在"}, 404
 
     cos_url = record.cleaned_data  # 或 final_data
-    resp = requests.get(cos_url)
+    try:
+        resp = http_client.get(cos_url)
+    except requests.RequestException as e:
+        print(f"[ERROR] COS文件获取失败: {e}")
+        return {"code": 504, "msg": "COS文件获取失败"}, 504
     if resp.status_code != 200:
         return {"code": 500, "msg": "COS文件获取失败"}, 500
 
@@ -418,6 +547,7 @@ def crawl():
     platform = data.get('platform')
     user_cookie = data.get('cookie')
     max_count = int(data.get('max_count', 5))
+    concurrency = int(data.get('concurrency', 1))
     
     if not keyword:
         return jsonify({"code": 400, "msg": "请输入关键词"})
@@ -426,7 +556,8 @@ def crawl():
     if platform == 'xhs':
         raw_data = search_and_crawl_xhs(keyword, max_count=max_count)
     elif platform == 'zhihu':
-        raw_data = search_and_crawl_zhihu(keyword, max_count=max_count, cookie_str=user_cookie)
+        raw_data = search_and_crawl_zhihu(keyword, max_count=max_count, cookie_str=user_cookie,
+                                          concurrency=concurrency)
     
     cleaned_data = clean_comments(raw_data)
     GLOBAL_DATA = cleaned_data
@@ -721,18 +852,29 @@ def clear_data():
     GLOBAL_CRAWL_INFO = {"platform": "", "keywords": []}
     return jsonify({"code": 200, "msg": "数据已清空"})
 
+def _payload_rows(data):
+    """
+    前端提交的当前表格数据 rows
+    后台任务的爬取结果只在前端表格和任务库中，不在 GLOBAL_DATA 里
+    :return: 字典列表；未提交时为空列表
+    """
+    rows = data.get('rows')
+    if not isinstance(rows, list):
+        return []
+    return [r for r in rows if isinstance(r, dict)]
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
-    """AI分析接口"""
-    global GLOBAL_DATA
+    """AI分析接口（分析请求体中的 rows）"""
     # from utils.ai_agent import analyze_sentiment_by_coze
-    
-    if not GLOBAL_DATA:
+    data = request.json or {}
+    rows = _payload_rows(data)
+    if not rows:
         return jsonify({"code": 400, "msg": "没有数据可分析"})
     
-    data = request.json or {}
     max_count = int(data.get('max_count', 0))
-    items_to_analyze = GLOBAL_DATA if max_count == 0 else GLOBAL_DATA[:max_count]
+    items_to_analyze = rows if max_count == 0 else rows[:max_count]
     
     for item in items_to_analyze:
         if 'ai_analysis' in item and item['ai_analysis']:
@@ -740,17 +882,16 @@ def analyze():
         full_text = f"标题：{item['title']}\n内容摘要：{item['content']}\n用户评论：{'; '.join(item['comments'])}"
         # item['ai_analysis'] = analyze_sentiment_by_coze(full_text)
     
-    return jsonify({"code": 200, "msg": f"分析完成", "data": GLOBAL_DATA})
+    return jsonify({"code": 200, "msg": f"分析完成", "data": rows})
 
 @app.route('/api/analyze_batch', methods=['POST'])
 def analyze_batch_sync():
-    """同步批量AI分析接口，每批50条，前端直接拿到 List[Dict]"""
-    global GLOBAL_DATA
-
-    if not GLOBAL_DATA:
+    """同步批量AI分析接口，每批50条，前端直接拿到 List[Dict]；分析请求体中的 rows（当前表格数据）"""
+    data = request.json or {}
+    rows = _payload_rows(data)
+    if not rows:
         return jsonify({"code": 400, "msg": "没有数据可分析"})
 
-    data = request.json or {}
     batch_size = int(data.get('batch_size', 50))
     max_count = int(data.get('max_count', 0))
     keyword = data.get('keyword', None)
@@ -759,7 +900,7 @@ def analyze_batch_sync():
     if not keyword or not str(keyword).strip():
         return jsonify({"code": 400, "msg": "前端必须提供非空的 keyword 参数以便进行 AI 分析"})
 
-    items = GLOBAL_DATA if max_count == 0 else GLOBAL_DATA[:max_count]
+    items = rows if max_count == 0 else rows[:max_count]
 
     # 将前端传入的 keyword 写入每条数据，供 CSV 生成使用
     for item in items:
@@ -1001,7 +1142,7 @@ def merge_csv_with_analysis():
 def generate_wordcloud_from_ai():
     """根据已有 AI 分析结果生成词云和情感统计。
     接受可选 JSON body: { "analysis": [ ... ] }
-    如果不提供，则使用 GLOBAL_DATA 中的 ai_analysis 字段。
+    也可以传 { "rows": [...] }（当前表格数据），从其中的 ai_analysis 字段提取。
     返回格式与其他分析接口一致。
     """
     try:
@@ -1014,11 +1155,10 @@ def generate_wordcloud_from_ai():
             analysis_list = payload.get('analyses')
         elif payload.get('rows') is not None:
             # 从 rows 中提取 ai_analysis
-            analysis_list = [r.get('ai_analysis') for r in payload.get('rows') if r.get('ai_analysis')]
+            analysis_list = [r.get('ai_analysis') for r in _payload_rows(payload) if r.get('ai_analysis')]
 
         if analysis_list is None:
-            # 从 GLOBAL_DATA 提取 ai_analysis
-            analysis_list = [item.get('ai_analysis') for item in GLOBAL_DATA if item.get('ai_analysis')]
+            return jsonify({"code": 400, "msg": "没有可用的 AI 分析结果，请提交 analyses 或 rows"})
 
         # 标准化每项为 dict
         parsed = []
@@ -1070,7 +1210,7 @@ def generate_wordcloud_from_ai():
 
 @app.route('/api/download_ai_analysis', methods=['GET', 'POST'])
 def download_ai_analysis():
-    """下载全局或传入的 AI 分析结果为 TXT（JSON 数组）。
+    """下载传入的 AI 分析结果为 TXT（JSON 数组）。
     可选 query 参数 `as` to name file.
     """
     try:
@@ -1079,9 +1219,8 @@ def download_ai_analysis():
         if request.method == 'POST' and request.is_json:
             body = request.get_json(silent=True) or {}
             analyses = body.get('analyses')
-
-        if analyses is None:
-            analyses = [item.get('ai_analysis') for item in GLOBAL_DATA if item.get('ai_analysis')]
+            if analyses is None:
+                analyses = [r.get('ai_analysis') for r in _payload_rows(body) if r.get('ai_analysis')]
 
         if not analyses:
             return jsonify({"code": 400, "msg": "没有可下载的 AI 分析结果"})
@@ -1934,6 +2073,9 @@ if __name__ == '__main__':
     with app.app_context():
         # 创建数据库表
         db.create_all()
+        # 上次运行时未结束的后台爬取任务标记为中断（只在启动时执行一次）
+        from services.job_service import JobService
+        JobService.recover()
         print("\n" + "=" * 50)
         print("[INFO] 数据库表初始化完成")
         print("[INFO] 登录页地址: http://localhost:5000/login")
@@ -3,7 +3,7 @@
 Gitee OAuth 认证蓝图
 处理第三方登录的授权和回调，使用 Session 存储用户状态
 """
-import requests
+from utils.http_client import http_client
 from flask import Blueprint, redirect, request, session
 from urllib.parse import urlencode, quote
 from models import db, User
@@ -52,7 +52,7 @@ def gitee_callback():
     
     try:
         # Step 1: 用 code 换取 access_token
-        token_response = requests.post(
+        token_response = http_client.post(
             GITEE_CONFIG['token_url'],
             data={
                 'grant_type': 'authorization_code',
@@ -72,7 +72,7 @@ def gitee_callback():
         access_token = token_data['access_token']
         
         # Step 2: 用 token 获取用户信息
-        user_response = requests.get(
+        user_response = http_client.get(
             GITEE_CONFIG['user_url'],
             params={'access_token': access_token}
         )
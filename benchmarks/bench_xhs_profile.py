@@ -0,0 +1,159 @@
+# benchmarks/bench_xhs_profile.py
+"""
+小红书轻量浏览器配置对比基准（需要联网和已登录的浏览器）
+分别用普通配置和轻量配置（无头、精简启动参数、拦截图片/视频/字体）打开同一批笔记详情页，
+比较每篇的加载时间（打开到正文渲染且网络空闲）、传输字节数（CDP Network.loadingFinished 的 encodedDataLength）、
+被拦截的请求数，并检查正文是否仍能读取
+
+用法：
+    python benchmarks/bench_xhs_profile.py --keyword AI问诊 --notes 10
+    python benchmarks/bench_xhs_profile.py --profiles light --slot 7
+两种配置使用槽位 --slot 的独立端口和用户数据目录（不占用正在运行的爬虫浏览器）；
+轻量配置的用户数据目录需要先登录一次：XHS_LIGHT_HEADLESS=0 python benchmarks/bench_xhs_profile.py --profiles light
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from itertools import islice
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spiders.browser_pool import default_browser_factory  # noqa: E402
+from spiders.smart_wait import wait_until, ele_present, network_idle  # noqa: E402
+from spiders import xhs_spider  # noqa: E402
+
+SEARCH_URL = "https://www.xiaohongshu.com/search_result?keyword={keyword}&source=web_search_result_notes"
+
+
+class TrafficMeter:
+    """通过 CDP 网络事件统计标签页的传输字节数和请求数"""
+
+    def __init__(self, page):
+        self.page = page
+        self.bytes = 0
+        self.requests = 0
+        self.blocked = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.page.run_cdp("Network.enable")
+        self.page.driver.set_callback("Network.loadingFinished", self._finished)
+        self.page.driver.set_callback("Network.loadingFailed", self._failed)
+
+    def stop(self):
+        self.page.driver.set_callback("Network.loadingFinished", None)
+        self.page.driver.set_callback("Network.loadingFailed", None)
+
+    def reset(self):
+        with self._lock:
+            self.bytes = self.requests = self.blocked = 0
+
+    def snapshot(self):
+        with self._lock:
+            return self.bytes, self.requests, self.blocked
+
+    def _finished(self, **params):
+        with self._lock:
+            self.bytes += int(params.get("encodedDataLength") or 0)
+            self.requests += 1
+
+    def _failed(self, **params):
+        with self._lock:
+            if params.get("blockedReason"):
+                self.blocked += 1
+
+
+def collect_links(page, keyword, count):
+    """打开搜索页，收集前 count 篇笔记的详情链接（带 xsec_token）"""
+    page.get(SEARCH_URL.format(keyword=quote(keyword)))
+    wait_until(ele_present(page, *xhs_spider._NOTE_CARD_SELECTORS), xhs_spider.WAIT_SEARCH_CEILING)
+    links = xhs_spider._iter_note_links(page, keyword, max_scroll=max(3, count // 5 + 2), incremental=False,
+                                        stop_on_seen_page=False)
+    return list(islice(links, count))
+
+
+def run_profile(name, lightweight, slot, keyword, count, links=None):
+    """用一种配置打开搜索页和每篇笔记，返回统计和本次使用的链接"""
+    started = time.monotonic()
+    page = default_browser_factory(slot, lightweight=lightweight)
+    launch = time.monotonic() - started
+    meter = TrafficMeter(page)
+    meter.start()
+    try:
+        started = time.monotonic()
+        found = collect_links(page, keyword, count)
+        search_seconds = time.monotonic() - started
+        search_bytes = meter.snapshot()[0]
+        links = links or found
+        if not links:
+            print(f"[WARN] {name}: 没有获取到笔记链接（可能需要登录）")
+
+        notes = []
+        for link in links:
+            meter.reset()
+            started = time.monotonic()
+            page.get(link["url"])
+            wait_until(ele_present(page, *xhs_spider._DETAIL_SELECTORS), xhs_spider.WAIT_DETAIL_CEILING)
+            wait_until(network_idle(page), xhs_spider.WAIT_DETAIL_CEILING)
+            seconds = time.monotonic() - started
+            size, requests, blocked = meter.snapshot()
+            content = xhs_spider._get_note_content(page)
+            notes.append({"seconds": seconds, "bytes": size, "requests": requests, "blocked": blocked,
+                          "content": bool(content)})
+            print(f"  [{name}] {link['id']}: {seconds:.2f}s {size / 1024:.0f}KB "
+                  f"请求 {requests} 拦截 {blocked} 正文{'有' if content else '无'}")
+    finally:
+        meter.stop()
+        page.quit()
+
+    n = len(notes) or 1
+    return {
+        "profile": name,
+        "launch": launch,
+        "search_seconds": search_seconds,
+        "search_kb": search_bytes / 1024,
+        "notes": len(notes),
+        "avg_seconds": sum(x["seconds"] for x in notes) / n,
+        "avg_kb": sum(x["bytes"] for x in notes) / n / 1024,
+        "avg_requests": sum(x["requests"] for x in notes) / n,
+        "avg_blocked": sum(x["blocked"] for x in notes) / n,
+        "content_ok": sum(x["content"] for x in notes),
+    }, links
+
+
+def main():
+    parser = argparse.ArgumentParser(description="小红书轻量浏览器配置对比")
+    parser.add_argument("--keyword", default="AI问诊")
+    parser.add_argument("--notes", type=int, default=5, help="打开的笔记数")
+    parser.add_argument("--profiles", default="full,light", help="逗号分隔：full（普通配置）、light（轻量配置）")
+    parser.add_argument("--slot", type=int, default=5, help="浏览器槽位，决定调试端口和用户数据目录")
+    args = parser.parse_args()
+
+    results = []
+    links = None
+    for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        if name not in ("full", "light"):
+            parser.error(f"未知配置: {name}")
+        print(f"[INFO] 配置 {name}")
+        # 第一种配置收集到的链接供后面的配置复用，保证打开的是同一批笔记
+        result, links = run_profile(name, name == "light", args.slot, args.keyword, args.notes, links)
+        results.append(result)
+
+    print()
+    print(f"{'配置':<6}{'启动s':>8}{'搜索页s':>9}{'搜索页KB':>10}{'笔记数':>7}{'每篇s':>8}{'每篇KB':>9}"
+          f"{'请求':>7}{'拦截':>7}{'正文':>7}")
+    for r in results:
+        print(f"{r['profile']:<6}{r['launch']:>8.2f}{r['search_seconds']:>9.2f}{r['search_kb']:>10.0f}"
+              f"{r['notes']:>7}{r['avg_seconds']:>8.2f}{r['avg_kb']:>9.0f}{r['avg_requests']:>7.1f}"
+              f"{r['avg_blocked']:>7.1f}{r['content_ok']:>5}/{r['notes']}")
+    if len(results) == 2 and results[0]["avg_kb"] and results[0]["avg_seconds"]:
+        full, light = results
+        print(f"\n[INFO] 轻量配置每篇传输量 {light['avg_kb'] / full['avg_kb']:.0%}，"
+              f"加载时间 {light['avg_seconds'] / full['avg_seconds']:.0%}（相对普通配置）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_zhihu_crawl.py
+"""
+知乎爬虫端到端基准（离线）
+在本地启动 zhihu_replay_server，把爬虫指向它，测量 抓取→解析→去重 流水线和速率控制器在不同账号数、并发下的表现
+速率按账号区分：账号数为 1 时传入单个 Cookie，大于 1 时使用由这些账号组成的 Cookie 池；并发数不超过账号数
+
+用法：
+    python benchmarks/bench_zhihu_crawl.py --items 300 --cookies 1,4 --concurrency 1,4 --latency-ms 80 --max-rps-per-cookie 5
+    python benchmarks/bench_zhihu_crawl.py --fixtures resource/fixtures/zhihu --keyword AI问诊
+不使用响应缓存，策略统计写到临时文件，不影响正式数据
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zhihu_replay_server import ReplayConfig, start_server, DEFAULT_FIXTURES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知乎爬虫离线基准")
+    parser.add_argument("--keyword", default="AI问诊")
+    parser.add_argument("--items", type=int, default=300, help="每轮爬取的条数")
+    parser.add_argument("--cookies", default="1,4", help="逗号分隔的账号数列表")
+    parser.add_argument("--concurrency", default="1,4", help="逗号分隔的并发数列表")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--max-rps-per-cookie", type=float, default=5.0, help="服务器对每个账号的每秒请求数上限")
+    parser.add_argument("--rate", type=float, default=3.0, help="速率控制器初始速率（次/秒）")
+    parser.add_argument("--max-rate", type=float, default=4.0, help="速率控制器上限（次/秒）")
+    parser.add_argument("--quiet", action="store_true", help="不输出爬虫日志")
+    args = parser.parse_args()
+
+    config = ReplayConfig(args.fixtures, args.latency_ms, args.jitter_ms, args.throttle_rate, args.max_rps,
+                          max_rps_per_cookie=args.max_rps_per_cookie)
+    server, backend = start_server(config)
+    # 爬虫在导入时读取 ZHIHU_API_BASE
+    os.environ["ZHIHU_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+
+    from spiders import zhihu_spider
+    from spiders.cookie_pool import CookiePool
+    from spiders.rate_controller import AIMDRateController
+    from spiders.strategy_stats import StrategyStats
+
+    zhihu_spider.CACHE_ENABLED = False
+    zhihu_spider.strategy_stats = StrategyStats(os.path.join(tempfile.mkdtemp(), "stats.json"))
+    rate_options = dict(initial_rate=args.rate, min_rate=0.5, max_rate=args.max_rate, increase_step=0.5)
+
+    results = []
+    for accounts in [int(c) for c in args.cookies.split(",") if c.strip()]:
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+            before = backend.stats()
+            stdout = sys.stdout
+            if args.quiet:
+                sys.stdout = open(os.devnull, "w")
+            try:
+                # 每轮使用新的速率控制器/Cookie 池，互不影响
+                rate = None
+                cookie_str = None
+                if accounts <= 1:
+                    rate = AIMDRateController(name="bench", **rate_options)
+                    cookie_str = "bench" * 4
+                else:
+                    zhihu_spider.cookie_pool = CookiePool([f"bench_account_{i:02d}=" + "x" * 16
+                                                           for i in range(accounts)],
+                                                          budget=0, rate_options=rate_options)
+                start = time.perf_counter()
+                rows = zhihu_spider.search_and_crawl_zhihu(args.keyword, max_count=args.items, cookie_str=cookie_str,
+                                                           concurrency=concurrency, rate=rate, adaptive=False)
+                elapsed = time.perf_counter() - start
+            finally:
+                if args.quiet:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+            after = backend.stats()
+            if rate is not None:
+                final_rate, wait = rate.stats()["rate"], rate.stats()["total_wait_seconds"]
+            else:
+                cookies = zhihu_spider.cookie_pool.stats()["cookies"]
+                final_rate = sum(c["rate"] for c in cookies)
+                wait = sum(c["wait_seconds"] for c in cookies)
+            results.append({
+                "accounts": accounts,
+                "concurrency": concurrency,
+                "items": len(rows),
+                "seconds": elapsed,
+                "requests": after["requests"] - before["requests"],
+                "throttled": after["throttled"] - before["throttled"],
+                "final_rate": final_rate,
+                "wait": wait,
+            })
+
+    server.shutdown()
+    print(f"\n[BENCH] 关键词={args.keyword} 延迟={args.latency_ms}ms 429概率={args.throttle_rate} "
+          f"上限={args.max_rps or '-'}rps 每账号上限={args.max_rps_per_cookie or '-'}rps")
+    print(f"{'账号':>4} {'并发':>4} {'条数':>6} {'耗时(s)':>8} {'条/秒':>8} {'请求':>6} {'429':>5} {'等待(s)':>8} {'最终速率':>8}")
+    for r in results:
+        print(f"{r['accounts']:>4} {r['concurrency']:>4} {r['items']:>6} {r['seconds']:>8.2f} "
+              f"{r['items'] / r['seconds']:>8.1f} {r['requests']:>6} {r['throttled']:>5} {r['wait']:>8.1f} "
+              f"{r['final_rate']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
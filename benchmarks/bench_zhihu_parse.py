@@ -0,0 +1,196 @@
+# benchmarks/bench_zhihu_parse.py
+"""
+知乎 search_v3 解析微基准
+对比旧实现（r.json() + 逐字段 get 链 + str.replace + datetime.fromtimestamp + urljoin）
+与当前实现（orjson（如已安装）+ 预编译正则 + 字段投影 + 常见相对URL直接拼接）的吞吐量，并校验两者输出一致
+两种实现交替运行 repeat 轮（计时期间关闭 GC），报告中位数和最快/最慢，减少单次运行的噪声
+
+用法：
+    python benchmarks/bench_zhihu_parse.py [--items 20000] [--fixtures resource/fixtures/zhihu] [--repeat 9]
+fixtures 目录下的 *.json 为录制的 search_v3 原始响应；目录不存在时使用合成数据
+"""
+import gc
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spiders import zhihu_spider  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "resource", "fixtures", "zhihu")
+
+
+def _legacy_full_url(href):
+    if not href:
+        return ""
+    if href.startswith("http"):
+        return href
+    return urljoin("https://www.zhihu.com", href)
+
+
+def legacy_parse_search_json(data):
+    """优化前的 _parse_search_json，作为基准"""
+    rows = []
+    if not data or "data" not in data:
+        return rows
+    for obj in data.get("data", []):
+        try:
+            o = obj.get("object") or obj
+            weibo_id = o.get("id") or o.get("objectId") or ""
+            url = o.get("url") or o.get("target_url") or o.get("share_url") or ""
+            if not url and weibo_id:
+                url = f"https://www.zhihu.com/question/{weibo_id}"
+            title = o.get("title") or o.get("question", {}).get("name") or ""
+            title = title.replace("<em>", "").replace("</em>", "")
+            excerpt = o.get("excerpt") or o.get("abstract") or ""
+            excerpt = excerpt.replace("<em>", "").replace("</em>", "")
+            author_name = ""
+            author_home = ""
+            if "author" in o and isinstance(o.get("author"), dict):
+                author = o.get("author")
+                author_name = author.get("name") or author.get("member", {}).get("name", "")
+                author_home = _legacy_full_url(author.get("url") or author.get("member", {}).get("url", ""))
+            if not author_name and "member" in o and isinstance(o.get("member"), dict):
+                m = o.get("member")
+                author_name = m.get("name") or ""
+                author_home = _legacy_full_url(m.get("url") or "")
+            publish_time = ""
+            if o.get("created_time"):
+                try:
+                    ts = int(o.get("created_time"))
+                    publish_time = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+                except:
+                    publish_time = str(o.get("created_time"))
+            elif o.get("published_time"):
+                publish_time = str(o.get("published_time"))
+            likes = str(o.get("voteup_count", "") or o.get("likes_count", "") or "")
+            comments_count = str(o.get("comment_count", "") or o.get("comments_count", "") or "")
+            rows.append({
+                "id": weibo_id, "url": _legacy_full_url(url), "title": title, "content": excerpt,
+                "author_name": author_name, "author_home": author_home, "publish_time": publish_time,
+                "likes": likes, "comments_count": comments_count,
+            })
+        except Exception:
+            continue
+    return rows
+
+
+def _synthetic_item(rnd, i):
+    """构造一条与 search_v3 结构相近的条目（含未使用的大字段，模拟真实负载）"""
+    obj = {
+        "id": str(10 ** 9 + i),
+        "type": rnd.choice(["answer", "article"]),
+        "url": f"https://api.zhihu.com/answers/{10 ** 9 + i}",
+        "excerpt": "关于<em>AI问诊</em>的讨论，" + "内容片段" * rnd.randint(10, 40),
+        "created_time": 1600000000 + rnd.randint(0, 10 ** 8),
+        "voteup_count": rnd.randint(0, 5000),
+        "comment_count": rnd.randint(0, 300),
+        "author": {"name": f"用户{i}", "url": f"/people/u{i}", "avatar_url": "https://pic.zhimg.com/" + "a" * 40,
+                   "headline": "简介" * 20, "badge": [], "gender": 1},
+        "question": {"id": str(i), "name": f"<em>AI问诊</em>靠谱吗？{i}", "type": "question"},
+        "thumbnail_info": {"count": 1, "thumbnails": [{"url": "https://pic.zhimg.com/" + "b" * 60}]},
+        "relationship": {"is_author": False, "voting": 0},
+    }
+    if i % 3 == 0:
+        obj["title"] = f"<em>AI</em>医疗文章 {i}"
+    return {"type": "search_result", "highlight": {"title": "", "description": ""}, "object": obj}
+
+
+def load_payloads(fixtures_dir, items):
+    """读取录制的响应并重复到至少 items 条；没有录制数据时生成合成数据"""
+    raw_pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "**", "*.json"), recursive=True)):
+        with open(path, "rb") as f:
+            body = f.read()
+        try:
+            data = json.loads(body)
+        except ValueError:
+            continue
+        # 录制文件可能是 {"url":..., "body": {...}} 包装格式
+        if isinstance(data, dict) and "body" in data and isinstance(data["body"], dict):
+            body = json.dumps(data["body"], ensure_ascii=False).encode("utf-8")
+            data = data["body"]
+        if isinstance(data, dict) and data.get("data"):
+            raw_pages.append((body, len(data["data"])))
+    source = f"录制数据 {len(raw_pages)} 页" if raw_pages else "合成数据"
+    if not raw_pages:
+        rnd = random.Random(42)
+        for start in range(0, items, 20):
+            page = {"data": [_synthetic_item(rnd, start + k) for k in range(20)],
+                    "paging": {"is_end": False, "next": ""}}
+            raw_pages.append((json.dumps(page, ensure_ascii=False).encode("utf-8"), 20))
+    pages = []
+    total = 0
+    while total < items:
+        for body, count in raw_pages:
+            pages.append(body)
+            total += count
+            if total >= items:
+                break
+    return pages, total, source
+
+
+def run_once(pages, loads, parse):
+    """解码并解析全部页面一次，返回 (耗时, 条数)；计时期间关闭 GC"""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        count = 0
+        for body in pages:
+            count += len(parse(loads(body)))
+        return time.perf_counter() - start, count
+    finally:
+        gc.enable()
+
+
+def report(name, timings, count):
+    median = statistics.median(timings)
+    print(f"{name:<10} {count:>8} 条  中位数 {median * 1000:>8.1f} ms  "
+          f"(最快 {min(timings) * 1000:.1f} / 最慢 {max(timings) * 1000:.1f})  {count / median:>12,.0f} 条/秒")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知乎 search_v3 解析微基准")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    pages, total, source = load_payloads(args.fixtures, args.items)
+    print(f"[BENCH] {source}, {len(pages)} 页, {total} 条, JSON解码器: {zhihu_spider._json_loads.__module__}")
+
+    # 校验输出一致
+    for body in pages[:50]:
+        assert legacy_parse_search_json(json.loads(body)) == zhihu_spider._parse_search_json(
+            zhihu_spider._json_loads(body)), "新旧解析结果不一致"
+
+    # 预热一轮，之后交替运行，两种实现受到相同的机器负载波动
+    run_once(pages, json.loads, legacy_parse_search_json)
+    run_once(pages, zhihu_spider._json_loads, zhihu_spider._parse_search_json)
+    timings = {"legacy": [], "current": []}
+    ratios = []
+    for _ in range(max(1, args.repeat)):
+        legacy, count = run_once(pages, json.loads, legacy_parse_search_json)
+        current, _ = run_once(pages, zhihu_spider._json_loads, zhihu_spider._parse_search_json)
+        timings["legacy"].append(legacy)
+        timings["current"].append(current)
+        ratios.append(legacy / current)
+
+    legacy = report("legacy", timings["legacy"], count)
+    current = report("current", timings["current"], count)
+    print(f"[BENCH] 加速比（中位数）: {legacy / current:.2f}x，逐轮加速比 {min(ratios):.2f}x ~ {max(ratios):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
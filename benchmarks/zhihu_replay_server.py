@@ -0,0 +1,305 @@
+# benchmarks/zhihu_replay_server.py
+"""
+本地知乎API替身服务器：回放录制的 search_v3 响应，用于离线、可重复地测试爬虫吞吐和速率控制
+
+- 回放：读取 fixture 目录（spiders.http_fixtures 的格式，设置 ZHIHU_RECORD_DIR 运行一次爬虫即可录制）；
+  同一查询（忽略 offset/limit）的多页录制数据会拼接后按请求的 offset/limit 重新分页
+- 没有录制数据的查询按关键词和策略生成确定性的合成数据，不同策略之间有部分重复，便于测试去重
+- 可配置响应延迟、随机 429、每秒请求数上限（总上限和按 Cookie 的上限，超出返回 429）
+- 另外提供回答详情和评论分页接口（合成数据），供 spiders/zhihu_detail.py 使用
+- GET /__stats 返回请求计数
+
+用法：
+    python benchmarks/zhihu_replay_server.py --port 8765 --latency-ms 80 --throttle-rate 0.02 --max-rps 5
+    ZHIHU_API_BASE=http://127.0.0.1:8765 python your_script.py
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spiders.http_fixtures import load_fixtures  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "resource", "fixtures", "zhihu")
+
+_ANSWER_RE = re.compile(r"^/api/v4/(answer|article)s/(\d+)$")
+_COMMENTS_RE = re.compile(r"^/api/v4/(answer|article)s/(\d+)/root_comments$")
+
+
+class ReplayConfig:
+    def __init__(self, fixtures_dir=DEFAULT_FIXTURES, latency_ms=0.0, jitter_ms=0.0, throttle_rate=0.0,
+                 max_rps=0.0, synthetic_items=200, pool_size=600, comments_per_item=45, seed=42,
+                 max_rps_per_cookie=0.0):
+        """
+        :param fixtures_dir: 录制数据目录，不存在时全部使用合成数据
+        :param latency_ms: 每个响应的基础延迟（毫秒）
+        :param jitter_ms: 延迟的随机抖动（毫秒）
+        :param throttle_rate: 随机返回 429 的概率
+        :param max_rps: 每秒请求数上限，超出返回 429；0 表示不限
+        :param synthetic_items: 合成数据每个策略的结果条数
+        :param pool_size: 合成数据每个关键词的不同条目数（越小策略之间重复越多）
+        :param comments_per_item: 合成回答的评论数
+        :param max_rps_per_cookie: 每个 Cookie（账号）每秒请求数上限，超出返回 429；0 表示不限
+        """
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.synthetic_items = synthetic_items
+        self.pool_size = pool_size
+        self.comments_per_item = comments_per_item
+        self.seed = seed
+        self.max_rps_per_cookie = max_rps_per_cookie
+
+
+class ReplayBackend:
+    """回放数据、限流和计数（线程安全）"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rnd = random.Random(config.seed)
+        self.exact = {}
+        self.queries = {}
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "not_found": 0, "replayed": 0, "synthetic": 0}
+        self._window = []
+        self._cookie_windows = {}
+        self._lock = threading.Lock()
+        self._load(config.fixtures_dir)
+
+    def _load(self, directory):
+        if not directory or not os.path.isdir(directory):
+            return
+        pages = {}
+        for url, body in load_fixtures(directory).items():
+            parts = urlsplit(url)
+            self.exact[parts.path + "?" + parts.query] = body
+            if not parts.path.endswith("/search_v3") or not isinstance(body, dict):
+                continue
+            params = dict(parse_qsl(parts.query, keep_blank_values=True))
+            offset = int(params.get("offset", 0) or 0)
+            pages.setdefault(self._query_key(params), []).append((offset, body))
+        # 同一查询的多页拼成完整结果列表，按请求的 offset/limit 重新分页
+        for key, items in pages.items():
+            items.sort(key=lambda x: x[0])
+            data = []
+            for offset, body in items:
+                data[offset:offset + len(body.get("data") or [])] = body.get("data") or []
+            is_end = bool((items[-1][1].get("paging") or {}).get("is_end"))
+            self.queries[key] = (data, is_end)
+        print(f"[REPLAY] 载入 {len(self.exact)} 个录制响应, {len(self.queries)} 个搜索查询")
+
+    @staticmethod
+    def _query_key(params):
+        return tuple(sorted((k, v) for k, v in params.items() if k not in ("offset", "limit")))
+
+    # ---------------- 限流 ----------------
+
+    def admit(self, cookie=""):
+        """返回 True 表示放行，False 表示返回 429"""
+        with self._lock:
+            self.counts["requests"] += 1
+            now = time.monotonic()
+            if self.config.max_rps:
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.config.max_rps:
+                    self.counts["throttled"] += 1
+                    return False
+                self._window.append(now)
+            if self.config.max_rps_per_cookie:
+                window = [t for t in self._cookie_windows.get(cookie, []) if now - t < 1.0]
+                if len(window) >= self.config.max_rps_per_cookie:
+                    self._cookie_windows[cookie] = window
+                    self.counts["throttled"] += 1
+                    return False
+                window.append(now)
+                self._cookie_windows[cookie] = window
+            if self.config.throttle_rate and self.rnd.random() < self.config.throttle_rate:
+                self.counts["throttled"] += 1
+                return False
+            return True
+
+    def delay(self):
+        cfg = self.config
+        if cfg.latency_ms or cfg.jitter_ms:
+            with self._lock:
+                jitter = self.rnd.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+            time.sleep(max(0.0, cfg.latency_ms + jitter) / 1000.0)
+
+    # ---------------- 响应 ----------------
+
+    def respond(self, path, query):
+        """返回 (状态码, 响应JSON)"""
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        if path.endswith("/search_v3"):
+            return 200, self._search(params)
+        # 与 normalize_url 相同的参数排序方式
+        body = self.exact.get(path + "?" + urlencode(sorted(parse_qsl(query, keep_blank_values=True))))
+        if body is not None:
+            self._count("replayed")
+            return 200, body
+        match = _COMMENTS_RE.match(path)
+        if match:
+            return 200, self._comments(match.group(2), params)
+        match = _ANSWER_RE.match(path)
+        if match:
+            return 200, self._answer(match.group(1), match.group(2))
+        self._count("not_found")
+        return 404, {"error": {"message": "not found"}}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _search(self, params):
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 20) or 20)
+        recorded = self.queries.get(self._query_key(params))
+        if recorded is not None:
+            self._count("replayed")
+            data, is_end = recorded
+            page = data[offset:offset + limit]
+            return {"data": page, "paging": {"is_end": is_end and offset + limit >= len(data), "totals": len(data)}}
+        self._count("synthetic")
+        total = self.config.synthetic_items
+        page = [self._synthetic_item(params, i) for i in range(offset, min(offset + limit, total))]
+        return {"data": page, "paging": {"is_end": offset + limit >= total, "totals": total}}
+
+    def _synthetic_item(self, params, i):
+        q = params.get("q", "")
+        strategy = "|".join(params.get(k, "") for k in ("t", "time_interval", "sort"))
+        pool = self.config.pool_size
+        start = zlib.crc32(strategy.encode("utf-8")) % pool
+        item_id = zlib.crc32(q.encode("utf-8")) % 10 ** 6 * 10 ** 4 + (start + i * 7) % pool
+        rnd = random.Random(item_id)
+        return {
+            "type": "search_result",
+            "object": {
+                "id": str(item_id),
+                "type": "answer",
+                "url": f"https://api.zhihu.com/answers/{item_id}",
+                "excerpt": f"关于<em>{q}</em>的回答 {item_id}，" + "".join(
+                    chr(0x4e00 + rnd.randint(0, 3000)) for _ in range(rnd.randint(40, 120))),
+                "created_time": 1600000000 + item_id % 10 ** 8,
+                "voteup_count": rnd.randint(0, 5000),
+                "comment_count": self.config.comments_per_item,
+                "author": {"name": f"用户{item_id % 997}", "url": f"/people/u{item_id % 997}"},
+                "question": {"id": str(item_id // 3), "name": f"<em>{q}</em>相关问题 {item_id // 3}"},
+            },
+        }
+
+    def _answer(self, kind, object_id):
+        self._count("synthetic")
+        rnd = random.Random(int(object_id))
+        paragraphs = ["".join(chr(0x4e00 + rnd.randint(0, 3000)) for _ in range(rnd.randint(60, 200)))
+                      for _ in range(rnd.randint(2, 6))]
+        return {
+            "id": object_id,
+            "title": f"文章 {object_id}" if kind == "article" else "",
+            "content": "".join(f"<p>{p}</p>" for p in paragraphs),
+            "voteup_count": rnd.randint(0, 5000),
+            "author": {"name": f"用户{int(object_id) % 997}"},
+            "question": {"id": str(int(object_id) // 3), "title": f"问题 {int(object_id) // 3}"},
+        }
+
+    def _comments(self, object_id, params):
+        self._count("synthetic")
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 20) or 20)
+        total = self.config.comments_per_item
+        data = []
+        for i in range(offset, min(offset + limit, total)):
+            rnd = random.Random(int(object_id) * 1000 + i)
+            data.append({
+                "id": f"{object_id}{i}",
+                "content": "".join(chr(0x4e00 + rnd.randint(0, 3000)) for _ in range(rnd.randint(8, 60))),
+                "child_comments": [],
+            })
+        return {"data": data, "paging": {"is_end": offset + limit >= total, "totals": total}}
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+def _make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/__stats":
+                return self._send(200, backend.stats())
+            if not backend.admit(self.headers.get("Cookie", "")):
+                backend.delay()
+                return self._send(429, {"error": {"code": 429, "message": "too many requests"}})
+            backend.delay()
+            status, body = backend.respond(parts.path, parts.query)
+            if status == 200:
+                backend._count("ok")
+            self._send(status, body)
+
+        def _send(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """
+    在后台线程启动回放服务器
+    :return: (server, backend)，server.server_port 为实际端口，用完调用 server.shutdown()
+    """
+    backend = ReplayBackend(config or ReplayConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="zhihu-replay", daemon=True).start()
+    return server, backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地知乎API回放服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--max-rps-per-cookie", type=float, default=0.0)
+    parser.add_argument("--synthetic-items", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=600)
+    args = parser.parse_args()
+
+    config = ReplayConfig(args.fixtures, args.latency_ms, args.jitter_ms, args.throttle_rate, args.max_rps,
+                          args.synthetic_items, args.pool_size, max_rps_per_cookie=args.max_rps_per_cookie)
+    server, backend = start_server(config, args.host, args.port)
+    print(f"[REPLAY] 监听 http://{args.host}:{server.server_port}  (ZHIHU_API_BASE=http://{args.host}:{server.server_port})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[REPLAY] {backend.stats()}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
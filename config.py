@@ -34,6 +34,9 @@ class Config:
     AVATAR_ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     AVATAR_MAX_SIZE = 2 * 1024 * 1024  # 2MB
 
+    # 管理员用户 ID（逗号分隔），可以管理知乎 Cookie 池等所有用户共用的资源
+    ADMIN_USER_IDS = {i.strip() for i in os.environ.get('ADMIN_USER_IDS', '').split(',') if i.strip()}
+
     COZE_API_TOKEN = 'pat_VImIWmkJP7ggaday9BY9AOorq0FAUYvRATsQdf7tEFD7xJFdB5gIiMoz8jRMyMkn'
     WORKFLOW_ID = '7581414272291733544'
 
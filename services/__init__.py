@@ -6,5 +6,6 @@ from .auth_service import AuthService
 from .user_service import UserService
 from .crawler_service import CrawlerService
 from .audit_service import AuditService
+from .job_service import JobService
 
-__all__ = ['AuthService', 'UserService', 'CrawlerService', 'AuditService']
+__all__ = ['AuthService', 'UserService', 'CrawlerService', 'AuditService', 'JobService']
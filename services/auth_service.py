@@ -3,7 +3,7 @@
 鉴权服务 (Auth Service)
 处理 Gitee OAuth 回调、本地注册/登录、JWT 签发
 """
-import requests
+from utils.http_client import http_client
 from flask import current_app
 from models import db, User
 from utils.jwt_utils import generate_token
@@ -107,7 +107,7 @@ class AuthService:
             str: access_token，失败返回 None
         """
         try:
-            response = requests.post(
+            response = http_client.post(
                 current_app.config['GITEE_TOKEN_URL'],
                 data={
                     'grant_type': 'authorization_code',
@@ -136,7 +136,7 @@ class AuthService:
             dict: 用户信息，失败返回 None
         """
         try:
-            response = requests.get(
+            response = http_client.get(
                 current_app.config['GITEE_USER_URL'],
                 params={'access_token': access_token}
             )
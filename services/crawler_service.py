@@ -8,6 +8,7 @@ from models import db, AnalysisHistory
 from spiders.xhs_spider import search_and_crawl_xhs
 from spiders.zhihu_spider import search_and_crawl_zhihu
 from utils.cleaner import clean_comments
+from services.in_memory_store import load_or_create_cursor, save_cursor
 
 
 class CrawlerService:
@@ -18,7 +19,7 @@ class CrawlerService:
     _crawl_info = {}
     
     @staticmethod
-    def crawl(user_id, keyword, platform, cookie=None, max_count=50, offset=0):
+    def crawl(user_id, keyword, platform, cookie=None, max_count=50, offset=0, concurrency=1, cursor_id=None):
         """
         执行爬虫任务
         
@@ -29,21 +30,47 @@ class CrawlerService:
             cookie: 知乎 Cookie（可选）
             max_count: 最大爬取数量
             offset: 偏移量
+            concurrency: 知乎并发策略数（1 为串行）
+            cursor_id: 知乎续爬游标 ID（上一批次返回），传入后从上次停下的位置继续
             
         Returns:
-            dict: 爬取结果
+            dict: 爬取结果，知乎平台额外返回 cursor_id 和 has_more
         """
         current_app.logger.info(f"[CrawlerService] 用户 {user_id} 爬取: {platform} - {keyword}")
         
         raw_data = []
+        has_more = True
         if platform == 'xhs':
             raw_data = search_and_crawl_xhs(keyword, max_count=max_count)
         elif platform == 'zhihu':
-            raw_data = search_and_crawl_zhihu(keyword, max_count=max_count, cookie_str=cookie, offset=offset)
+            cursor = load_or_create_cursor(keyword, cursor_id, offset=offset, user_id=user_id)
+            raw_data = search_and_crawl_zhihu(keyword, max_count=max_count, cookie_str=cookie,
+                                              concurrency=concurrency, cursor=cursor)
+            cursor_id = save_cursor(cursor, cursor_id, user_id=user_id)
+            has_more = not cursor.done
         
         # 清洗数据
         cleaned_data = clean_comments(raw_data)
+        CrawlerService.record_results(user_id, [keyword], platform, cleaned_data)
         
+        return {
+            'count': len(cleaned_data),
+            'data': cleaned_data,
+            'cursor_id': cursor_id,
+            'has_more': has_more
+        }
+    
+    @staticmethod
+    def record_results(user_id, keywords, platform, cleaned_data):
+        """
+        保存清洗后的爬取结果：存入用户数据、记录爬取信息和分析历史（同步爬取和后台任务共用）
+        
+        Args:
+            user_id: 用户 ID
+            keywords: 关键词列表
+            platform: 平台 (xhs/zhihu)
+            cleaned_data: 清洗后的数据，多关键词时每条带 keyword 字段
+        """
         # 存储到用户会话（以用户 ID 为 key）
         if user_id not in CrawlerService._global_data:
             CrawlerService._global_data[user_id] = []
@@ -53,24 +80,23 @@ class CrawlerService:
         if user_id not in CrawlerService._crawl_info:
             CrawlerService._crawl_info[user_id] = {'platform': platform, 'keywords': []}
         CrawlerService._crawl_info[user_id]['platform'] = platform
-        if keyword not in CrawlerService._crawl_info[user_id]['keywords']:
-            CrawlerService._crawl_info[user_id]['keywords'].append(keyword)
-        
-        # 记录到数据库
-        history = AnalysisHistory(
-            user_id=user_id,
-            keyword=keyword,
-            platform=platform,
-            result_count=len(cleaned_data),
-            status='completed'
-        )
-        db.session.add(history)
-        db.session.commit()
+        for keyword in keywords:
+            if keyword not in CrawlerService._crawl_info[user_id]['keywords']:
+                CrawlerService._crawl_info[user_id]['keywords'].append(keyword)
         
-        return {
-            'count': len(cleaned_data),
-            'data': cleaned_data
-        }
+        # 记录到数据库（每个关键词一条）
+        for keyword in keywords:
+            count = len(cleaned_data) if len(keywords) == 1 else \
+                sum(1 for item in cleaned_data if item.get('keyword') == keyword)
+            history = AnalysisHistory(
+                user_id=user_id,
+                keyword=keyword,
+                platform=platform,
+                result_count=count,
+                status='completed'
+            )
+            db.session.add(history)
+        db.session.commit()
     
     @staticmethod
     def get_user_data(user_id):
@@ -127,3 +153,102 @@ class CrawlerService:
             .order_by(AnalysisHistory.created_at.desc())\
             .limit(limit).all()
         return [h.to_dict() for h in histories]
+    
+    @staticmethod
+    def get_strategy_stats(keyword=None):
+        """
+        获取知乎搜索策略的产出统计
+        
+        Args:
+            keyword: 关键词，不传则返回全部关键词汇总
+            
+        Returns:
+            dict: 各策略的请求页数、遍历条数、新增条数和每页新增条数
+        """
+        from spiders.zhihu_spider import strategy_stats
+        stats = strategy_stats.get(keyword)
+        strategies = [dict(strategy=key, **entry) for key, entry in stats.items()]
+        strategies.sort(key=lambda x: x['pages'], reverse=True)
+        return {
+            'keyword': keyword or '*',
+            'total_pages': sum(x['pages'] for x in strategies),
+            'total_new': sum(x['new'] for x in strategies),
+            'strategies': strategies,
+            'keywords': strategy_stats.keywords()
+        }
+    
+    @staticmethod
+    def get_proxy_stats():
+        """
+        获取知乎代理池统计
+        
+        Returns:
+            dict: 每个代理的成功率、延迟EWMA、熔断状态，以及按来源汇总的统计
+        """
+        from spiders.zhihu_spider import proxy_pool
+        return proxy_pool.stats()
+    
+    @staticmethod
+    def get_http_stats():
+        """
+        获取共享 HTTP 客户端（OAuth、COS、代理API）的统计
+        
+        Returns:
+            dict: 超时配置，以及每个主机的请求数、错误数、重试数、状态码分布和延迟
+        """
+        from utils.http_client import http_client
+        return http_client.stats()
+    
+    @staticmethod
+    def get_browser_stats():
+        """
+        获取小红书浏览器池和页面等待统计
+        
+        Returns:
+            dict: 启动/复用/回收次数，每个浏览器的使用次数和空闲时间，
+                  waits：各类页面等待的平均耗时和比固定延时节省的时间，
+                  selectors：各字段选择器的命中率、平均耗时和降级状态，
+                  light：轻量浏览器池的同类统计，
+                  shards：多进程分片爬取的全局浏览器占用和各分片进度
+        """
+        from spiders.xhs_spider import browser_pool, light_browser_pool, wait_stats, selector_cache
+        from spiders.xhs_runner import shard_progress
+        return dict(browser_pool.stats(), light=light_browser_pool.stats(), waits=wait_stats.stats(),
+                    selectors=selector_cache.stats(), shards=shard_progress())
+    
+    @staticmethod
+    def list_cookies():
+        """
+        获取知乎 Cookie 池状态
+        
+        Returns:
+            dict: 每个 Cookie 的预算使用、冷却剩余时间、成功/限流次数（Cookie 只显示前后几位）
+        """
+        from spiders.zhihu_spider import cookie_pool
+        return cookie_pool.stats()
+    
+    @staticmethod
+    def add_cookie(cookie, label=None, budget=None):
+        """
+        向 Cookie 池添加账号
+        
+        Returns:
+            str: Cookie ID
+            
+        Raises:
+            ValueError: Cookie 无效
+        """
+        from spiders.zhihu_spider import cookie_pool
+        return cookie_pool.add(cookie, label=label, budget=budget)
+    
+    @staticmethod
+    def remove_cookie(cookie_id):
+        """从 Cookie 池移除账号，返回是否存在"""
+        from spiders.zhihu_spider import cookie_pool
+        return cookie_pool.remove(cookie_id)
+    
+    @staticmethod
+    def set_cookie_enabled(cookie_id, enabled):
+        """启用/停用 Cookie，返回是否存在"""
+        from spiders.zhihu_spider import cookie_pool
+        return cookie_pool.set_enabled(cookie_id, enabled)
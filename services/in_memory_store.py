@@ -2,7 +2,10 @@
 """简单的进程内数据存储，用于临时替代 app.py 的 GLOBAL_DATA/CRAWL_INFO
 适用于开发/演示环境；生产请用数据库或持久存储。
 """
-from typing import List, Dict
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional
 
 GLOBAL_DATA: List[Dict] = []
 GLOBAL_CRAWL_INFO: Dict = {'platform': '', 'keywords': []}
@@ -37,3 +40,61 @@ def set_crawl_info(info: Dict):
 def reset_crawl_info():
     GLOBAL_CRAWL_INFO.clear()
     GLOBAL_CRAWL_INFO.update({'platform': '', 'keywords': []})
+
+
+# 知乎分批爬取游标：{cursor_id: (所属用户ID, CrawlCursor)}，按最近使用排序，只保留最近 MAX_CURSORS 个
+# 游标包含已见过的URL和近似重复状态，只能由创建它的用户续爬
+CRAWL_CURSORS: "OrderedDict[str, Any]" = OrderedDict()
+MAX_CURSORS = 200
+_cursor_lock = threading.Lock()
+
+
+def _owner(user_id) -> Optional[str]:
+    return None if user_id is None else str(user_id)
+
+
+def get_cursor(cursor_id: Optional[str], user_id=None):
+    """取回 user_id 的游标；不存在或属于其他用户时返回 None"""
+    if not cursor_id:
+        return None
+    with _cursor_lock:
+        entry = CRAWL_CURSORS.get(cursor_id)
+        if entry is None or entry[0] != _owner(user_id):
+            return None
+        CRAWL_CURSORS.move_to_end(cursor_id)
+        return entry[1]
+
+
+def save_cursor(cursor, cursor_id: Optional[str] = None, user_id=None) -> str:
+    """保存 user_id 的游标并返回其ID；cursor_id 属于其他用户时分配新ID，不覆盖对方的游标"""
+    owner = _owner(user_id)
+    with _cursor_lock:
+        entry = CRAWL_CURSORS.get(cursor_id) if cursor_id else None
+        if not cursor_id or (entry is not None and entry[0] != owner):
+            cursor_id = uuid.uuid4().hex
+        CRAWL_CURSORS[cursor_id] = (owner, cursor)
+        CRAWL_CURSORS.move_to_end(cursor_id)
+        while len(CRAWL_CURSORS) > MAX_CURSORS:
+            CRAWL_CURSORS.popitem(last=False)
+    return cursor_id
+
+
+def load_or_create_cursor(keyword: str, cursor_id: Optional[str] = None,
+                          cursor_data: Optional[Dict] = None, offset: int = 0, user_id=None):
+    """
+    按 cursor_id 取回 user_id 保存的游标（其他用户的游标视为不存在）；或用前端回传的游标字典恢复（无效时忽略）；
+    都没有则新建（兼容旧的 offset 参数）
+    """
+    from spiders.zhihu_spider import CrawlCursor
+
+    cursor = get_cursor(cursor_id, user_id)
+    if cursor is None and cursor_data:
+        try:
+            cursor = CrawlCursor.from_dict(cursor_data)
+        except ValueError as e:
+            print(f"[WARN] 回传的游标无效，重新开始爬取: {e}")
+    if cursor is None or cursor.keyword != keyword:
+        cursor = CrawlCursor(keyword)
+        if offset:
+            cursor.advance(0, offset)
+    return cursor
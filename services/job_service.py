@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+爬取任务服务 (Job Service)
+/api/crawl 等接口在 HTTP 请求里同步执行爬虫，爬取经常要几分钟，前端 30 秒就超时，且整个过程占住一个 Flask worker。
+这里把爬取改为后台任务：
+- 提交后立即返回任务 ID，任务在有上限的后台线程池中排队执行（小红书多关键词时再分给多进程，见 spiders/xhs_runner.py）
+- 任务状态、进度和已产出的结果（清洗后）边爬边写入 SQLite，刷新页面或重新打开后仍可查询和继续读取
+- 支持轮询进度、取消（当前条目完成后停止并释放浏览器/线程）、分页读取结果（运行中可读取部分结果）
+- 服务启动时（JobService.recover）把仍处于排队/运行状态的任务标记为 interrupted
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+# ================= 配置区域 =================
+JOB_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "resource", "cache", "crawl_jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("CRAWL_JOB_WORKERS", 2))   # 同时执行的爬取任务数，其余排队
+JOB_MAX_QUEUED = 20            # 每个用户最多同时排队/运行的任务数
+JOB_RETENTION_DAYS = 7         # 结束超过该天数的任务及结果在启动时清理
+JOB_FLUSH_ITEMS = 20           # 累积多少条结果写一次库
+JOB_FLUSH_SECONDS = 2.0        # 距上次写库超过该秒数也写一次，保证轮询能及时看到部分结果
+JOB_RESULT_LIMIT = 500         # 单次读取结果的最大条数
+JOB_STATUS_CHECK_SECONDS = 2.0 # 运行中每隔多少秒重新读取库中的任务状态（其他进程处理的取消请求）
+JOB_MAX_COUNT = 2000           # 每个关键词最多爬取的条数（提交时超出的截断）
+JOB_MAX_CONCURRENCY = 15       # 知乎并发策略数上限（搜索策略总数）
+JOB_MAX_WORKERS = 8            # 小红书工作进程数上限（实际还受 XHS_MAX_BROWSERS 限制）
+# ===========================================
+
+JOB_ACTIVE = ("queued", "running")
+JOB_FINISHED = ("completed", "failed", "cancelled", "interrupted")
+
+
+class JobStore:
+    """任务状态和结果的 SQLite 存储（线程安全，首次使用时才创建数据库文件）"""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "  id TEXT PRIMARY KEY,"
+                "  user_id TEXT NOT NULL,"
+                "  platform TEXT NOT NULL,"
+                "  keywords TEXT NOT NULL,"
+                "  params TEXT NOT NULL,"
+                "  status TEXT NOT NULL,"
+                "  count INTEGER NOT NULL DEFAULT 0,"
+                "  message TEXT,"
+                "  created_at REAL NOT NULL,"
+                "  started_at REAL,"
+                "  finished_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                "  job_id TEXT NOT NULL,"
+                "  seq INTEGER NOT NULL,"
+                "  item TEXT NOT NULL,"
+                "  PRIMARY KEY (job_id, seq)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def recover(self):
+        """
+        服务启动时调用一次：上次运行时未结束的任务已随进程退出而中断，标记为 interrupted，并清理过期任务
+        不放在 _db() 中，否则每个进程首次访问数据库时都会把其他进程正在执行的任务标记为中断
+        :return: 标记为中断的任务数
+        """
+        now = time.time()
+        expired = now - JOB_RETENTION_DAYS * 86400
+        with self._lock:
+            db = self._db()
+            cur = db.execute("UPDATE jobs SET status = 'interrupted', message = '服务重启，任务中断', finished_at = ? "
+                             "WHERE status IN ('queued', 'running')", (now,))
+            db.execute("DELETE FROM job_items WHERE job_id IN "
+                       "(SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?)", (expired,))
+            db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (expired,))
+            db.commit()
+            return cur.rowcount
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["keywords"] = json.loads(job["keywords"])
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def create(self, user_id, platform, keywords, params):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT INTO jobs (id, user_id, platform, keywords, params, status, created_at) "
+                       "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                       (job_id, str(user_id), platform, json.dumps(keywords, ensure_ascii=False),
+                        json.dumps(params, ensure_ascii=False), time.time()))
+            db.commit()
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._row(self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, user_id, limit=50):
+        with self._lock:
+            rows = self._db().execute("SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+                                      (str(user_id), limit)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def count_active(self, user_id):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)",
+                                      (str(user_id), *JOB_ACTIVE)).fetchone()[0]
+
+    def start(self, job_id):
+        """排队中的任务标记为运行中；已被取消时返回 False"""
+        with self._lock:
+            db = self._db()
+            cur = db.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                             (time.time(), job_id))
+            db.commit()
+            return cur.rowcount > 0
+
+    def finish(self, job_id, status, message=None):
+        """结束任务；只更新仍在排队/运行的任务（已取消的不会被覆盖），返回是否更新"""
+        with self._lock:
+            db = self._db()
+            cur = db.execute("UPDATE jobs SET status = ?, message = COALESCE(?, message), finished_at = ? "
+                             "WHERE id = ? AND status IN ('queued', 'running')",
+                             (status, message, time.time(), job_id))
+            db.commit()
+            return cur.rowcount > 0
+
+    def append_items(self, job_id, start_seq, items):
+        """追加一批结果并更新任务的条数"""
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO job_items (job_id, seq, item) VALUES (?, ?, ?)",
+                           [(job_id, start_seq + i, json.dumps(item, ensure_ascii=False))
+                            for i, item in enumerate(items)])
+            db.execute("UPDATE jobs SET count = ? WHERE id = ?", (start_seq + len(items), job_id))
+            db.commit()
+
+    def items(self, job_id, offset=0, limit=JOB_RESULT_LIMIT):
+        with self._lock:
+            rows = self._db().execute("SELECT item FROM job_items WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                                      (job_id, offset, limit)).fetchall()
+        return [json.loads(r["item"]) for r in rows]
+
+
+class JobRunner:
+    """后台执行爬取任务的有界线程池"""
+
+    def __init__(self, store, workers=JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._executor = None
+        self._cancel = {}    # 任务ID -> threading.Event（排队和运行中的任务）
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, app, options):
+        """
+        :param app: Flask 应用（工作线程中记录分析历史需要应用上下文）
+        :param options: 爬取参数（含 cookie，只保存在内存中，不写库）
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl-job")
+            self._cancel[job_id] = threading.Event()
+            self._executor.submit(self._run, job_id, app, options)
+
+    def cancel(self, job_id):
+        """通知任务停止；排队中的任务直接标记为已取消"""
+        with self._lock:
+            event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+        return self.store.finish(job_id, "cancelled", "已取消")
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "active": len(self._cancel)}
+
+    def _run(self, job_id, app, options):
+        with self._lock:
+            cancel = self._cancel.get(job_id)
+        try:
+            job = self.store.get(job_id)
+            if job is None or cancel.is_set() or not self.store.start(job_id):
+                return
+            print(f"[JOB] 开始任务 {job_id}: {job['platform']} - {job['keywords']}")
+            count = self._crawl(job_id, job, options, cancel)
+            if cancel.is_set():
+                print(f"[JOB] 任务 {job_id} 已取消，保留已获取的 {count} 条")
+                return
+            # 与同步接口一样写入用户数据和分析历史，/crawler/data、/crawler/download 可以直接使用
+            user_id = int(job["user_id"]) if job["user_id"].isdigit() else job["user_id"]
+            with app.app_context():
+                from services.crawler_service import CrawlerService
+                CrawlerService.record_results(user_id, job["keywords"], job["platform"],
+                                              self.store.items(job_id, limit=count or 1))
+            self.store.finish(job_id, "completed", f"共获取 {count} 条数据")
+            print(f"[JOB] 任务 {job_id} 完成，共 {count} 条")
+        except Exception as e:
+            print(f"[JOB] 任务 {job_id} 失败: {e}")
+            self.store.finish(job_id, "failed", str(e)[:500])
+        finally:
+            with self._lock:
+                self._cancel.pop(job_id, None)
+
+    def _crawl(self, job_id, job, options, cancel):
+        """执行爬取和流式清洗，边爬边分批写库；返回写入的条数"""
+        from utils.cleaner import iter_clean_comments
+
+        raw_iter = _open_crawl(job["platform"], job["keywords"], options)
+        buffer = []
+        count = 0
+        flushed_at = time.monotonic()
+        try:
+            # 取消在清洗之前检查：原始条目全部被过滤/去重时也能及时停止
+            for item in iter_clean_comments(self._until_cancelled(job_id, raw_iter, cancel)):
+                buffer.append(item)
+                if len(buffer) >= JOB_FLUSH_ITEMS or time.monotonic() - flushed_at >= JOB_FLUSH_SECONDS:
+                    self.store.append_items(job_id, count, buffer)
+                    count += len(buffer)
+                    buffer = []
+                    flushed_at = time.monotonic()
+                if cancel.is_set():
+                    break
+        finally:
+            # 关闭爬虫生成器，释放浏览器/爬取线程/分片工作进程
+            raw_iter.close()
+            if buffer:
+                self.store.append_items(job_id, count, buffer)
+                count += len(buffer)
+        return count
+
+    def _until_cancelled(self, job_id, raw_iter, cancel):
+        """
+        逐条转发原始结果，任务被取消后停止
+        除了本进程的 cancel 事件，每 JOB_STATUS_CHECK_SECONDS 秒重新读取库中的状态：
+        取消请求可能由其他进程处理（只改了库中的状态），发现后同样设置 cancel
+        """
+        checked_at = time.monotonic()
+        for raw in raw_iter:
+            if not cancel.is_set() and time.monotonic() - checked_at >= JOB_STATUS_CHECK_SECONDS:
+                checked_at = time.monotonic()
+                job = self.store.get(job_id)
+                if job is None or job["status"] != "running":
+                    print(f"[JOB] 任务 {job_id} 已被取消（状态 {job['status'] if job else '已删除'}）")
+                    cancel.set()
+            if cancel.is_set():
+                return
+            yield raw
+
+
+def _open_crawl(platform, keywords, options):
+    """按平台和关键词数选择爬虫，返回原始结果生成器"""
+    max_count = options["max_count"]
+    if platform == "xhs":
+        if len(keywords) > 1:
+            from spiders.xhs_runner import iter_search_xhs_sharded
+            return iter_search_xhs_sharded(keywords, max_count=max_count, workers=options.get("workers"))
+        from spiders.xhs_spider import iter_search_xhs
+        return iter_search_xhs(keywords[0], max_count=max_count)
+
+    cookie = options.get("cookie") or None
+    if len(keywords) > 1:
+        from spiders.zhihu_spider import iter_search_zhihu_multi
+        raw_iter = iter_search_zhihu_multi(keywords, max_count=max_count, cookie_str=cookie,
+                                           concurrency=options.get("concurrency"))
+    else:
+        from spiders.zhihu_spider import iter_search_zhihu
+        raw_iter = iter_search_zhihu(keywords[0], max_count=max_count, cookie_str=cookie,
+                                     concurrency=options.get("concurrency") or 1)
+    if options.get("with_details"):
+        from spiders.zhihu_detail import iter_fetch_zhihu_details
+        raw_iter = iter_fetch_zhihu_details(raw_iter, cookie_str=cookie)
+    return raw_iter
+
+
+def _present(job):
+    """补充运行时长和是否已结束，供接口返回"""
+    job["elapsed"] = round((job["finished_at"] or time.time()) - job["started_at"], 1) if job["started_at"] else 0
+    job["finished"] = job["status"] in JOB_FINISHED
+    return job
+
+
+# 全局实例
+job_store = JobStore()
+job_runner = JobRunner(job_store)
+
+
+class JobService:
+    """爬取任务服务类"""
+
+    @staticmethod
+    def submit(user_id, platform, keywords, max_count=50, cookie=None, concurrency=None, with_details=False,
+               workers=None):
+        """
+        提交爬取任务
+
+        Args:
+            user_id: 用户 ID
+            platform: 平台 (xhs/zhihu)
+            keywords: 关键词列表（多个关键词时小红书分片并行、知乎交错爬取）
+            max_count: 每个关键词的最大爬取数量
+            cookie: 知乎 Cookie（可选，只保存在内存中）
+            concurrency: 知乎并发策略数
+            with_details: 知乎是否抓取完整正文和评论
+            workers: 小红书多关键词时的工作进程数
+
+        Returns:
+            dict: 新任务；该用户排队/运行中的任务过多时返回 None
+        """
+        if job_store.count_active(user_id) >= JOB_MAX_QUEUED:
+            return None
+        params = {"max_count": max_count, "concurrency": concurrency, "with_details": with_details,
+                  "workers": workers}
+        job_id = job_store.create(user_id, platform, keywords, params)
+        job_runner.submit(job_id, current_app._get_current_object(), dict(params, cookie=cookie))
+        return JobService.get(user_id, job_id)
+
+    @staticmethod
+    def recover():
+        """服务启动时调用一次：把上次运行时未结束的任务标记为 interrupted，并清理过期任务"""
+        count = job_store.recover()
+        if count:
+            print(f"[JOB] 上次运行时未结束的 {count} 个任务已标记为中断")
+        return count
+
+    @staticmethod
+    def get(user_id, job_id):
+        """
+        获取任务状态和进度
+
+        Returns:
+            dict: 任务；不存在或不属于该用户时返回 None
+        """
+        job = job_store.get(job_id)
+        if job is None or job["user_id"] != str(user_id):
+            return None
+        return _present(job)
+
+    @staticmethod
+    def list(user_id):
+        """获取用户最近的任务"""
+        return [_present(job) for job in job_store.list(user_id)]
+
+    @staticmethod
+    def cancel(user_id, job_id):
+        """
+        取消任务
+
+        Returns:
+            dict: 任务；不存在或不属于该用户时返回 None
+        """
+        job = JobService.get(user_id, job_id)
+        if job is None:
+            return None
+        if job["status"] in JOB_ACTIVE:
+            job_runner.cancel(job_id)
+        return JobService.get(user_id, job_id)
+
+    @staticmethod
+    def result(user_id, job_id, offset=0, limit=JOB_RESULT_LIMIT):
+        """
+        分页读取任务结果（运行中时为已获取的部分结果）
+
+        Returns:
+            dict: {"job": 任务, "items": 结果, "next_offset": 下一页偏移}；任务不存在时返回 None
+        """
+        job = JobService.get(user_id, job_id)
+        if job is None:
+            return None
+        limit = max(1, min(int(limit), JOB_RESULT_LIMIT))
+        items = job_store.items(job_id, offset=max(0, int(offset)), limit=limit)
+        return {"job": job, "items": items, "next_offset": max(0, int(offset)) + len(items)}
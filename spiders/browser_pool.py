@@ -0,0 +1,410 @@
+# spiders/browser_pool.py
+"""
+Chromium 浏览器池（小红书爬虫共用）
+- 进程内复用已启动的浏览器，爬取时借出、结束后归还，省去每次启动浏览器和预热页面的时间，保留登录态和缓存
+- 每个槽位固定调试端口和用户数据目录，回收重建后 Cookie 仍然保留
+- 借出前做健康检查，浏览器崩溃或无响应时关闭并重建
+- 使用次数达到上限、爬取过程中出错、空闲过久的实例会被回收
+- 池大小有上限，全部借出时等待归还
+- 进程内同时运行的浏览器总数（各浏览器池和小红书分片工作进程合计）不超过 XHS_MAX_BROWSERS（BrowserBudget），
+  额度不足时先关闭空闲的浏览器
+- 轻量配置（lightweight）：无头运行、精简启动参数，并在网络层拦截图片/视频/字体请求，只加载读取文本需要的资源
+"""
+import os
+import time
+import threading
+
+from DrissionPage import ChromiumPage, ChromiumOptions
+
+PROFILE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "resource", "browser_profiles")
+# 进程内同时运行的浏览器总数上限（浏览器池 + 分片工作进程），默认按 CPU 核数，最多 4 个
+XHS_MAX_BROWSERS = int(os.environ.get("XHS_MAX_BROWSERS", min(4, os.cpu_count() or 1)))
+
+# ================= 轻量配置 =================
+LIGHT_BASE_PORT = 9322         # 轻量浏览器的调试端口起点，与普通浏览器分开
+LIGHT_HEADLESS = os.environ.get("XHS_LIGHT_HEADLESS", "1") == "1"   # 首次使用时设为 0 有界面运行以便登录
+LIGHT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")   # 无头模式的 UA 带 HeadlessChrome，替换掉
+LIGHT_ARGUMENTS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",   # 后台标签页（并行模式）不降速
+    "--disable-renderer-backgrounding",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-component-update",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--no-first-run",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--window-size=1280,900",
+]
+# 网络层拦截的请求（Network.setBlockedURLs 通配符）；小红书图片URL多数没有扩展名，按CDN域名拦截
+BLOCKED_URL_PATTERNS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.mp4*", "*.m3u8*", "*.ts?*", "*.flv*", "*.mp3*", "*.m4a*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*sns-webpic*", "*sns-img*", "*sns-avatar*", "*picasso-static*", "*sns-video*", "*xhscdn.com/spectrum/*",
+]
+# ===========================================
+
+
+def block_resources(page):
+    """在网络层拦截图片/视频/字体请求（按标签页生效，新开的标签页需要单独调用）"""
+    try:
+        page.run_cdp("Network.enable")
+        page.run_cdp("Network.setBlockedURLs", urls=BLOCKED_URL_PATTERNS)
+        return True
+    except Exception as e:
+        print(f"[BROWSER] 设置请求拦截失败: {e}")
+        return False
+
+
+def light_options(slot, profile_root=PROFILE_ROOT):
+    """轻量配置：无头、精简启动参数、不加载图片，固定的用户数据目录保留登录 Cookie"""
+    options = ChromiumOptions()
+    options.set_local_port(LIGHT_BASE_PORT + slot)
+    options.set_user_data_path(os.path.join(profile_root, f"xhs_light_{slot}"))
+    options.headless(LIGHT_HEADLESS)
+    options.no_imgs(True)
+    options.mute(True)
+    options.set_user_agent(LIGHT_USER_AGENT)
+    for argument in LIGHT_ARGUMENTS:
+        name, _, value = argument.partition("=")
+        options.set_argument(name, value or None)
+    return options
+
+
+def default_browser_factory(slot, base_port=9222, profile_root=PROFILE_ROOT, lightweight=False):
+    """
+    创建槽位 slot 的浏览器
+    槽位 0 与原来的 ChromiumPage() 相同（默认端口和用户目录，沿用已登录的浏览器），
+    其他槽位使用 base_port+slot 端口和 profile_root 下独立的用户数据目录
+    lightweight=True 时使用 light_options，并拦截主标签页的图片/视频/字体请求
+    """
+    if lightweight:
+        page = ChromiumPage(light_options(slot, profile_root))
+        block_resources(page)
+        return page
+    if slot == 0:
+        return ChromiumPage()
+    options = ChromiumOptions()
+    options.set_local_port(base_port + slot)
+    options.set_user_data_path(os.path.join(profile_root, f"xhs_{slot}"))
+    return ChromiumPage(options)
+
+
+def light_browser_factory(slot):
+    """轻量浏览器池使用的 factory"""
+    return default_browser_factory(slot, lightweight=True)
+
+
+class BrowserBudget:
+    """
+    进程内同时运行的浏览器总数额度（线程安全），各浏览器池和分片工作进程共用
+    额度不足时先调用已登记的回收函数（浏览器池的 close_all）关闭空闲浏览器，仍不足时等待归还
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._used = 0
+        self._reclaimers = []
+        self._cond = threading.Condition()
+
+    def register(self, reclaim):
+        """登记回收函数 reclaim()：关闭空闲浏览器，关闭时调用 release 归还额度"""
+        with self._cond:
+            self._reclaimers.append(reclaim)
+
+    def acquire(self, count, timeout):
+        """
+        占用最多 count 个额度，额度不足 count 时先回收空闲浏览器，一个都没有时等待
+        :return: 实际占用的额度数；超时返回 0
+        """
+        deadline = time.monotonic() + timeout
+        reclaim = True
+        while True:
+            with self._cond:
+                free = self.limit - self._used
+                if free >= count or (free > 0 and not reclaim):
+                    granted = min(count, free)
+                    self._used += granted
+                    return granted
+                if not reclaim:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 0
+                    self._cond.wait(min(remaining, 5.0))
+                    reclaim = True
+                    continue
+                reclaimers = list(self._reclaimers)
+            # 回收在锁外进行（关闭浏览器时会调用 release）
+            for reclaimer in reclaimers:
+                try:
+                    reclaimer()
+                except Exception as e:
+                    print(f"[BROWSER] 回收空闲浏览器失败: {e}")
+            reclaim = False
+
+    def release(self, count=1):
+        with self._cond:
+            self._used = max(0, self._used - count)
+            self._cond.notify_all()
+
+    def in_use(self):
+        with self._cond:
+            return self._used
+
+
+# 全局浏览器额度：xhs_spider 的两个浏览器池和 xhs_runner 的分片工作进程共用
+browser_budget = BrowserBudget(XHS_MAX_BROWSERS)
+
+
+class _BrowserSlot:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, index):
+        self.index = index
+        self.page = None
+        self.uses = 0
+        self.created_at = 0.0
+        self.last_used = 0.0
+        self.in_use = False
+        self.budgeted = False   # 是否占用了全局浏览器额度
+
+
+class BrowserLease:
+    """一次借出的浏览器，用完调用 BrowserPool.release"""
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.page = slot.page
+        self.broken = False
+
+    def mark_broken(self):
+        """爬取过程中浏览器出错，归还时回收该实例"""
+        self.broken = True
+
+
+class BrowserPool:
+    """浏览器池管理器（线程安全）"""
+
+    def __init__(self, max_size=2, max_uses=20, idle_ttl=600, acquire_timeout=300, warm_url=None, factory=None,
+                 budget=None):
+        """
+        :param max_size: 最多同时存在的浏览器数
+        :param max_uses: 每个浏览器借出多少次后回收重建，0 表示不限
+        :param idle_ttl: 空闲超过该秒数的浏览器关闭，0 表示不关闭
+        :param acquire_timeout: 全部借出时 acquire 最多等待的秒数
+        :param warm_url: 新建浏览器后先打开的页面（预热DNS/连接和站点缓存）
+        :param factory: 创建浏览器的函数 factory(slot) -> page，默认 default_browser_factory
+        :param budget: BrowserBudget，启动浏览器前占用额度，关闭后归还；None 表示只受 max_size 限制
+        """
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_ttl = idle_ttl
+        self.acquire_timeout = acquire_timeout
+        self.warm_url = warm_url
+        self.factory = factory or default_browser_factory
+        self.budget = budget
+        if budget is not None:
+            budget.register(self.close_all)
+        self._slots = [_BrowserSlot(i) for i in range(max_size)]
+        self._cond = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+        self.reused = 0
+        self.waits = 0
+
+    # ---------------- 借出/归还 ----------------
+
+    def acquire(self, timeout=None):
+        """
+        借出一个健康的浏览器，优先使用已启动的实例；没有空闲实例时等待
+        :return: BrowserLease；超时或浏览器无法启动时返回 None
+        """
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        with self._cond:
+            while True:
+                self._reap_idle()
+                free = [s for s in self._slots if not s.in_use]
+                if free:
+                    # 已启动的优先，其次最近用过的（缓存更热）
+                    slot = max(free, key=lambda s: (s.page is not None, s.last_used))
+                    slot.in_use = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("[BROWSER] 等待空闲浏览器超时")
+                    return None
+                self.waits += 1
+                self._cond.wait(min(remaining, 5.0))
+
+        # 健康检查和启动在锁外进行，不阻塞其他线程归还
+        try:
+            if slot.page is not None and not self._healthy(slot.page):
+                print(f"[BROWSER] 浏览器 #{slot.index} 无响应，重建")
+                self._close_slot(slot)
+            if slot.page is None:
+                if not self._reserve(slot, deadline - time.monotonic()):
+                    print(f"[BROWSER] 浏览器总数已达上限 {self.budget.limit}，等待超时")
+                    with self._cond:
+                        slot.in_use = False
+                        self._cond.notify()
+                    return None
+                self._start(slot)
+            else:
+                with self._cond:
+                    self.reused += 1
+        except Exception as e:
+            print(f"[BROWSER] 启动浏览器 #{slot.index} 失败: {e}")
+            self._close_slot(slot)
+            with self._cond:
+                slot.in_use = False
+                self._cond.notify()
+            return None
+        slot.uses += 1
+        return BrowserLease(slot)
+
+    def release(self, lease):
+        """归还浏览器：出错或达到使用次数上限时回收，否则关闭多余标签页后放回池中"""
+        slot = lease.slot
+        slot.last_used = time.time()
+        recycle = lease.broken or (self.max_uses and slot.uses >= self.max_uses)
+        if not recycle:
+            try:
+                if slot.page.tabs_count > 1:
+                    slot.page.close_tabs(slot.page.tab_id, others=True)
+            except Exception:
+                recycle = True
+        if recycle:
+            reason = "出错" if lease.broken else f"已使用 {slot.uses} 次"
+            print(f"[BROWSER] 回收浏览器 #{slot.index}（{reason}）")
+            self._close_slot(slot)
+            with self._cond:
+                self.recycled += 1
+        with self._cond:
+            slot.in_use = False
+            self._cond.notify()
+
+    def page(self):
+        """上下文管理器用法：with browser_pool.page() as page: ..."""
+        return _PageContext(self)
+
+    # ---------------- 生命周期 ----------------
+
+    def prewarm(self, count=1):
+        """提前启动 count 个浏览器（例如在服务启动后的后台线程中调用）"""
+        leases = [self.acquire() for _ in range(min(count, self.max_size))]
+        for lease in leases:
+            if lease is not None:
+                lease.slot.uses -= 1
+                self.release(lease)
+
+    def close_all(self):
+        """关闭所有空闲浏览器（借出中的在归还后照常处理）；关闭期间占住槽位，不会被同时借出"""
+        with self._cond:
+            idle = [s for s in self._slots if not s.in_use and s.page is not None]
+            for slot in idle:
+                slot.in_use = True
+        for slot in idle:
+            self._close_slot(slot)
+        with self._cond:
+            for slot in idle:
+                slot.in_use = False
+            self._cond.notify_all()
+
+    def _reserve(self, slot, timeout):
+        """启动浏览器前占用全局额度"""
+        if self.budget is None or slot.budgeted:
+            return True
+        if not self.budget.acquire(1, max(timeout, 0)):
+            return False
+        slot.budgeted = True
+        return True
+
+    def _start(self, slot):
+        started = time.monotonic()
+        slot.page = self.factory(slot.index)
+        slot.uses = 0
+        slot.created_at = time.time()
+        if self.warm_url:
+            try:
+                slot.page.get(self.warm_url)
+            except Exception as e:
+                print(f"[BROWSER] 预热页面打开失败: {e}")
+        with self._cond:
+            self.created += 1
+        print(f"[BROWSER] 启动浏览器 #{slot.index}，用时 {time.monotonic() - started:.1f} 秒")
+
+    @staticmethod
+    def _healthy(page):
+        try:
+            return page.states.is_alive and page.run_js("return 1;", timeout=5) == 1
+        except Exception:
+            return False
+
+    def _close_slot(self, slot):
+        page, slot.page = slot.page, None
+        slot.uses = 0
+        if page is not None:
+            try:
+                page.quit()
+            except Exception:
+                pass
+        if slot.budgeted:
+            slot.budgeted = False
+            self.budget.release(1)
+
+    def _reap_idle(self):
+        """关闭空闲过久的浏览器（调用方持有锁；quit 很快，直接在锁内执行）"""
+        if not self.idle_ttl:
+            return
+        now = time.time()
+        for slot in self._slots:
+            if not slot.in_use and slot.page is not None and now - slot.last_used > self.idle_ttl:
+                print(f"[BROWSER] 浏览器 #{slot.index} 空闲超过 {self.idle_ttl} 秒，关闭")
+                self._close_slot(slot)
+
+    # ---------------- 统计 ----------------
+
+    def stats(self):
+        now = time.time()
+        with self._cond:
+            slots = [{
+                "index": s.index,
+                "running": s.page is not None,
+                "in_use": s.in_use,
+                "uses": s.uses,
+                "age_seconds": round(now - s.created_at, 1) if s.page is not None else None,
+                "idle_seconds": round(now - s.last_used, 1) if s.page is not None and not s.in_use else None,
+            } for s in self._slots]
+            return {
+                "max_size": self.max_size,
+                "max_uses": self.max_uses,
+                "created": self.created,
+                "reused": self.reused,
+                "recycled": self.recycled,
+                "waits": self.waits,
+                "slots": slots,
+            }
+
+
+class _PageContext:
+    def __init__(self, pool):
+        self.pool = pool
+        self.lease = None
+
+    def __enter__(self):
+        self.lease = self.pool.acquire()
+        if self.lease is None:
+            raise RuntimeError("没有可用的浏览器")
+        return self.lease.page
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.lease.mark_broken()
+        self.pool.release(self.lease)
+        return False
@@ -0,0 +1,247 @@
+# spiders/cookie_pool.py
+"""
+知乎 Cookie 池（多账号）
+- 每个 Cookie 有独立的 AIMD 速率控制器和每个时间窗口的请求预算，请求分散到各账号，总吞吐随账号数增加
+- 某个 Cookie 被限流（403/429）时进入冷却（连续被限流时冷却时间翻倍），请求自动切换到其他 Cookie
+- 返回 401 视为登录失效，停用该 Cookie，需要重新添加
+- Cookie 只保存在内存中，接口返回时只显示前后几位
+- 池为所有用户共用（未传 Cookie 的爬取都会使用），只有管理员（配置 ADMIN_USER_IDS）可以通过接口查看和增删账号
+"""
+import time
+import uuid
+import threading
+
+from spiders.rate_controller import AIMDRateController
+
+
+def mask_cookie(cookie):
+    """只保留前后几位，避免在接口和日志中泄露完整 Cookie"""
+    if len(cookie) <= 16:
+        return "*" * len(cookie)
+    return f"{cookie[:6]}...{cookie[-6:]}"
+
+
+class CookieState:
+    """单个 Cookie 的预算、冷却和健康统计"""
+
+    def __init__(self, cookie, label, budget, window, rate):
+        self.id = uuid.uuid4().hex[:12]
+        self.cookie = cookie
+        self.label = label or mask_cookie(cookie)
+        self.budget = budget
+        self.window = window
+        self.rate = rate
+        self.window_start = time.time()
+        self.used = 0
+        self.successes = 0
+        self.throttles = 0
+        self.failures = 0
+        self.consecutive_throttles = 0
+        self.cooldown_until = 0.0
+        self.enabled = True
+        self.invalid = False
+        self.last_used = 0.0
+        self.added_at = time.time()
+
+    def _roll_window(self, now):
+        if now - self.window_start >= self.window:
+            self.window_start = now
+            self.used = 0
+
+    def available_at(self, now):
+        """最早可以再次使用的时间；0 表示现在可用，None 表示已停用"""
+        if not self.enabled or self.invalid:
+            return None
+        self._roll_window(now)
+        ready = self.cooldown_until
+        if self.budget and self.used >= self.budget:
+            ready = max(ready, self.window_start + self.window)
+        return ready if ready > now else 0
+
+    def to_dict(self, now):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "cookie": mask_cookie(self.cookie),
+            "enabled": self.enabled,
+            "invalid": self.invalid,
+            "budget": self.budget,
+            "window_seconds": self.window,
+            "used_in_window": self.used,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "failures": self.failures,
+            "cooldown_seconds_left": round(max(0.0, self.cooldown_until - now), 1),
+            "rate": round(self.rate.rate, 3),
+            "wait_seconds": self.rate.stats()["total_wait_seconds"],
+        }
+
+
+class CookieLease:
+    """一次请求使用的 Cookie，请求结束后通过 CookiePool.report_* 回报结果"""
+
+    def __init__(self, state):
+        self.id = state.id
+        self.cookie = state.cookie
+        self.label = state.label
+        self.rate = state.rate
+
+
+class CookiePool:
+    """Cookie 池管理器（线程安全）"""
+
+    def __init__(self, cookies=None, budget=300, window=3600, cooldown=60.0, max_cooldown=1800.0,
+                 wait_timeout=60.0, rate_options=None):
+        """
+        :param cookies: 初始 Cookie 列表
+        :param budget: 每个 Cookie 每个时间窗口最多请求次数，0 表示不限
+        :param window: 预算时间窗口（秒）
+        :param cooldown: 被限流后的基础冷却时间（秒），连续被限流时翻倍
+        :param max_cooldown: 冷却时间上限（秒）
+        :param wait_timeout: 所有 Cookie 都不可用时 acquire 最多等待的秒数
+        :param rate_options: 每个 Cookie 的 AIMDRateController 参数
+        """
+        self.budget = budget
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.wait_timeout = wait_timeout
+        self.rate_options = dict(rate_options or {})
+        self._states = {}
+        self._lock = threading.Lock()
+        for cookie in cookies or []:
+            self.add(cookie)
+
+    # ---------------- 管理 ----------------
+
+    def add(self, cookie, label=None, budget=None):
+        """添加 Cookie（相同 Cookie 重复添加时重新启用），返回其ID"""
+        cookie = (cookie or "").strip()
+        if cookie.lower().startswith("cookie:"):
+            cookie = cookie.split(":", 1)[1].strip()
+        if len(cookie) < 10:
+            raise ValueError("Cookie 无效")
+        with self._lock:
+            for state in self._states.values():
+                if state.cookie == cookie:
+                    state.enabled = True
+                    state.invalid = False
+                    state.consecutive_throttles = 0
+                    state.cooldown_until = 0.0
+                    if label:
+                        state.label = label
+                    if budget is not None:
+                        state.budget = budget
+                    return state.id
+            rate = AIMDRateController(name=f"cookie:{label or mask_cookie(cookie)}", **self.rate_options)
+            state = CookieState(cookie, label, self.budget if budget is None else budget, self.window, rate)
+            self._states[state.id] = state
+        print(f"[COOKIE] 添加 Cookie: {state.label}")
+        return state.id
+
+    def remove(self, cookie_id):
+        with self._lock:
+            return self._states.pop(cookie_id, None) is not None
+
+    def set_enabled(self, cookie_id, enabled):
+        with self._lock:
+            state = self._states.get(cookie_id)
+            if state is None:
+                return False
+            state.enabled = enabled
+            if enabled:
+                state.invalid = False
+            return True
+
+    def usable_count(self):
+        """启用且未失效的 Cookie 数（不考虑冷却和预算）"""
+        with self._lock:
+            return sum(1 for s in self._states.values() if s.enabled and not s.invalid)
+
+    # ---------------- 分配 ----------------
+
+    def acquire(self, timeout=None):
+        """
+        取一个当前可用的 Cookie（最久未使用的优先），预算计入一次
+        所有 Cookie 都在冷却或预算用完时等待，最多 timeout 秒
+        :return: CookieLease；没有可用 Cookie 时返回 None
+        """
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        while True:
+            now = time.time()
+            with self._lock:
+                ready = []
+                next_ready = None
+                for state in self._states.values():
+                    at = state.available_at(now)
+                    if at is None:
+                        continue
+                    if at == 0:
+                        ready.append(state)
+                    elif next_ready is None or at < next_ready:
+                        next_ready = at
+                if ready:
+                    state = min(ready, key=lambda s: s.last_used)
+                    state.used += 1
+                    state.last_used = now
+                    return CookieLease(state)
+            if next_ready is None:
+                print("[COOKIE] 没有可用的 Cookie")
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"[COOKIE] 所有 Cookie 都在冷却或预算已用完，{next_ready - now:.0f} 秒后恢复")
+                return None
+            time.sleep(min(remaining, max(0.1, next_ready - now), 1.0))
+
+    def report_success(self, lease):
+        lease.rate.on_success()
+        with self._lock:
+            state = self._states.get(lease.id)
+            if state:
+                state.successes += 1
+                state.consecutive_throttles = 0
+
+    def report_throttle(self, lease, status_code=None):
+        """403/429：该 Cookie 降速并冷却，连续被限流时冷却时间翻倍"""
+        lease.rate.on_throttle(status_code)
+        with self._lock:
+            state = self._states.get(lease.id)
+            if state is None:
+                return
+            state.throttles += 1
+            state.consecutive_throttles += 1
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** (state.consecutive_throttles - 1))
+            state.cooldown_until = time.time() + cooldown
+        print(f"[COOKIE] {lease.label} 被限制 {status_code or ''}，冷却 {cooldown:.0f} 秒")
+
+    def report_failure(self, lease, status_code=None):
+        """401 视为登录失效并停用；其他错误（超时等）只降速"""
+        if status_code == 401:
+            with self._lock:
+                state = self._states.get(lease.id)
+                if state:
+                    state.failures += 1
+                    state.invalid = True
+            print(f"[COOKIE] {lease.label} 登录已失效，停用")
+            return
+        lease.rate.on_timeout()
+        with self._lock:
+            state = self._states.get(lease.id)
+            if state:
+                state.failures += 1
+
+    # ---------------- 统计 ----------------
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            cookies = [s.to_dict(now) for s in self._states.values()]
+            available = sum(1 for s in self._states.values() if s.available_at(now) == 0)
+        return {"total": len(cookies), "available": available, "cookies": cookies}
+
+    def rate_stats(self):
+        """各账号速率控制器的状态：{账号标签: AIMDRateController.stats()}"""
+        with self._lock:
+            states = [s for s in self._states.values() if s.enabled and not s.invalid]
+        return {s.label: s.rate.stats() for s in states}
@@ -0,0 +1,154 @@
+# spiders/http_cache.py
+"""
+持久化 HTTP 响应缓存（SQLite）
+- 以规范化后的 URL 为 key（查询参数排序），与 User-Agent、Cookie 等请求头无关
+- 每条缓存有 TTL，过期后视为未命中
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+- 记录命中/未命中/写入/淘汰次数
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import orjson  # 可选依赖，安装后缓存命中时解码更快
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def normalize_url(url):
+    """规范化 URL：scheme/host 小写，查询参数按 key 排序，去掉 fragment"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+class ResponseCache:
+    """基于 SQLite 的 JSON 响应缓存（线程安全，首次使用时才创建数据库文件）"""
+
+    def __init__(self, path, ttl=6 * 3600, max_bytes=200 * 1024 * 1024):
+        """
+        :param path: SQLite 文件路径
+        :param ttl: 缓存有效期（秒）
+        :param max_bytes: 缓存总大小上限（字节），超过后按 LRU 淘汰
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._conn = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "  key TEXT PRIMARY KEY,"
+                "  body TEXT NOT NULL,"
+                "  size INTEGER NOT NULL,"
+                "  created_at REAL NOT NULL,"
+                "  accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON responses (created_at)")
+            self._conn.commit()
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+            self._total_bytes = row[0]
+        return self._conn
+
+    def get(self, url):
+        """读取未过期的缓存，未命中返回 None"""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT body, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, size, created_at = row
+            if now - created_at > self.ttl:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+        return _json_loads(body)
+
+    def set(self, url, data):
+        """写入缓存，必要时淘汰最久未访问的条目"""
+        key = normalize_url(url)
+        body = json.dumps(data, ensure_ascii=False)
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, size, now, now),
+            )
+            self._total_bytes += size
+            self.stores += 1
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        """淘汰过期条目，再按 LRU 淘汰直到总大小不超过上限"""
+        deadline = time.time() - self.ttl
+        expired = db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE created_at < ?",
+                             (deadline,)).fetchone()
+        if expired[1]:
+            db.execute("DELETE FROM responses WHERE created_at < ?", (deadline,))
+            self._total_bytes -= expired[0]
+            self.evictions += expired[1]
+        while self._total_bytes > self.max_bytes:
+            rows = db.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 50").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for key, size in rows:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM responses")
+            db.commit()
+            self._total_bytes = 0
+
+    def stats(self):
+        """命中率和容量统计"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,62 @@
+# spiders/http_fixtures.py
+"""
+HTTP 响应录制/回放用的 fixture 文件
+- FixtureRecorder：把真实请求得到的 JSON 响应逐个写成文件（{"url", "recorded_at", "body"}）
+- load_fixtures：读取目录下的全部 fixture，按规范化 URL 索引，供本地回放服务器和基准测试使用
+"""
+import os
+import json
+import time
+import glob
+import hashlib
+import threading
+from urllib.parse import urlsplit
+
+from spiders.http_cache import normalize_url
+
+
+def fixture_name(url):
+    """fixture 文件名：接口路径最后一段 + 规范化 URL 的哈希"""
+    key = normalize_url(url)
+    path = urlsplit(key).path.rstrip("/").rsplit("/", 1)[-1] or "root"
+    return f"{path}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+class FixtureRecorder:
+    """把响应写入 fixture 目录（线程安全，同一 URL 覆盖写入）"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def record(self, url, data):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, fixture_name(url))
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "recorded_at": time.time(), "body": data}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.recorded += 1
+        except Exception as e:
+            print(f"[FIXTURE] 录制失败: {e}")
+
+
+def load_fixtures(directory):
+    """
+    读取 fixture 目录
+    :return: {规范化URL: 响应JSON}
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.json"), recursive=True)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[FIXTURE] 读取失败 {path}: {e}")
+            continue
+        if isinstance(data, dict) and "url" in data and "body" in data:
+            fixtures[normalize_url(data["url"])] = data["body"]
+    return fixtures
@@ -0,0 +1,239 @@
+# spiders/proxy_pool.py
+"""
+代理IP池
+- 后台线程按需从代理API预取，爬虫线程取代理时不再阻塞在API请求上
+- 按成功率和延迟EWMA给每个代理打分，优先分配得分最高的代理
+- 连续失败达到阈值的代理熔断一段时间，冷却后再放行试探
+- 提供每个代理及每个来源（静态列表/API服务商）的统计，便于淘汰慢的服务商
+"""
+import time
+import threading
+from urllib.parse import urlsplit
+
+from utils.http_client import http_client
+
+
+class ProxyStats:
+    """单个代理的健康统计"""
+
+    def __init__(self, proxy, source):
+        self.proxy = proxy
+        self.source = source
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_ewma = None
+        self.open_until = 0.0  # 熔断截止时间
+        self.added_at = time.time()
+        self.last_used = 0.0
+
+    def success_rate(self):
+        # 拉普拉斯平滑，新代理按 50% 估计
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def score(self, default_latency):
+        latency = self.latency_ewma if self.latency_ewma is not None else default_latency
+        return self.success_rate() / max(latency, 0.05)
+
+    def is_open(self, now):
+        return now < self.open_until
+
+    def to_dict(self, now):
+        return {
+            "proxy": self.proxy,
+            "source": self.source,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate(), 3),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "circuit_open": self.is_open(now),
+            "open_seconds_left": round(max(0.0, self.open_until - now), 1),
+        }
+
+
+class ProxyPool:
+    """代理IP池管理器（线程安全）"""
+
+    def __init__(self, static_proxies=None, api_url="", enabled=False, min_available=3,
+                 refill_interval=5.0, api_timeout=5, api_proxy_ttl=180, max_size=50,
+                 failure_threshold=3, cooldown=60.0, ewma_alpha=0.3):
+        """
+        :param static_proxies: 静态代理列表（http://ip:port）
+        :param api_url: 代理API地址（每次调用返回一个 ip:port）
+        :param enabled: 是否启用代理，未启用时 get_proxy 始终返回 None
+        :param min_available: 可用代理少于该数量时后台从API补充
+        :param refill_interval: 后台补充的检查间隔（秒）
+        :param api_timeout: 调用代理API的超时（秒）
+        :param api_proxy_ttl: API获取的代理的存活时间（秒），过期后丢弃
+        :param max_size: 池中最多保留的代理数，超出时淘汰得分最低的API代理
+        :param failure_threshold: 连续失败多少次后熔断
+        :param cooldown: 熔断时长（秒）
+        :param ewma_alpha: 延迟EWMA的平滑系数
+        """
+        self.api_url = api_url
+        self.enabled = enabled
+        self.min_available = min_available
+        self.refill_interval = refill_interval
+        self.api_timeout = api_timeout
+        self.api_proxy_ttl = api_proxy_ttl
+        self.max_size = max_size
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._proxies = {}
+        self._refill_event = threading.Event()
+        self._thread = None
+        for proxy in static_proxies or []:
+            self._proxies[proxy] = ProxyStats(proxy, "static")
+
+    # ---------------- 分配 ----------------
+
+    def get_proxy(self):
+        """
+        取一个当前得分最高且未熔断的代理（不阻塞）
+        :return: requests 的 proxies 字典；无可用代理时返回 None（直连）
+        """
+        if not self.enabled:
+            return None
+        self._ensure_refiller()
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            candidates = [s for s in self._proxies.values() if not s.is_open(now)]
+            if len(candidates) < self.min_available:
+                self._refill_event.set()
+            if not candidates:
+                print("[PROXY] 无可用代理，使用直连")
+                return None
+            default_latency = self._median_latency()
+            best = max(candidates, key=lambda s: (s.score(default_latency), -s.last_used))
+            best.last_used = now
+        return {"http": best.proxy, "https": best.proxy}
+
+    def report_success(self, proxy_dict, latency):
+        """记录一次成功请求及其耗时（秒）"""
+        stats = self._lookup(proxy_dict)
+        if stats is None:
+            return
+        with self._lock:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            if stats.latency_ewma is None:
+                stats.latency_ewma = latency
+            else:
+                stats.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * stats.latency_ewma
+
+    def mark_failed(self, proxy_dict):
+        """记录一次失败，连续失败达到阈值后熔断"""
+        stats = self._lookup(proxy_dict)
+        if stats is None:
+            return
+        with self._lock:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if stats.consecutive_failures >= self.failure_threshold:
+                stats.open_until = time.time() + self.cooldown
+                print(f"[PROXY] 代理连续失败 {stats.consecutive_failures} 次，熔断 {self.cooldown:.0f} 秒: {stats.proxy}")
+            else:
+                print(f"[PROXY] 标记代理失败: {stats.proxy}")
+
+    def _lookup(self, proxy_dict):
+        if not proxy_dict:
+            return None
+        proxy = proxy_dict.get("http", "")
+        with self._lock:
+            return self._proxies.get(proxy)
+
+    # ---------------- 后台补充 ----------------
+
+    def _ensure_refiller(self):
+        if not self.api_url or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refill_loop, name="proxy-refill", daemon=True)
+                self._thread.start()
+                self._refill_event.set()
+
+    def _refill_loop(self):
+        while True:
+            self._refill_event.wait(self.refill_interval)
+            self._refill_event.clear()
+            try:
+                while self._available_count() < self.min_available:
+                    if not self._fetch_from_api():
+                        break
+            except Exception as e:
+                print(f"[PROXY] 后台补充代理异常: {e}")
+
+    def _available_count(self):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            return sum(1 for s in self._proxies.values() if not s.is_open(now))
+
+    def _fetch_from_api(self):
+        """调用一次代理API，成功加入池中返回 True"""
+        try:
+            # 后台补充线程会按间隔再次调用，这里不重试
+            resp = http_client.get(self.api_url, timeout=self.api_timeout, retries=0)
+            if resp.status_code != 200:
+                print(f"[PROXY] 代理API返回 {resp.status_code}")
+                return False
+            proxy = resp.text.strip()
+            if not proxy or ":" not in proxy:
+                return False
+            if not proxy.startswith("http"):
+                proxy = f"http://{proxy}"
+        except Exception as e:
+            print(f"[PROXY] API获取代理失败: {e}")
+            return False
+        with self._lock:
+            if proxy not in self._proxies:
+                self._proxies[proxy] = ProxyStats(proxy, urlsplit(self.api_url).netloc or "api")
+                print(f"[PROXY] 从API获取代理: {proxy}")
+            self._trim()
+        return True
+
+    def _expire(self, now):
+        """丢弃过期的API代理（调用方持有锁）"""
+        for proxy, stats in list(self._proxies.items()):
+            if stats.source != "static" and now - stats.added_at > self.api_proxy_ttl:
+                del self._proxies[proxy]
+
+    def _trim(self):
+        """超过容量时淘汰得分最低的API代理（调用方持有锁）"""
+        dynamic = [s for s in self._proxies.values() if s.source != "static"]
+        overflow = len(self._proxies) - self.max_size
+        if overflow <= 0 or not dynamic:
+            return
+        default_latency = self._median_latency()
+        dynamic.sort(key=lambda s: s.score(default_latency))
+        for stats in dynamic[:overflow]:
+            del self._proxies[stats.proxy]
+
+    def _median_latency(self):
+        latencies = sorted(s.latency_ewma for s in self._proxies.values() if s.latency_ewma is not None)
+        return latencies[len(latencies) // 2] if latencies else 1.0
+
+    # ---------------- 统计 ----------------
+
+    def stats(self):
+        """每个代理及每个来源的统计"""
+        now = time.time()
+        with self._lock:
+            proxies = [s.to_dict(now) for s in self._proxies.values()]
+        sources = {}
+        for item in proxies:
+            src = sources.setdefault(item["source"], {"proxies": 0, "successes": 0, "failures": 0, "latencies": []})
+            src["proxies"] += 1
+            src["successes"] += item["successes"]
+            src["failures"] += item["failures"]
+            if item["latency_ewma"] is not None:
+                src["latencies"].append(item["latency_ewma"])
+        for src in sources.values():
+            latencies = src.pop("latencies")
+            src["avg_latency"] = round(sum(latencies) / len(latencies), 3) if latencies else None
+        proxies.sort(key=lambda x: (x["circuit_open"], -x["success_rate"]))
+        return {"enabled": self.enabled, "proxies": proxies, "sources": sources}
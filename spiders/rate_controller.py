@@ -0,0 +1,102 @@
+# spiders/rate_controller.py
+"""
+自适应请求速率控制器（AIMD：加性增、乘性减）
+- 请求正常返回（200）时逐步提速：rate += increase_step
+- 被限流（403/429）或超时时立即减速：rate *= decrease_factor，并冷却一个新的请求间隔
+所有线程共享同一个控制器，两次请求的发起间隔为 1/rate（带少量随机抖动）
+"""
+import time
+import random
+import threading
+
+
+class AIMDRateController:
+    """AIMD 速率控制器（线程安全），rate 单位为 请求/秒"""
+
+    def __init__(self, initial_rate=0.33, min_rate=0.05, max_rate=1.0,
+                 increase_step=0.02, decrease_factor=0.5, jitter=0.2, name=""):
+        """
+        :param initial_rate: 初始速率（请求/秒）
+        :param min_rate: 速率下限，连续被限流时最慢每 1/min_rate 秒一次请求
+        :param max_rate: 速率上限，正常情况下也不会超过该值
+        :param increase_step: 每次成功请求后增加的速率
+        :param decrease_factor: 被限流/超时后速率乘以该系数
+        :param jitter: 请求间隔的随机抖动比例（±jitter），避免请求节奏过于规律
+        :param name: 日志中显示的名称
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.jitter = jitter
+        self.name = name
+        self._rate = min(max(initial_rate, min_rate), max_rate)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._successes = 0
+        self._throttles = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+
+    @property
+    def rate(self):
+        """当前速率（请求/秒）"""
+        return self._rate
+
+    def _interval(self):
+        base = 1.0 / self._rate
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def acquire(self):
+        """
+        阻塞直到允许发起下一次请求
+        :return: 实际等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval()
+            wait = slot - now
+            self._total_wait += wait
+        if wait > 0:
+            print(f"[RATE]{self._tag()} 等待 {wait:.1f} 秒 (当前速率 {self._rate:.2f} 次/秒)")
+            time.sleep(wait)
+        return wait
+
+    def on_success(self):
+        """请求成功：加性增"""
+        with self._lock:
+            self._successes += 1
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def on_throttle(self, status_code=None):
+        """被限流（403/429）：乘性减，并冷却一个新的请求间隔"""
+        with self._lock:
+            self._throttles += 1
+            self._backoff()
+        print(f"[RATE]{self._tag()} 被限制 {status_code or ''}，速率降至 {self._rate:.2f} 次/秒")
+
+    def on_timeout(self):
+        """请求超时或连接失败：与限流同样处理"""
+        with self._lock:
+            self._timeouts += 1
+            self._backoff()
+        print(f"[RATE]{self._tag()} 请求超时，速率降至 {self._rate:.2f} 次/秒")
+
+    def _backoff(self):
+        self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+        self._next_slot = max(self._next_slot, time.monotonic() + self._interval())
+
+    def stats(self):
+        """当前速率和累计统计"""
+        return {
+            "rate": round(self._rate, 3),
+            "interval_seconds": round(1.0 / self._rate, 2),
+            "successes": self._successes,
+            "throttles": self._throttles,
+            "timeouts": self._timeouts,
+            "total_wait_seconds": round(self._total_wait, 1),
+        }
+
+    def _tag(self):
+        return f"[{self.name}]" if self.name else ""
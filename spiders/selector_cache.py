@@ -0,0 +1,123 @@
+# spiders/selector_cache.py
+"""
+选择器命中缓存
+页面改版后候选选择器列表里靠前的可能一直找不到，每篇笔记都要先等完它们的超时才轮到能用的那个。
+这里按字段记录每个选择器的命中情况：
+- 上次命中的选择器排在最前，其余按命中率排序
+- 连续未命中达到 DEMOTE_AFTER 次的选择器降级：排到最后，且只做即时检查（超时 0），不再等待
+- 降级的选择器一旦再次命中即恢复
+"""
+import time
+import threading
+
+DEMOTE_AFTER = 3    # 连续未命中多少次后降级
+
+
+class _SelectorStats:
+    def __init__(self, selector, position):
+        self.selector = selector
+        self.position = position     # 在原候选列表中的位置，命中率相同时保持原顺序
+        self.hits = 0
+        self.misses = 0
+        self.consecutive_misses = 0
+        self.total_latency = 0.0
+
+    @property
+    def demoted(self):
+        return self.consecutive_misses >= DEMOTE_AFTER
+
+    def to_dict(self):
+        tries = self.hits + self.misses
+        return {
+            "selector": self.selector,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / tries, 3) if tries else None,
+            "avg_latency": round(self.total_latency / tries, 3) if tries else None,
+            "demoted": self.demoted,
+        }
+
+
+class SelectorCache:
+    """按字段记录选择器命中情况并给出尝试顺序（线程安全）"""
+
+    def __init__(self):
+        self._fields = {}   # 字段 -> {"last": 上次命中的选择器, "selectors": {选择器: _SelectorStats}}
+        self._lock = threading.Lock()
+
+    def _field(self, field, selectors):
+        entry = self._fields.get(field)
+        if entry is None:
+            entry = self._fields[field] = {"last": None, "selectors": {}}
+        for position, selector in enumerate(selectors):
+            if selector not in entry["selectors"]:
+                entry["selectors"][selector] = _SelectorStats(selector, position)
+        return entry
+
+    def order(self, field, selectors):
+        """
+        本次的尝试顺序
+        :return: [(选择器, 是否已降级)]
+        """
+        with self._lock:
+            entry = self._field(field, selectors)
+            stats = [entry["selectors"][s] for s in selectors]
+            last = entry["last"]
+
+            # 上次命中的选择器不降级（页面本身没有该内容时所有选择器都会未命中，例如没有评论的笔记）
+            def demoted(s):
+                return s.demoted and s.selector != last
+
+            def rank(s):
+                tries = s.hits + s.misses
+                hit_rate = s.hits / tries if tries else 0.5   # 没试过的排在命中率高和低的之间
+                return (demoted(s), s.selector != last, -hit_rate, s.position)
+
+            return [(s.selector, demoted(s)) for s in sorted(stats, key=rank)]
+
+    def report(self, field, selector, hit, latency):
+        with self._lock:
+            entry = self._fields.get(field)
+            if entry is None or selector not in entry["selectors"]:
+                return
+            s = entry["selectors"][selector]
+            s.total_latency += latency
+            if hit:
+                if s.demoted:
+                    print(f"[SELECTOR] {field}: {selector} 恢复命中")
+                s.hits += 1
+                s.consecutive_misses = 0
+                entry["last"] = selector
+            else:
+                s.misses += 1
+                s.consecutive_misses += 1
+                if s.consecutive_misses == DEMOTE_AFTER:
+                    print(f"[SELECTOR] {field}: {selector} 连续 {DEMOTE_AFTER} 次未命中，降级")
+
+    def find(self, field, selectors, fetch, timeout):
+        """
+        按缓存顺序尝试选择器，返回第一个有效结果
+        :param fetch: fetch(selector, timeout) -> 结果，未找到或结果无效时返回 None/空值；抛出异常视为未命中
+        :param timeout: 每个选择器的等待时间；已降级的选择器只做即时检查
+        :return: 结果；全部未命中时返回 None
+        """
+        for selector, demoted in self.order(field, selectors):
+            started = time.monotonic()
+            try:
+                result = fetch(selector, 0 if demoted else timeout)
+            except Exception:
+                result = None
+            self.report(field, selector, bool(result), time.monotonic() - started)
+            if result:
+                return result
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                field: {
+                    "last_hit": entry["last"],
+                    "selectors": [s.to_dict() for s in entry["selectors"].values()],
+                }
+                for field, entry in self._fields.items()
+            }
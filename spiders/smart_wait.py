@@ -0,0 +1,118 @@
+# spiders/smart_wait.py
+"""
+基于页面状态的等待（代替固定 sleep）
+- wait_until：轮询条件，满足即返回，最长等待 ceiling 秒
+- 常用条件：元素出现/消失、元素数量或内容变化、网络空闲（performance 资源条目数量在一段时间内不再变化）
+- WaitStats：按等待类型统计实际等待时间，与原来的固定等待时间（baseline）比较得出节省的时间；
+  同时按线程记录当前笔记的节省时间，便于逐篇输出
+"""
+import time
+import threading
+
+POLL_INTERVAL = 0.1
+
+
+def wait_until(condition, ceiling, interval=POLL_INTERVAL):
+    """
+    轮询直到 condition() 为真或超过 ceiling 秒
+    :return: (是否满足, 实际等待秒数)
+    """
+    started = time.monotonic()
+    deadline = started + ceiling
+    while True:
+        try:
+            if condition():
+                return True, time.monotonic() - started
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return False, time.monotonic() - started
+        time.sleep(interval)
+
+
+def ele_present(page, *selectors):
+    """条件：任一元素出现"""
+    return lambda: any(page.ele(selector, timeout=0) for selector in selectors)
+
+
+def ele_absent(page, *selectors):
+    """条件：所有元素都已消失（例如详情弹窗关闭）"""
+    return lambda: not any(page.ele(selector, timeout=0) for selector in selectors)
+
+
+def value_changes(value_fn, base=None):
+    """条件：value_fn() 与 base（默认取创建条件时的值）不同，例如列表长度或最后一项变化"""
+    base = value_fn() if base is None else base
+    return lambda: value_fn() != base
+
+
+def network_idle(page, quiet=0.5):
+    """条件：页面在 quiet 秒内没有新的网络请求（按 performance 资源条目数量判断）"""
+    state = {"count": -1, "since": time.monotonic()}
+
+    def check():
+        count = page.run_js("return performance.getEntriesByType('resource').length;")
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return now - state["since"] >= quiet
+
+    return check
+
+
+class WaitStats:
+    """等待时间统计（线程安全）"""
+
+    def __init__(self):
+        self._totals = {}   # 名称 -> {"count", "waited", "baseline", "timeouts"}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def wait(self, name, condition, ceiling, baseline):
+        """
+        等待条件并记录
+        :param name: 等待类型，如 "detail_open"
+        :param ceiling: 最长等待秒数
+        :param baseline: 原来这一步固定等待的秒数，用于计算节省的时间
+        :return: 是否在 ceiling 内满足条件
+        """
+        ok, waited = wait_until(condition, ceiling)
+        self.record(name, waited, baseline, ok)
+        return ok
+
+    def record(self, name, waited, baseline, ok=True):
+        with self._lock:
+            entry = self._totals.setdefault(name, {"count": 0, "waited": 0.0, "baseline": 0.0, "timeouts": 0})
+            entry["count"] += 1
+            entry["waited"] += waited
+            entry["baseline"] += baseline
+            if not ok:
+                entry["timeouts"] += 1
+        self._local.saved = getattr(self._local, "saved", 0.0) + baseline - waited
+
+    def begin_note(self):
+        """开始统计当前线程的一篇笔记"""
+        self._local.saved = 0.0
+
+    def note_saved(self):
+        """当前线程自 begin_note 以来节省的秒数（可能为负，即比固定等待更久）"""
+        return getattr(self._local, "saved", 0.0)
+
+    def saved_total(self):
+        with self._lock:
+            return sum(e["baseline"] - e["waited"] for e in self._totals.values())
+
+    def stats(self):
+        with self._lock:
+            waits = {
+                name: {
+                    "count": e["count"],
+                    "avg_wait": round(e["waited"] / e["count"], 3) if e["count"] else 0,
+                    "baseline": round(e["baseline"] / e["count"], 3) if e["count"] else 0,
+                    "saved_seconds": round(e["baseline"] - e["waited"], 1),
+                    "timeouts": e["timeouts"],
+                }
+                for name, e in self._totals.items()
+            }
+        return {"saved_seconds": round(sum(w["saved_seconds"] for w in waits.values()), 1), "waits": waits}
@@ -0,0 +1,140 @@
+# spiders/strategy_stats.py
+"""
+搜索策略产出统计
+按关键词记录每个搜索策略的请求页数、遍历条数和新增条数（另有全部关键词汇总 "*"），持久化到 JSON 文件。
+后续爬取同一关键词时按"每页新增条数"对策略重新排序，并跳过近期产出过低的策略，
+把有限的请求配额留给真正能带来新数据的策略
+新增条数由调用方按与执行顺序无关的方式计算（同一条目被多个策略返回时平分），
+被跳过的策略仍按 probe_rate 的概率排在最后试探，产出回升后不再被跳过
+"""
+import os
+import json
+import time
+import random
+import threading
+
+ALL_KEYWORDS = "*"
+
+
+def strategy_key(strategy):
+    """(search_type, time_interval, sort) -> 'search_type|time_interval|sort'"""
+    return "|".join(strategy)
+
+
+class StrategyStats:
+    """策略产出统计（线程安全），首次访问时才读取文件"""
+
+    def __init__(self, path, min_pages=4, skip_yield=0.5, skip_ttl=7 * 24 * 3600,
+                 prior_pages=2, prior_new=20, probe_rate=0.1):
+        """
+        :param path: JSON 文件路径
+        :param min_pages: 某策略累计请求页数达到该值后才允许被跳过
+        :param skip_yield: 每页新增条数低于该值的策略会被跳过
+        :param skip_ttl: 跳过决定的有效期（秒），超过后重新尝试该策略
+        :param prior_pages: 平滑用的先验页数
+        :param prior_new: 平滑用的先验新增条数（默认按每页新增10条估计，未统计过的策略排在前面试探）
+        :param probe_rate: 应跳过的策略仍被安排执行（排在最后）的概率，用于重新测量其产出
+        """
+        self.path = path
+        self.min_pages = min_pages
+        self.skip_yield = skip_yield
+        self.skip_ttl = skip_ttl
+        self.prior_pages = prior_pages
+        self.prior_new = prior_new
+        self.probe_rate = probe_rate
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._data = json.load(f)
+                except Exception as e:
+                    print(f"[STATS] 读取策略统计失败: {e}")
+        return self._data
+
+    def record(self, keyword, strategy, pages, fetched, new):
+        """累加一次策略执行的产出（new 可以是小数，见模块说明）"""
+        if pages <= 0:
+            return
+        key = strategy_key(strategy)
+        now = time.time()
+        with self._lock:
+            data = self._load()
+            for kw in (keyword, ALL_KEYWORDS):
+                entry = data.setdefault(kw, {}).setdefault(key, {"pages": 0, "fetched": 0, "new": 0, "runs": 0})
+                entry["pages"] += pages
+                entry["fetched"] += fetched
+                entry["new"] = round(entry["new"] + new, 2)
+                entry["runs"] += 1
+                entry["updated_at"] = now
+
+    def _yield(self, entry):
+        return (entry["new"] + self.prior_new) / (entry["pages"] + self.prior_pages)
+
+    def plan(self, keyword, strategies):
+        """
+        按历史产出排序策略
+        :return: (ordered, skipped)，均为 [(策略序号, 策略)]；没有统计的策略保持原顺序并排在已知低产出策略之前，
+                 抽中试探的低产出策略排在最后
+        """
+        with self._lock:
+            data = self._load()
+            kw_stats = data.get(keyword, {})
+            all_stats = data.get(ALL_KEYWORDS, {})
+            now = time.time()
+            scored = []
+            skipped = []
+            probes = []
+            for idx, strategy in enumerate(strategies):
+                key = strategy_key(strategy)
+                entry = kw_stats.get(key)
+                if entry is None:
+                    # 新关键词：参考全部关键词的汇总产出，不据此跳过
+                    entry = all_stats.get(key)
+                    score = self._yield(entry) if entry else self.prior_new / self.prior_pages
+                    scored.append((score, idx, strategy))
+                    continue
+                recent = now - entry.get("updated_at", 0) < self.skip_ttl
+                if recent and entry["pages"] >= self.min_pages and entry["new"] / entry["pages"] < self.skip_yield:
+                    if random.random() < self.probe_rate:
+                        probes.append((idx, strategy))
+                    else:
+                        skipped.append((idx, strategy))
+                    continue
+                scored.append((self._yield(entry), idx, strategy))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(idx, strategy) for _, idx, strategy in scored] + probes, skipped
+
+    def get(self, keyword=None):
+        """返回某关键词（默认全部关键词汇总）的各策略统计，附带每页新增条数"""
+        with self._lock:
+            data = self._load()
+            stats = data.get(keyword or ALL_KEYWORDS, {})
+            result = {}
+            for key, entry in stats.items():
+                item = dict(entry)
+                item["new_per_page"] = round(entry["new"] / entry["pages"], 2) if entry["pages"] else 0.0
+                result[key] = item
+            return result
+
+    def keywords(self):
+        with self._lock:
+            return [k for k in self._load().keys() if k != ALL_KEYWORDS]
+
+    def flush(self):
+        """写回文件"""
+        with self._lock:
+            if self._data is None:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"[STATS] 保存策略统计失败: {e}")
@@ -0,0 +1,238 @@
+# spiders/xhs_capture.py
+"""
+小红书网络拦截模式
+通过浏览器的网络监听（DrissionPage page.listen）直接读取页面自己请求的接口 JSON，代替逐个选择器读取 DOM：
+- 搜索结果接口：笔记ID、xsec_token、标题、作者、精确点赞数
+- 笔记详情接口：正文、发布时间、作者
+- 评论分页接口：每页约 10 条评论及楼中楼，滚动评论区触发下一页，不再受 DOM 只取前10条的限制
+未捕获到接口数据时由调用方回退到 DOM 读取
+"""
+import time
+import datetime
+from urllib.parse import urlsplit, parse_qs, quote
+
+XHS_API_SEARCH = "/api/sns/web/v1/search/notes"
+XHS_API_FEED = "/api/sns/web/v1/feed"
+XHS_API_COMMENTS = "/api/sns/web/v2/comment/page"
+XHS_NOTE_URL = "https://www.xiaohongshu.com/explore/{id}"
+
+CAPTURE_MAX_COMMENTS = 100     # 每篇笔记最多读取的评论数（含楼中楼）
+CAPTURE_MAX_SCROLLS = 15       # 每篇笔记最多滚动评论区的次数
+CAPTURE_IDLE_TIMEOUT = 1.5     # 滚动后等待新数据包的时间（秒），超时视为没有更多评论
+
+
+def _body(packet):
+    """数据包的响应 JSON（小红书接口外层为 {"success", "data"}）"""
+    try:
+        body = packet.response.body
+    except Exception:
+        return None
+    if not isinstance(body, dict):
+        return None
+    return body.get("data") if isinstance(body.get("data"), dict) else None
+
+
+def _format_time(ms):
+    try:
+        return datetime.datetime.fromtimestamp(int(ms) / 1000).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return ""
+
+
+def _nickname(user):
+    user = user or {}
+    return user.get("nickname") or user.get("nick_name") or ""
+
+
+def parse_search_items(data):
+    """
+    解析搜索结果接口
+    :return: [{"id", "url", "title", "author", "like"}]，url 带 xsec_token 可直接打开详情页
+    """
+    links = []
+    for item in (data or {}).get("items") or []:
+        card = item.get("note_card") or {}
+        note_id = item.get("id")
+        if not note_id or item.get("model_type", "note") != "note":
+            continue
+        url = XHS_NOTE_URL.format(id=note_id)
+        if item.get("xsec_token"):
+            url += f"?xsec_token={quote(item['xsec_token'])}&xsec_source=pc_search"
+        links.append({
+            "id": note_id,
+            "url": url,
+            "title": card.get("display_title") or card.get("title") or "",
+            "author": _nickname(card.get("user")),
+            "like": str((card.get("interact_info") or {}).get("liked_count", "") or "0"),
+        })
+    return links
+
+
+def parse_note(data):
+    """
+    解析笔记详情接口
+    :return: (笔记ID, {"title", "content", "author", "publish_time", "likes"})；不是笔记数据时返回 (None, None)
+    """
+    items = (data or {}).get("items") or []
+    if not items:
+        return None, None
+    item = items[0]
+    card = item.get("note_card") or {}
+    if not card:
+        return None, None
+    note = {
+        "title": card.get("title") or "",
+        "content": (card.get("desc") or "").strip(),
+        "author": _nickname(card.get("user")),
+        "publish_time": _format_time(card.get("time")),
+        "likes": str((card.get("interact_info") or {}).get("liked_count", "") or ""),
+    }
+    return item.get("id") or card.get("note_id"), note
+
+
+def parse_comment_page(data):
+    """
+    解析评论分页接口
+    :return: ([(评论ID, 文本)], 是否还有下一页)，一级评论后紧跟其附带的楼中楼
+    """
+    comments = []
+    for comment in (data or {}).get("comments") or []:
+        for c in [comment] + list(comment.get("sub_comments") or []):
+            text = (c.get("content") or "").strip()
+            if text:
+                comments.append((c.get("id") or text, text))
+    return comments, bool((data or {}).get("has_more"))
+
+
+class _CapturedNote:
+    def __init__(self, seq):
+        self.seq = seq          # 首次捕获到该笔记数据时的序号（单调递增，不随其他笔记被取走而变化）
+        self.note = None
+        self.comments = {}      # 评论ID -> 文本（保持顺序）
+        self.comment_pages = 0
+        self.has_more = True
+
+
+class XhsCapture:
+    """
+    单个标签页的接口数据捕获（只在创建它的线程中使用）
+    start() 之后页面发出的搜索/详情/评论请求都会被记录，poll() 读取并按笔记ID归类
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.feed = {}           # 笔记ID -> 搜索结果中的链接和基本信息
+        self._notes = {}         # 笔记ID -> _CapturedNote
+        self._seq = 0            # 下一个新笔记的序号
+        self._collected = set()  # 已被 collect_note 取走的笔记ID，之后迟到的数据包忽略
+        self.packets = 0
+        self.listening = False
+
+    def start(self):
+        try:
+            self.page.listen.start([XHS_API_SEARCH, XHS_API_FEED, XHS_API_COMMENTS])
+            self.listening = True
+        except Exception as e:
+            print(f"[CAPTURE] 启动网络监听失败，使用 DOM 读取: {e}")
+        return self.listening
+
+    def stop(self):
+        if self.listening:
+            try:
+                self.page.listen.stop()
+            except Exception:
+                pass
+            self.listening = False
+
+    def poll(self, timeout=0.0):
+        """读取已到达的数据包；timeout>0 时等待新数据包，连续 timeout 秒没有新包后返回。返回本次处理的包数"""
+        if not self.listening:
+            return 0
+        count = 0
+        try:
+            for packet in self.page.listen.steps(timeout=max(timeout, 0.05)):
+                count += 1
+                self._handle(packet)
+        except Exception as e:
+            print(f"[CAPTURE] 读取数据包失败: {e}")
+        self.packets += count
+        return count
+
+    def _note(self, note_id):
+        """笔记ID对应的捕获记录；已取走的笔记返回 None"""
+        if note_id in self._collected:
+            return None
+        entry = self._notes.get(note_id)
+        if entry is None:
+            entry = self._notes[note_id] = _CapturedNote(self._seq)
+            self._seq += 1
+        return entry
+
+    def _handle(self, packet):
+        data = _body(packet)
+        if data is None:
+            return
+        path = urlsplit(packet.url).path
+        if path.endswith(XHS_API_SEARCH):
+            for link in parse_search_items(data):
+                self.feed.setdefault(link["id"], link)
+        elif path.endswith(XHS_API_FEED):
+            note_id, note = parse_note(data)
+            entry = self._note(note_id) if note_id else None
+            if entry is not None:
+                entry.note = note
+        elif path.endswith(XHS_API_COMMENTS):
+            note_id = (parse_qs(urlsplit(packet.url).query).get("note_id") or [""])[0]
+            entry = self._note(note_id) if note_id else None
+            if entry is not None:
+                comments, entry.has_more = parse_comment_page(data)
+                entry.comment_pages += 1
+                for comment_id, text in comments:
+                    entry.comments.setdefault(comment_id, text)
+
+    def mark(self):
+        """记录当前序号，collect_note 未指定笔记ID时取此后第一个出现的笔记"""
+        return self._seq
+
+    def collect_note(self, note_id=None, scroll=None, max_comments=CAPTURE_MAX_COMMENTS, since=None,
+                     deadline=None):
+        """
+        等待并收集一篇笔记的详情和评论，评论不够时调用 scroll() 触发下一页
+        :param note_id: 笔记ID；未知时取 since 之后第一个捕获到的笔记
+        :param scroll: 滚动评论区的函数
+        :param deadline: time.monotonic() 截止时间
+        :return: {"note": 详情字段或None, "comments": [文本], "pages": 评论页数}；什么都没捕获到时返回 None
+        """
+        # 首屏：详情和第一页评论
+        self.poll(CAPTURE_IDLE_TIMEOUT)
+        note_id = note_id if note_id in self._notes else self._first_since(since, note_id)
+        idle_scrolls = 0
+        for _ in range(CAPTURE_MAX_SCROLLS):
+            entry = self._notes.get(note_id)
+            if entry is not None and (len(entry.comments) >= max_comments or not entry.has_more):
+                break
+            if scroll is None or idle_scrolls >= 2 or (deadline and time.monotonic() > deadline):
+                break
+            pages = entry.comment_pages if entry else 0
+            scroll()
+            self.poll(CAPTURE_IDLE_TIMEOUT)
+            note_id = note_id if note_id in self._notes else self._first_since(since, note_id)
+            entry = self._notes.get(note_id)
+            idle_scrolls = idle_scrolls + 1 if not entry or entry.comment_pages == pages else 0
+
+        entry = self._notes.pop(note_id, None)
+        if entry is None:
+            return None
+        self._collected.add(note_id)
+        return {
+            "note": entry.note,
+            "comments": list(entry.comments.values())[:max_comments],
+            "pages": entry.comment_pages,
+        }
+
+    def _first_since(self, since, default):
+        """序号不小于 since 的笔记中最早出现的一篇"""
+        if since is None:
+            return default
+        candidates = [(entry.seq, note_id) for note_id, entry in self._notes.items() if entry.seq >= since]
+        return min(candidates)[1] if candidates else default
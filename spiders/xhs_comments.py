@@ -0,0 +1,186 @@
+# spiders/xhs_comments.py
+"""
+小红书评论区分页读取（DOM）
+原来滚动 3 次后只取前 10 条评论，热门笔记的大部分评论读不到。这里持续加载直到评论读完或达到单篇预算：
+- 每轮执行一次页面脚本，只读取上一轮之后新出现的评论元素（读过的打上 data-crawl-seen 标记），
+  不重复读取整个评论区的文本
+- 同一轮点击可见的“展开更多回复”按钮（每个只点一次），没有可展开的回复时滚动评论区加载下一页
+- 出现 THE END 标记、连续几轮没有新评论、达到条数或时间预算时停止
+- 边读边按评论ID去重（元素没有ID时按文本），逐条 yield
+"""
+import json
+import time
+
+from spiders.smart_wait import wait_until
+
+COMMENT_MAX_COUNT = 200        # 每篇笔记最多读取的评论数（含楼中楼）
+COMMENT_MAX_SECONDS = 20       # 每篇笔记读取评论的最长时间（秒）
+COMMENT_IDLE_ROUNDS = 2        # 连续多少轮滚动/展开后没有新评论则认为已读完
+COMMENT_WAIT_CEILING = 1.0     # 每轮滚动/展开后等待新评论出现的最长时间（秒）
+COMMENT_BATCH = 50             # 每轮脚本最多返回的评论数
+COMMENT_EXPAND_PER_ROUND = 5   # 每轮最多点击的“展开更多回复”按钮数
+COMMENT_MORE_SELECTORS = ".show-more, .reply-container .show-more"
+COMMENT_END_SELECTORS = ".end-container, .no-comments"
+
+# 公共部分：按选择器取评论元素（CSS 或 XPath）
+_MATCH_JS = r"""
+const [kind, expr] = arguments;
+const match = () => {
+    if (kind !== 'xpath') return Array.from(document.querySelectorAll(expr));
+    const found = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const items = [];
+    for (let i = 0; i < found.snapshotLength; i++) items.push(found.snapshotItem(i));
+    return items;
+};
+"""
+
+# 未读取的评论元素数（total=true 时为全部匹配数）
+_COUNT_JS = _MATCH_JS + r"""
+const total = arguments[2];
+return match().filter(el => total || !el.hasAttribute('data-crawl-seen')).length;
+"""
+
+# 一轮读取：新评论（最多 limit 条）、点击展开按钮、是否已到底、剩余未读元素数
+_ROUND_JS = _MATCH_JS + r"""
+const [limit, moreSel, endSel, expandLimit] = Array.prototype.slice.call(arguments, 2);
+const comments = [];
+let pending = 0;
+for (const el of match()) {
+    if (el.hasAttribute('data-crawl-seen')) continue;
+    if (comments.length >= limit) { pending++; continue; }
+    el.setAttribute('data-crawl-seen', '1');
+    comments.push([el.id || el.getAttribute('data-id') || '', (el.innerText || el.textContent || '').trim()]);
+}
+let expanded = 0;
+if (!pending) {
+    for (const btn of document.querySelectorAll(moreSel)) {
+        if (expanded >= expandLimit) break;
+        if (btn.hasAttribute('data-crawl-clicked') || !btn.offsetParent) continue;
+        btn.setAttribute('data-crawl-clicked', '1');
+        btn.click();
+        expanded++;
+    }
+}
+return JSON.stringify({comments: comments, pending: pending, expanded: expanded,
+                       end: !!document.querySelector(endSel)});
+"""
+
+
+def _split_selector(selector):
+    """DrissionPage 选择器 -> (css/xpath, 表达式)"""
+    if selector.startswith(("css:", "xpath:")):
+        kind, expr = selector.split(":", 1)
+        return kind, expr
+    return "css", selector
+
+
+def _comment_text(raw):
+    """评论元素文本的第一行是作者昵称，去掉后为评论内容（与原来的 DOM 读取规则相同）"""
+    if len(raw) <= 2:
+        return ""
+    lines = raw.split('\n')
+    return '\n'.join(lines[1:]).strip() if len(lines) >= 2 else raw
+
+
+class CommentHarvester:
+    """单篇笔记的评论读取（只在创建它的线程中使用）"""
+
+    def __init__(self, page, scroll, max_count=COMMENT_MAX_COUNT, max_seconds=COMMENT_MAX_SECONDS, waits=None,
+                 wait_ceiling=COMMENT_WAIT_CEILING):
+        """
+        :param scroll: 滚动评论区的函数 scroll()
+        :param max_count: 条数预算
+        :param max_seconds: 时间预算（秒）
+        :param waits: WaitStats，传入时记录每轮等待
+        :param wait_ceiling: 每轮滚动/展开后等待新评论的最长时间（秒）
+        """
+        self.page = page
+        self.scroll = scroll
+        self.max_count = max_count
+        self.max_seconds = max_seconds
+        self.waits = waits
+        self.wait_ceiling = wait_ceiling
+        self.count = 0
+        self.rounds = 0
+        self.expanded = 0
+        self.duplicates = 0
+        self.stop_reason = ""
+        self._seen = set()       # 已产出的评论文本
+        self._seen_ids = set()   # 已产出的评论元素ID
+
+    def probe(self, selector, timeout=0):
+        """selector 是否能匹配到评论元素（供 selector_cache.find 使用），匹配时返回 selector"""
+        kind, expr = _split_selector(selector)
+
+        def found():
+            return self.page.run_js(_COUNT_JS, kind, expr, True) > 0
+
+        ok = wait_until(found, timeout)[0] if timeout else found()
+        return selector if ok else None
+
+    def iter(self, selector):
+        """逐条产出去重后的评论文本，直到读完或达到预算；结束后 stop_reason 为停止原因"""
+        kind, expr = _split_selector(selector)
+        deadline = time.monotonic() + self.max_seconds
+        idle = 0
+        while True:
+            self.rounds += 1
+            limit = min(COMMENT_BATCH, self.max_count - self.count)
+            batch = json.loads(self.page.run_js(_ROUND_JS, kind, expr, limit, COMMENT_MORE_SELECTORS,
+                                                COMMENT_END_SELECTORS, COMMENT_EXPAND_PER_ROUND) or "{}")
+            for comment_id, raw in batch.get("comments") or []:
+                text = _comment_text(raw)
+                if not text:
+                    continue
+                # 有评论ID时按ID去重（不同用户的相同文本都保留），没有ID时才按文本去重
+                duplicate = (comment_id in self._seen_ids) if comment_id else (text in self._seen)
+                if duplicate:
+                    self.duplicates += 1
+                    continue
+                self._seen.add(text)
+                if comment_id:
+                    self._seen_ids.add(comment_id)
+                self.count += 1
+                yield text
+                if self.count >= self.max_count:
+                    self.stop_reason = "count"
+                    return
+            self.expanded += batch.get("expanded", 0)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stop_reason = "time"
+                return
+            if batch.get("pending"):
+                continue    # 上一轮条数截断，剩余的新评论已在页面中，不用等待
+            if batch.get("end") and not batch.get("expanded"):
+                self.stop_reason = "end"
+                return
+
+            # 展开回复或滚动加载下一页，等待新评论元素出现
+            if not batch.get("expanded"):
+                self.scroll()
+            if self._wait_new(kind, expr, min(self.wait_ceiling, remaining)):
+                idle = 0
+            else:
+                idle += 1
+                if idle >= COMMENT_IDLE_ROUNDS:
+                    self.stop_reason = "idle"
+                    return
+
+    def _wait_new(self, kind, expr, ceiling):
+        def condition():
+            return self.page.run_js(_COUNT_JS, kind, expr, False) > 0
+
+        if self.waits is not None:
+            return self.waits.wait("comment_scroll", condition, ceiling, 0.3)
+        return wait_until(condition, ceiling)[0]
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "rounds": self.rounds,
+            "expanded": self.expanded,
+            "duplicates": self.duplicates,
+            "stop_reason": self.stop_reason,
+        }
@@ -0,0 +1,292 @@
+# spiders/xhs_runner.py
+"""
+小红书多进程分片爬取
+多关键词时原来在一个请求线程里用一个浏览器逐个关键词串行爬取。这里按关键词分片，交给 K 个工作进程，
+每个进程驱动自己的浏览器（独立调试端口和用户数据目录）：
+- 工作进程从任务队列领取关键词，爬完一个再领下一个（快的进程多干）
+- 结果经队列汇总到主进程，按笔记ID和近似文本全局去重后逐条产出
+- 全局浏览器上限 XHS_MAX_BROWSERS：工作进程与进程内的浏览器池（普通/轻量）共用同一额度（browser_pool.browser_budget），
+  额度不足时先关闭池中空闲的浏览器，仍不足时新的爬取等待；各工作进程错开启动，避免同一时刻集中发起请求
+- progress() 返回各分片的状态和计数，shard_progress() 返回进程内所有进行中的分片爬取
+
+小红书搜索结果是无限滚动的单一列表，无法按页拆分给不同进程，分片粒度为关键词。
+每个槽位的用户数据目录在 resource/browser_profiles/xhs_{槽位}（轻量配置为 xhs_light_{槽位}），首次使用需要分别登录
+工作进程入口在 spiders/xhs_shard_worker.py，子进程只导入爬虫模块，不导入 app.py
+"""
+import os
+import sys
+import time
+import types
+import uuid
+import queue
+import threading
+import multiprocessing
+
+from spiders.browser_pool import browser_budget, XHS_MAX_BROWSERS
+from spiders.xhs_shard_worker import worker_main
+from utils.near_dup import NearDupIndex
+from utils.seen_index import xhs_note_id
+
+# ================= 配置区域 =================
+XHS_SHARD_WORKERS = int(os.environ.get("XHS_SHARD_WORKERS", 2))   # 每次分片爬取默认的工作进程数
+SHARD_SLOT_BASE = 10           # 工作进程使用的浏览器槽位起点（与主进程浏览器池的槽位错开）
+SHARD_START_STAGGER = 3        # 工作进程之间错开启动的秒数
+SHARD_SLOT_TIMEOUT = 600       # 等待空闲浏览器槽位的最长时间（秒）
+SHARD_STOP_TIMEOUT = 30        # 取消或结束后等待工作进程退出的时间（秒），超时强制结束
+# ===========================================
+
+
+class _SlotAllocator:
+    """
+    工作进程的浏览器槽位分配（线程安全）：槽位号决定调试端口和用户数据目录
+    每个槽位占用一个全局浏览器额度（budget），与进程内的浏览器池合计不超过 budget.limit
+    """
+
+    def __init__(self, budget, base):
+        self.budget = budget
+        self.limit = budget.limit
+        self._free = list(range(base, base + budget.limit))
+        self._lock = threading.Lock()
+
+    def acquire(self, count, timeout):
+        """
+        分配最多 count 个槽位，没有浏览器额度时等待
+        :return: 槽位列表；超时返回空列表
+        """
+        granted = self.budget.acquire(count, timeout)
+        with self._lock:
+            slots, self._free = self._free[:granted], self._free[granted:]
+        return slots
+
+    def release(self, slots):
+        with self._lock:
+            self._free.extend(slots)
+            self._free.sort()
+        self.budget.release(len(slots))
+
+    def in_use(self):
+        """进程内运行中的浏览器总数（含浏览器池）"""
+        return self.budget.in_use()
+
+
+# 全局槽位分配器
+slot_allocator = _SlotAllocator(browser_budget, SHARD_SLOT_BASE)
+
+# 进行中的分片爬取：id -> XhsShardRunner
+_runners = {}
+_runners_lock = threading.Lock()
+# 启动工作进程时临时替换 sys.modules["__main__"]，同一时刻只允许一次
+_start_lock = threading.Lock()
+
+
+def shard_progress():
+    """进程内所有进行中的分片爬取的进度"""
+    with _runners_lock:
+        runners = list(_runners.values())
+    return {
+        "max_browsers": slot_allocator.limit,
+        "browsers_in_use": slot_allocator.in_use(),
+        "runners": [r.progress() for r in runners],
+    }
+
+
+def _start_processes(processes):
+    """
+    启动 spawn 工作进程，启动期间隐藏主进程的 __main__
+    spawn 子进程默认会按路径重新导入主模块（以 python app.py 运行时即 app.py，会再构建一次 Flask 应用和数据库配置），
+    工作进程只需要入口函数所在的 spiders.xhs_shard_worker，不需要主模块
+    """
+    with _start_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            for p in processes:
+                p.start()
+        finally:
+            sys.modules["__main__"] = main
+
+
+class XhsShardRunner:
+    """一次多关键词分片爬取"""
+
+    def __init__(self, keywords, max_count=5, workers=None, incremental=False, tabs=None, capture=None,
+                 lightweight=None):
+        """
+        :param keywords: 关键词列表
+        :param max_count: 每个关键词的爬取数量上限
+        :param workers: 工作进程数，默认 XHS_SHARD_WORKERS；不超过关键词数和全局上限 XHS_MAX_BROWSERS
+        :param incremental, tabs, capture, lightweight: 传给每个关键词的 iter_search_xhs
+        """
+        self.id = uuid.uuid4().hex[:8]
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self.workers = max(1, min(int(workers or XHS_SHARD_WORKERS), len(self.keywords) or 1, XHS_MAX_BROWSERS))
+        self.options = {"max_count": max_count, "incremental": incremental, "tabs": tabs, "capture": capture,
+                        "lightweight": lightweight}
+        self.shards = {k: {"status": "pending", "count": 0, "worker": None} for k in self.keywords}
+        self.slots = []
+        self.items = 0
+        self.duplicates = 0
+        self.started_at = None
+        self.finished_at = None
+        self._stop = None
+        self._lock = threading.Lock()
+
+    def iter(self):
+        """
+        启动工作进程并逐条产出去重后的结果（附带 keyword 字段）；提前停止迭代时通知工作进程停止并回收
+        """
+        if not self.keywords:
+            return
+        self.slots = slot_allocator.acquire(self.workers, SHARD_SLOT_TIMEOUT)
+        if not self.slots:
+            print(f"[SHARD] 等待空闲浏览器超时（全局上限 {slot_allocator.limit}）")
+            return
+        self.workers = len(self.slots)
+        self.started_at = time.time()
+        with _runners_lock:
+            _runners[self.id] = self
+
+        processes = []
+        results = None
+        try:
+            ctx = multiprocessing.get_context("spawn")   # 不 fork Flask 进程（含线程和锁）
+            tasks, results, self._stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+            for keyword in self.keywords:
+                tasks.put(keyword)
+            for _ in self.slots:
+                tasks.put(None)
+            processes = [ctx.Process(target=worker_main, args=(i, slot, self.options, tasks, results, self._stop,
+                                                               i * SHARD_START_STAGGER),
+                                     name=f"xhs-shard-{slot}", daemon=True)
+                         for i, slot in enumerate(self.slots)]
+            print(f"[SHARD] {len(self.keywords)} 个关键词分给 {len(processes)} 个工作进程（槽位 {self.slots}）")
+            _start_processes(processes)
+            yield from self._collect(processes, results)
+            with self._lock:
+                done = sum(1 for s in self.shards.values() if s["status"] == "done")
+            print(f"[SHARD] 完成 {done}/{len(self.keywords)} 个关键词，共 {self.items} 条，"
+                  f"跨关键词重复 {self.duplicates} 条")
+        finally:
+            if self._stop is not None:
+                self._stop.set()
+            self._shutdown(processes, results)
+            slot_allocator.release(self.slots)
+            self.finished_at = time.time()
+            with _runners_lock:
+                _runners.pop(self.id, None)
+
+    def _collect(self, processes, results):
+        """读取结果队列直到所有工作进程退出"""
+        seen_ids = set()
+        near_dup = NearDupIndex()
+        running = set(range(len(processes)))
+        while running:
+            try:
+                kind, index, keyword, data = results.get(timeout=1)
+            except queue.Empty:
+                # 工作进程异常退出时不会发出 exit 消息
+                for i in list(running):
+                    if not processes[i].is_alive():
+                        running.discard(i)
+                        self._worker_died(i, processes[i].exitcode)
+                continue
+            if kind == "item":
+                row = self._accept(keyword, data, seen_ids, near_dup)
+                if row is not None:
+                    yield row
+            elif kind == "exit":
+                running.discard(index)
+            else:
+                self._update(kind, index, keyword, data)
+        # 所有工作进程都已退出，剩下没领取的关键词（工作进程异常退出或被取消）
+        with self._lock:
+            for shard in self.shards.values():
+                if shard["status"] == "pending":
+                    shard["status"] = "skipped"
+
+    @staticmethod
+    def _shutdown(processes, results):
+        """等待工作进程退出；等待期间继续取走结果，避免子进程卡在写队列上，超时后强制结束"""
+        deadline = time.monotonic() + SHARD_STOP_TIMEOUT
+        while any(p.is_alive() for p in processes) and time.monotonic() < deadline:
+            try:
+                results.get(timeout=0.2)
+            except queue.Empty:
+                pass
+        for p in processes:
+            if p.is_alive():
+                print(f"[SHARD] 工作进程 {p.name} 未按时退出，强制结束")
+                p.terminate()
+            p.join(timeout=5)
+
+    def cancel(self):
+        """通知工作进程在当前笔记完成后停止"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def _accept(self, keyword, row, seen_ids, near_dup):
+        """全局去重：同一笔记（不同关键词都搜到）或近似重复的笔记只保留第一次出现的"""
+        note_id = xhs_note_id(row.get("url")) or row.get("url")
+        with self._lock:
+            self.shards[keyword]["count"] += 1
+            text = f"{row.get('title', '')} {row.get('content', '')}"
+            if (note_id and note_id in seen_ids) or not near_dup.add(text):
+                self.duplicates += 1
+                return None
+            if note_id:
+                seen_ids.add(note_id)
+            self.items += 1
+        return dict(row, keyword=keyword)
+
+    def _update(self, kind, index, keyword, data):
+        with self._lock:
+            shard = self.shards[keyword]
+            if kind == "start":
+                shard["status"], shard["worker"] = "running", self.slots[index]
+            elif kind == "error":
+                shard["status"], shard["error"] = "failed", data
+                print(f"[SHARD] 关键词 {keyword} 爬取失败: {data}")
+            elif kind == "done" and shard["status"] != "failed":
+                shard["status"] = "done"
+                print(f"[SHARD] 关键词 {keyword} 完成，{data} 条（槽位 {shard['worker']}）")
+
+    def _worker_died(self, index, exitcode):
+        print(f"[SHARD] 工作进程 {index} 异常退出（exitcode={exitcode}）")
+        with self._lock:
+            for shard in self.shards.values():
+                if shard["status"] == "running" and shard["worker"] == self.slots[index]:
+                    shard["status"], shard["error"] = "failed", f"worker exited ({exitcode})"
+
+    def progress(self):
+        with self._lock:
+            shards = {k: dict(v) for k, v in self.shards.items()}
+            finished = sum(1 for s in shards.values() if s["status"] in ("done", "failed"))
+            return {
+                "id": self.id,
+                "workers": self.workers,
+                "slots": list(self.slots),
+                "keywords": len(self.keywords),
+                "finished": finished,
+                "items": self.items,
+                "duplicates": self.duplicates,
+                "elapsed": round((self.finished_at or time.time()) - self.started_at, 1) if self.started_at else 0,
+                "shards": shards,
+            }
+
+
+def search_and_crawl_xhs_sharded(keywords, max_count=5, workers=None, incremental=False, tabs=None, capture=None,
+                                 lightweight=None):
+    """
+    多关键词小红书分片爬取：参数见 XhsShardRunner，收集全部结果后一次性返回
+    :return: 结果列表，每条附带 keyword 字段
+    """
+    return list(iter_search_xhs_sharded(keywords, max_count=max_count, workers=workers, incremental=incremental,
+                                        tabs=tabs, capture=capture, lightweight=lightweight))
+
+
+def iter_search_xhs_sharded(keywords, max_count=5, workers=None, incremental=False, tabs=None, capture=None,
+                            lightweight=None):
+    """多关键词小红书分片爬取（流式版本）"""
+    runner = XhsShardRunner(keywords, max_count=max_count, workers=workers, incremental=incremental, tabs=tabs,
+                            capture=capture, lightweight=lightweight)
+    yield from runner.iter()
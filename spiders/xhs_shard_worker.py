@@ -0,0 +1,56 @@
+# spiders/xhs_shard_worker.py
+"""
+小红书分片爬取的工作进程入口（由 spiders/xhs_runner.py 以 spawn 方式启动）
+spawn 子进程会导入入口函数所在的模块，这里只依赖 xhs_spider 和 browser_pool，
+不经过 app.py / services，子进程启动时不会构建 Flask 应用、连接数据库或读取服务配置
+"""
+import time
+import queue
+
+from spiders import xhs_spider
+from spiders.browser_pool import BrowserPool, default_browser_factory
+
+
+def worker_main(index, slot, options, tasks, results, stop, delay=0):
+    """
+    工作进程：用槽位 slot 的浏览器逐个爬取任务队列中的关键词
+    结果消息 (类型, 工作进程序号, 关键词, 数据)：start / item / error / done / exit
+    :param delay: 启动前等待的秒数（各工作进程错开启动）
+    """
+    lightweight = options.get("lightweight")
+    if lightweight is None:
+        lightweight = xhs_spider.XHS_LIGHTWEIGHT
+    pool = BrowserPool(max_size=1, max_uses=xhs_spider.BROWSER_MAX_USES, idle_ttl=0,
+                       warm_url="https://www.xiaohongshu.com/explore",
+                       factory=lambda _: default_browser_factory(slot, lightweight=lightweight))
+    # 本进程只有这一个浏览器，普通和轻量两个池都指向它
+    xhs_spider.browser_pool = xhs_spider.light_browser_pool = pool
+
+    time.sleep(delay)
+    try:
+        while not stop.is_set():
+            try:
+                keyword = tasks.get(timeout=1)
+            except queue.Empty:
+                continue
+            if keyword is None:
+                break
+            results.put(("start", index, keyword, None))
+            count = 0
+            items = xhs_spider.iter_search_xhs(keyword, max_count=options["max_count"],
+                                               incremental=options["incremental"], tabs=options["tabs"],
+                                               capture=options["capture"], lightweight=lightweight)
+            try:
+                for row in items:
+                    count += 1
+                    results.put(("item", index, keyword, row))
+                    if stop.is_set():
+                        break
+            except Exception as e:
+                results.put(("error", index, keyword, str(e)))
+            finally:
+                items.close()
+            results.put(("done", index, keyword, count))
+    finally:
+        pool.close_all()
+        results.put(("exit", index, None, None))
@@ -2,81 +2,277 @@
 """
 小红书关键词搜索爬虫 - Web版本
 基于 xhs_spider_cmd.py 改造，适用于 Flask 后端调用
+
+两种详情获取模式：
+- 串行（tabs=1）：在搜索页逐个点击笔记卡片，在弹窗中读取正文和评论
+- 并行（tabs>1）：在搜索页滚动收集笔记链接，同一浏览器中开多个标签页同时打开详情页；
+  每篇笔记有处理超时，单篇加载慢不会阻塞其他标签页
+capture=True 时两种模式都通过网络监听读取页面请求的接口 JSON（spiders/xhs_capture.py），
+读取不到时回退到 DOM 选择器
 """
+import os
+import json
 import time
+import atexit
 import random
+import threading
+from itertools import islice
 from urllib.parse import quote
-from DrissionPage import ChromiumPage
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from spiders.browser_pool import BrowserPool, block_resources, light_browser_factory, browser_budget
+from spiders.xhs_capture import XhsCapture, XHS_NOTE_URL
+from spiders.smart_wait import WaitStats, wait_until, ele_present, ele_absent, value_changes, network_idle
+from spiders.selector_cache import SelectorCache
+from spiders.xhs_comments import CommentHarvester
+from utils.near_dup import NearDupIndex
+from utils.seen_index import seen_index
+
+# ================= 配置区域 =================
+XHS_DETAIL_TABS = int(os.environ.get("XHS_DETAIL_TABS", 1))  # 同时打开的详情标签页数，1 为逐个点击的串行模式
+XHS_TAB_TIMEOUT = 30          # 单篇笔记在标签页中的处理超时（秒，从开始处理计时），超时的笔记放弃
+XHS_TAB_STUCK_GRACE = 10      # 超时后标签页仍无响应时再等待的秒数，之后不再等待该线程
+XHS_CAPTURE_MODE = os.environ.get("XHS_CAPTURE_MODE", "0") == "1"  # 默认是否使用网络拦截读取接口数据
+XHS_COMMENT_BUDGET = int(os.environ.get("XHS_COMMENT_BUDGET", 200))  # 每篇笔记最多读取的评论数（含楼中楼），也是每行 comments 列表的上限
+XHS_COMMENT_SECONDS = 20      # 每篇笔记读取评论的最长时间（秒）
+
+# 浏览器池：爬取之间复用已启动的浏览器（保留登录态和缓存）
+BROWSER_POOL_SIZE = int(os.environ.get("XHS_BROWSER_POOL_SIZE", 1))   # 每个池最多同时运行的浏览器数，合计还受 XHS_MAX_BROWSERS 限制
+BROWSER_MAX_USES = 20         # 每个浏览器完成多少次爬取后重启
+BROWSER_IDLE_TTL = 600        # 空闲超过该秒数的浏览器关闭
+XHS_LIGHTWEIGHT = os.environ.get("XHS_LIGHTWEIGHT", "0") == "1"   # 默认是否使用轻量浏览器（无头、拦截图片/视频/字体）
+
+# 基于页面状态的等待：条件满足立即继续，以下为最长等待时间（秒）
+WAIT_SEARCH_CEILING = 10      # 搜索结果卡片出现
+WAIT_FEED_CEILING = 3         # 滚动后新卡片加载
+WAIT_DETAIL_CEILING = 8       # 详情弹窗正文出现且网络空闲
+WAIT_COMMENTS_CEILING = 1.0   # 滚动评论区/展开回复后新评论加载
+WAIT_CLOSE_CEILING = 3        # 详情弹窗关闭
+FEED_STALL_LIMIT = 2          # 连续多少次滚动后没有新卡片则认为已到底
+NOTE_JITTER = (0.1, 0.3)      # 笔记之间保留的短随机间隔，避免操作节奏过于规律
+# ===========================================
+
+# 全局浏览器池
+browser_pool = BrowserPool(max_size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES, idle_ttl=BROWSER_IDLE_TTL,
+                           warm_url="https://www.xiaohongshu.com/explore", budget=browser_budget)
+atexit.register(browser_pool.close_all)
+# 轻量浏览器池：独立端口和用户数据目录（resource/browser_profiles/xhs_light_*），首次使用需设置 XHS_LIGHT_HEADLESS=0 登录一次
+light_browser_pool = BrowserPool(max_size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES, idle_ttl=BROWSER_IDLE_TTL,
+                                 warm_url="https://www.xiaohongshu.com/explore", factory=light_browser_factory,
+                                 budget=browser_budget)
+atexit.register(light_browser_pool.close_all)
+
+# 全局等待统计：实际等待时间与原固定 sleep 的比较
+wait_stats = WaitStats()
+
+# 全局选择器命中缓存：各字段优先尝试上次命中的选择器
+selector_cache = SelectorCache()
+
+_NOTE_CARD_SELECTORS = ('.note-item', 'xpath://section[contains(@class,"note")]')
+_DETAIL_SELECTORS = ('#detail-desc', '.note-scroller', '.note-content')   # 详情正文已渲染
+_DETAIL_MODAL_SELECTORS = ('.note-detail-mask', '#noteContainer')        # 详情弹窗
 
+# 各字段的候选选择器（按原有优先级排列，实际尝试顺序由 selector_cache 调整）
+_NOTE_LIST_SELECTORS = [
+    'css:.feeds-page .note-item',
+    '.note-item',
+    'xpath://section[contains(@class,"note")]',
+]
+_CONTENT_SELECTORS = [
+    '#detail-desc .note-text',
+    '#detail-desc .desc',
+    '.note-scroller .desc',
+    '.note-content',
+    '.desc',
+    'xpath://div[contains(@class,"desc")]//span',
+    'xpath://div[@id="detail-desc"]',
+]
+_PUBLISH_TIME_SELECTORS = ['.date', '.bottom-container .date', 'xpath://span[contains(@class,"date")]']
+_COMMENT_SELECTORS = [
+    '.comment-item',
+    '.parent-comment',
+    '.comments-container .comment',
+    'xpath://div[contains(@class,"comment-item")]',
+    'xpath://div[contains(@class,"commentItem")]',
+]
+_CLOSE_SELECTORS = [
+    '.close-circle',
+    '.close',
+    'xpath://div[contains(@class,"close")]',
+    'xpath://*[contains(@class,"close")]',
+]
 
-def search_and_crawl_xhs(keyword, max_count=5):
+# 笔记卡片快照：一次脚本调用返回所有卡片的笔记ID、xsec_token、标题、作者、点赞数，代替逐卡片逐字段的 ele() 调用；
+# 同时给每张卡片写入 data-crawl-key，需要点击时按它找回元素
+_CARD_SNAPSHOT_JS = r"""
+const [kind, expr] = arguments;
+let cards = [];
+if (kind === 'xpath') {
+    const found = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < found.snapshotLength; i++) cards.push(found.snapshotItem(i));
+} else {
+    cards = Array.from(document.querySelectorAll(expr));
+}
+const hrefRe = /\/(?:explore|search_result|discovery\/item)\/([0-9a-zA-Z]+)/;  // 同 seen_index.XHS_NOTE_ID_RE
+const text = (root, sel) => {
+    const el = root && root.querySelector(sel);
+    return el ? (el.innerText || el.textContent || '').trim() : '';
+};
+return JSON.stringify(cards.map((card, i) => {
+    let id = '', token = '';
+    for (const a of card.querySelectorAll('a[href]')) {
+        const href = a.getAttribute('href') || '';
+        const match = href.match(hrefRe);
+        if (!match) continue;
+        id = id || match[1];
+        if (!token) {
+            try { token = new URL(href, location.href).searchParams.get('xsec_token') || ''; } catch (e) {}
+        }
+    }
+    const altId = card.getAttribute('data-id') || card.id || '';
+    const key = (id || altId || 'idx-' + i).replace(/"/g, '');
+    card.setAttribute('data-crawl-key', key);
+    const footer = card.querySelector('.footer');
+    const author = footer && footer.querySelector('.author-wrapper');
+    return {
+        id: id, alt_id: altId, key: key, token: token,
+        title: text(footer, '.title'),
+        author: text(author, '.author'),
+        like: text(footer, '.like-wrapper') || '0',
+    };
+}));
+"""
+
+
+def search_and_crawl_xhs(keyword, max_count=5, incremental=False, stop_on_seen_page=True, mark_seen=True,
+                         tabs=None, capture=None, lightweight=None):
     """
     小红书爬虫封装函数（Web版本）
     :param keyword: 搜索关键词
     :param max_count: 限制爬取的笔记数量
     :return: 结果列表
     """
-    results = []
-    page = None
+    return list(iter_search_xhs(keyword, max_count=max_count, incremental=incremental,
+                                stop_on_seen_page=stop_on_seen_page, mark_seen=mark_seen, tabs=tabs,
+                                capture=capture, lightweight=lightweight))
+
+
+def iter_search_xhs(keyword, max_count=5, incremental=False, stop_on_seen_page=True, mark_seen=True, tabs=None,
+                    capture=None, lightweight=None):
+    """
+    小红书爬虫（流式版本）：每爬完一篇笔记立即 yield，提前停止迭代时会归还浏览器
+    :param keyword: 搜索关键词
+    :param max_count: 限制爬取的笔记数量
+    :param incremental: 增量爬取，跳过之前运行已产出过的笔记（不点开详情，不计入数量）
+    :param stop_on_seen_page: 增量模式下滚动后可见的笔记全部已见过时停止
+    :param mark_seen: 增量模式下是否立即把产出的笔记记为已见过
+    :param tabs: 同时打开的详情标签页数，默认 XHS_DETAIL_TABS；大于1时先收集链接再并行打开详情页
+    :param capture: 是否从拦截的接口 JSON 读取笔记、评论（评论不再限10条），默认 XHS_CAPTURE_MODE
+    :param lightweight: 是否使用轻量浏览器（无头、不加载图片/视频/字体），默认 XHS_LIGHTWEIGHT
+    :return: 生成器，逐条产出统一格式的结果
+    """
+    lease = None
+    capturer = None
+    saved_before = wait_stats.saved_total()
+    tabs = XHS_DETAIL_TABS if tabs is None else max(1, int(tabs))
+    capture = XHS_CAPTURE_MODE if capture is None else capture
+    lightweight = XHS_LIGHTWEIGHT if lightweight is None else lightweight
+    pool = light_browser_pool if lightweight else browser_pool
     
     try:
-        # 初始化浏览器
-        page = ChromiumPage()
+        # 从浏览器池借出浏览器
+        lease = pool.acquire()
+        if lease is None:
+            print("[ERROR] 没有可用的浏览器")
+            return
+        page = lease.page
         
         # 1. 搜索关键词
         keyword_encode = quote(keyword)
         url = f'https://www.xiaohongshu.com/search_result?keyword={keyword_encode}&source=web_search_result_notes'
         print(f"[INFO] 正在搜索: {keyword}")
+        if capture:
+            # 在打开搜索页之前开始监听，第一页搜索结果也能捕获
+            capturer = XhsCapture(page)
+            if not capturer.start():
+                capturer = None
         page.get(url)
-        time.sleep(3)  # 等待页面加载
+        # 等待搜索结果卡片出现
+        if not wait_stats.wait("search_load", ele_present(page, *_NOTE_CARD_SELECTORS), WAIT_SEARCH_CEILING, 3):
+            print(f"[WARN] {WAIT_SEARCH_CEILING} 秒内未出现搜索结果")
+        
+        if tabs > 1:
+            yield from _iter_parallel(page, keyword, max_count, tabs, incremental, stop_on_seen_page, mark_seen,
+                                      capturer, lightweight, lease)
+            _report_waits(saved_before)
+            return
         
         # 2. 获取笔记列表
         processed_notes = set()
+        near_dup = NearDupIndex()  # 搬运/轻微改动的重复笔记
         crawled_count = 0
         scroll_count = 0
+        fresh_since_scroll = False  # 上次滚动后是否出现过未爬过的笔记
+        feed_stalls = 0  # 连续没有加载出新卡片的滚动次数
         # 动态计算最大滚动次数：每次滚动大约能获取5-10个笔记，所以至少滚动 max_count/5 次
         max_scroll = max(20, (max_count // 5) + 10)
         
         while crawled_count < max_count and scroll_count < max_scroll:
-            # 尝试多种方式获取笔记元素
-            note_elements = _get_note_elements(page)
+            # 一次脚本调用读取所有可见卡片的ID、链接、标题、作者、点赞数
+            cards = _get_note_cards(page)
             
-            if not note_elements:
+            if not cards:
                 print("[WARN] 未找到笔记元素，尝试滚动...")
                 page.scroll.down(500)
                 scroll_count += 1
-                time.sleep(1)
+                wait_stats.wait("feed_scroll", ele_present(page, *_NOTE_CARD_SELECTORS), WAIT_FEED_CEILING, 1)
                 continue
             
-            print(f"[INFO] 当前页面有 {len(note_elements)} 个笔记元素")
+            print(f"[INFO] 当前页面有 {len(cards)} 个笔记元素")
             
-            # 遍历笔记元素
+            # 遍历卡片快照，只为要点开的那张卡片查找元素
             found_new = False
-            for note_ele in note_elements:
+            seen_before = 0  # 本轮跳过的、之前运行已爬过的笔记数
+            for card in cards:
                 if crawled_count >= max_count:
                     break
                 
                 try:
                     # 获取笔记唯一标识
-                    note_id = _get_note_id(note_ele, scroll_count)
+                    note_id = card["id"] or card["alt_id"] or f"note_{scroll_count}_{random.randint(1000,9999)}"
                     
                     # 去重检查
                     if note_id in processed_notes:
                         continue
                     
                     processed_notes.add(note_id)
+                    if incremental and seen_index.seen("xhs", keyword, note_id):
+                        seen_before += 1
+                        continue
                     found_new = True
+                    fresh_since_scroll = True
+                    
+                    note_ele = _card_element(page, card)
+                    if not note_ele:
+                        print(f"[WARN] 笔记 {note_id} 的卡片已不在页面中，跳过")
+                        continue
                     
                     # 获取笔记详情
-                    note_data = _click_and_get_detail(page, note_ele, keyword, crawled_count + 1)
+                    note_data = _click_and_get_detail(page, note_ele, keyword, crawled_count + 1, note_id, capturer,
+                                                      _card_info(card))
                     
-                    if note_data:
-                        results.append(note_data)
+                    if note_data and not near_dup.add(f"{note_data['title']} {note_data['content']}"):
+                        print(f"[INFO] 跳过近似重复笔记: {note_data['title'][:30]}")
+                    elif note_data:
                         crawled_count += 1
+                        if incremental and mark_seen:
+                            seen_index.mark("xhs", keyword, [note_id])
                         print(f"[进度] 已爬取 {crawled_count}/{max_count} 篇笔记")
+                        yield note_data
                     
-                    # 随机延时
-                    time.sleep(random.uniform(0.5, 1.0))
+                    # 短随机间隔（原为 0.5~1 秒固定随机延时）
+                    jitter = random.uniform(*NOTE_JITTER)
+                    time.sleep(jitter)
+                    wait_stats.record("between_notes", jitter, 0.75)
                     break  # 处理完一个就重新获取元素列表
                     
                 except Exception as e:
@@ -84,120 +280,416 @@ def search_and_crawl_xhs(keyword, max_count=5):
                     _close_detail_page(page)
                     continue
             
+            # 新加载的笔记全部在之前的运行中爬过，后面的大概率也是旧内容
+            if not found_new and seen_before and not fresh_since_scroll and stop_on_seen_page:
+                print(f"[INFO] 可见的 {seen_before} 篇新加载笔记均已在之前的运行中爬过，停止")
+                break
+            
             # 如果没有找到新元素，滚动加载更多
             if not found_new:
                 print("******** 滚动加载更多 ********")
-                page.scroll.down(600)
                 scroll_count += 1
-                time.sleep(random.uniform(1, 1.5))
+                fresh_since_scroll = False
+                if _scroll_feed(page):
+                    feed_stalls = 0
+                else:
+                    feed_stalls += 1
+                    if feed_stalls >= FEED_STALL_LIMIT:
+                        print(f"[INFO] 连续 {feed_stalls} 次滚动没有加载出新笔记，停止")
+                        break
         
-        print(f"[DONE] 共爬取 {len(results)} 篇笔记")
+        print(f"[DONE] 共爬取 {crawled_count} 篇笔记, 近似重复过滤 {near_dup.suppressed} 篇")
+        _report_waits(saved_before)
         
     except Exception as e:
         print(f"[ERROR] XHS Crawler Error: {e}")
+        if lease:
+            lease.mark_broken()
     finally:
-        if page:
+        if capturer:
+            capturer.stop()
+        if lease:
+            pool.release(lease)
+
+
+def _iter_parallel(page, keyword, max_count, tabs, incremental, stop_on_seen_page, mark_seen, capturer=None,
+                   lightweight=False, lease=None):
+    """
+    并行模式：主标签页滚动收集链接，最多 tabs 篇笔记同时在各自的标签页中加载和提取
+    按完成顺序 yield；每篇笔记从开始处理起计时，超过 XHS_TAB_TIMEOUT 的放弃（_TabWorkers.fetch 内停止加载）
+    :param capturer: 主标签页的 XhsCapture，传入时详情标签页也使用网络拦截
+    :param lightweight: 详情标签页是否同样拦截图片/视频/字体请求
+    :param lease: 浏览器租约；结束时仍有工作线程占用标签页则标记为出错，归还时回收而不是借给下一次爬取
+    """
+    max_scroll = max(20, (max_count // 5) + 10)
+    links = _iter_note_links(page, keyword, max_scroll, incremental, stop_on_seen_page, capturer)
+    workers = _TabWorkers(page, capture=capturer is not None, lightweight=lightweight)
+    executor = ThreadPoolExecutor(max_workers=tabs, thread_name_prefix="xhs-tab")
+    near_dup = NearDupIndex()
+    pending = {}     # future -> (链接, 任务状态)
+    abandoned = set()  # 超时放弃但线程仍在运行的 future，线程结束前不占用新笔记
+    crawled_count = 0
+    submitted = 0
+    failed = 0
+    timed_out = 0
+    links_exhausted = False
+    started = time.monotonic()
+    print(f"[INFO] 并行模式: {tabs} 个详情标签页")
+    
+    try:
+        while crawled_count < max_count:
+            abandoned = {future for future in abandoned if not future.done()}
+            # 只在有空闲线程时提交，在途笔记数也不超过还需要的数量
+            while (not links_exhausted and len(pending) + len(abandoned) < tabs
+                   and len(pending) < max_count - crawled_count):
+                link = next(links, None)
+                if link is None:
+                    links_exhausted = True
+                    break
+                submitted += 1
+                task = {"started": None, "expired": False}
+                future = executor.submit(workers.fetch, link, submitted, task)
+                pending[future] = (link, task)
+            if not pending:
+                break
+            
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                link, task = pending.pop(future)
+                note_data = future.result()
+                if note_data is None:
+                    if task["expired"]:
+                        timed_out += 1
+                    else:
+                        failed += 1
+                elif not near_dup.add(f"{note_data['title']} {note_data['content']}"):
+                    print(f"[INFO] 跳过近似重复笔记: {note_data['title'][:30]}")
+                elif crawled_count < max_count:
+                    crawled_count += 1
+                    if incremental and mark_seen:
+                        seen_index.mark("xhs", keyword, [link["id"]])
+                    print(f"[进度] 已爬取 {crawled_count}/{max_count} 篇笔记")
+                    yield note_data
+            
+            # fetch 自己在截止时间停止；卡在浏览器调用中迟迟不返回的才在这里放弃
+            now = time.monotonic()
+            for future, (link, task) in list(pending.items()):
+                if task["started"] is not None and now - task["started"] > XHS_TAB_TIMEOUT + XHS_TAB_STUCK_GRACE:
+                    pending.pop(future)
+                    abandoned.add(future)
+                    timed_out += 1
+                    print(f"[WARN] 笔记 {link['id']} 超过 {XHS_TAB_TIMEOUT} 秒仍未返回，放弃")
+        
+        elapsed = time.monotonic() - started
+        print(f"[DONE] 共爬取 {crawled_count} 篇笔记, 用时 {elapsed:.1f} 秒 "
+              f"({crawled_count / elapsed * 60 if elapsed else 0:.1f} 篇/分钟), 失败 {failed} 篇, "
+              f"超时 {timed_out} 篇, 近似重复过滤 {near_dup.suppressed} 篇")
+    finally:
+        links.close()
+        # 提前结束时通知在途的笔记尽快返回，等工作线程不再使用标签页后再关闭标签页、归还浏览器
+        workers.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        running = [future for future in list(pending) + list(abandoned) if not future.done()]
+        if running:
+            _, still_running = wait(running, timeout=XHS_TAB_STUCK_GRACE)
+            if still_running:
+                print(f"[WARN] {len(still_running)} 个详情标签页无响应，回收浏览器")
+                if lease:
+                    lease.mark_broken()
+        workers.close()
+
+
+def _iter_note_links(page, keyword, max_scroll, incremental, stop_on_seen_page, capturer=None):
+    """
+    滚动搜索页，逐个产出未处理过的笔记链接和卡片信息（增量模式下跳过之前运行已爬过的）
+    传入 capturer 时合并搜索接口返回的笔记（包括还没渲染成卡片的）
+    """
+    processed_notes = set()
+    scroll_count = 0
+    feed_stalls = 0
+    while scroll_count < max_scroll:
+        fresh = 0
+        seen_before = 0
+        candidates = [_card_link(card) for card in _get_note_cards(page) or []]
+        if capturer is not None:
+            capturer.poll()
+            candidates = [_merge_feed_info(link, capturer.feed.get(link["id"])) for link in candidates if link]
+            candidates += list(capturer.feed.values())
+        for link in candidates:
+            if link is None or link["id"] in processed_notes:
+                continue
+            processed_notes.add(link["id"])
+            if incremental and seen_index.seen("xhs", keyword, link["id"]):
+                seen_before += 1
+                continue
+            fresh += 1
+            yield link
+        
+        # 新加载的笔记全部在之前的运行中爬过，后面的大概率也是旧内容
+        if not fresh and seen_before and stop_on_seen_page:
+            print(f"[INFO] 可见的 {seen_before} 篇新加载笔记均已在之前的运行中爬过，停止")
+            return
+        
+        print("******** 滚动加载更多 ********")
+        scroll_count += 1
+        if _scroll_feed(page):
+            feed_stalls = 0
+        else:
+            feed_stalls += 1
+            if feed_stalls >= FEED_STALL_LIMIT:
+                print(f"[INFO] 连续 {feed_stalls} 次滚动没有加载出新笔记，停止")
+                return
+
+
+def _feed_signature(page):
+    """搜索结果列表的状态：卡片数量和最后一张卡片的链接（列表回收节点时数量可能不变）"""
+    cards = page.eles(_NOTE_CARD_SELECTORS[0], timeout=0) or page.eles(_NOTE_CARD_SELECTORS[1], timeout=0)
+    if not cards:
+        return 0, ""
+    link = cards[-1].ele('tag:a', timeout=0)
+    return len(cards), (link.attr('href') if link else "") or ""
+
+
+def _scroll_feed(page):
+    """滚动搜索页并等待新卡片加载，返回是否加载出新内容"""
+    base = _feed_signature(page)
+    page.scroll.down(600)
+    return wait_stats.wait("feed_scroll", value_changes(lambda: _feed_signature(page), base),
+                           WAIT_FEED_CEILING, 1.25)
+
+
+def _report_waits(saved_before):
+    saved = wait_stats.saved_total() - saved_before
+    print(f"[WAIT] 本次爬取按页面状态等待，比固定延时共节省 {saved:.1f} 秒")
+
+
+def _card_info(card):
+    """卡片快照中的基本信息（与 _get_note_basic_info 字段相同）"""
+    return {"title": card["title"], "author": card["author"], "like": card["like"] or "0"}
+
+
+def _card_link(card):
+    """
+    卡片快照对应的详情页URL和基本信息；卡片中没有笔记链接时返回 None
+    详情页需要搜索结果中的 xsec_token 才能直接打开，优先使用带 token 的链接
+    """
+    if not card["id"]:
+        return None
+    url = XHS_NOTE_URL.format(id=card["id"])
+    if card["token"]:
+        url += f"?xsec_token={quote(card['token'])}&xsec_source=pc_search"
+    link = {"id": card["id"], "url": url}
+    link.update(_card_info(card))
+    return link
+
+
+def _merge_feed_info(info, feed_link):
+    """用搜索接口数据补全卡片信息（接口中的点赞数是精确值，链接带 xsec_token）"""
+    if not feed_link:
+        return info
+    merged = dict(info)
+    for key, value in feed_link.items():
+        if value and (key in ("like", "url") or not merged.get(key)):
+            merged[key] = value
+    return merged
+
+
+class _TabWorkers:
+    """每个工作线程一个详情标签页，线程内的笔记复用同一个标签页；超时或出错的标签页换新"""
+
+    def __init__(self, page, capture=False, lightweight=False):
+        self.page = page
+        self.capture = capture
+        self.lightweight = lightweight
+        self.opened = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def _tab(self):
+        """本线程的 (标签页, XhsCapture或None)"""
+        tab = getattr(self._local, "tab", None)
+        if tab is None:
+            tab = self.page.new_tab(background=True)
+            self._local.tab = tab
+            self._local.capturer = None
+            if self.lightweight:
+                # 请求拦截按标签页生效，新标签页要单独设置
+                block_resources(tab)
+            if self.capture:
+                capturer = XhsCapture(tab)
+                self._local.capturer = capturer if capturer.start() else None
+            with self._lock:
+                self.opened.append(tab)
+        return tab, self._local.capturer
+
+    def _discard_tab(self):
+        """关闭本线程的标签页，下一篇笔记重新打开"""
+        tab = getattr(self._local, "tab", None)
+        if tab is None:
+            return
+        capturer = self._local.capturer
+        self._local.tab = None
+        self._local.capturer = None
+        with self._lock:
+            if tab in self.opened:
+                self.opened.remove(tab)
+        try:
+            if capturer:
+                capturer.stop()
+            tab.close()
+        except Exception:
+            pass
+
+    def _expire(self, link):
+        """超过截止时间：停止本线程标签页的加载，停止失败（标签页无响应）时换新标签页"""
+        print(f"  [WARN] 笔记 {link['id']} 超过 {XHS_TAB_TIMEOUT} 秒未完成，放弃")
+        try:
+            self._local.tab.stop_loading()
+        except Exception:
+            self._discard_tab()
+
+    def fetch(self, link, index, task=None):
+        """
+        在本线程的标签页中打开笔记详情页并提取；失败或超时返回 None
+        :param task: 任务状态字典，写入开始时间 started，超时放弃时 expired 置为 True
+        """
+        task = {} if task is None else task
+        task["started"] = time.monotonic()
+        deadline = task["started"] + XHS_TAB_TIMEOUT
+        wait_stats.begin_note()
+        try:
+            tab, capturer = self._tab()
+            print(f"\n[{index}] 打开笔记: {link.get('title') or link['id']}")
+            since = capturer.mark() if capturer else None
+            loaded = tab.get(link["url"], retry=0, timeout=max(1.0, deadline - time.monotonic()))
+            if self._cancelled.is_set():
+                return None
+            if time.monotonic() > deadline:
+                task["expired"] = True
+                self._expire(link)
+                return None
+            if not loaded:
+                print(f"  [WARN] 笔记 {link['id']} 加载失败")
+                return None
+            captured = None
+            if capturer is not None:
+                captured = capturer.collect_note(link["id"], scroll=lambda: _scroll_comments(tab), since=since,
+                                                 max_comments=XHS_COMMENT_BUDGET, deadline=deadline - 5)
+            # 剩余时间不多时跳过 DOM 评论，保证单篇笔记不超时
+            row = _detail_row(tab, link, tab.url or link["url"], captured,
+                              comment_seconds=deadline - time.monotonic() - 5)
+            if time.monotonic() > deadline:
+                task["expired"] = True
+                self._expire(link)
+                return None
+            if not row["content"] and not row["comments"]:
+                print(f"  [WARN] 笔记 {link['id']} 未获取到正文和评论（可能需要登录或已删除）")
+                return None
+            print(f"  [WAIT] 本篇比固定延时节省 {wait_stats.note_saved():.1f} 秒")
+            return row
+        except Exception as e:
+            print(f"  [ERROR] 获取笔记 {link['id']} 详情失败: {e}")
+            # 标签页可能已断开，下一篇笔记换新标签页
+            self._discard_tab()
+            return None
+
+    def cancel(self):
+        """通知在途的笔记尽快放弃（加载完成后不再提取）"""
+        self._cancelled.set()
+
+    def close(self):
+        with self._lock:
+            tabs, self.opened = self.opened, []
+        for tab in tabs:
             try:
-                page.quit()
-            except:
+                tab.close()
+            except Exception:
                 pass
-    
-    return results
 
 
-def _get_note_elements(page):
-    """获取笔记元素列表"""
-    note_elements = None
-    
-    # 方式1: 通过feeds-page容器
-    container = page.ele('.feeds-page', timeout=2)
-    if container:
-        note_elements = container.eles('.note-item', timeout=1)
-    
-    # 方式2: 直接获取所有笔记卡片
-    if not note_elements or len(note_elements) == 0:
-        note_elements = page.eles('.note-item', timeout=2)
-    
-    # 方式3: 尝试其他可能的选择器
-    if not note_elements or len(note_elements) == 0:
-        note_elements = page.eles('xpath://section[contains(@class,"note")]', timeout=2)
-    
-    return note_elements
+def _get_note_cards(page):
+    """
+    当前可见笔记卡片的快照（feeds-page 容器内的卡片 / 所有卡片 / section 元素）
+    :return: [{"id", "alt_id", "key", "token", "title", "author", "like"}]；没有卡片时返回 None
+    """
+    return selector_cache.find("note_list", _NOTE_LIST_SELECTORS,
+                               lambda selector, timeout: _snapshot_cards(page, selector, timeout), timeout=2)
 
 
-def _get_note_id(note_ele, scroll_count):
-    """获取笔记的唯一标识"""
-    note_id = ""
-    try:
-        link_ele = note_ele.ele('tag:a', timeout=0)
-        if link_ele:
-            href = link_ele.attr('href') or ""
-            if '/explore/' in href:
-                note_id = href.split('/explore/')[-1].split('?')[0]
-    except:
-        pass
-    
-    if not note_id:
-        note_id = note_ele.attr('data-id') or note_ele.attr('id') or f"note_{scroll_count}_{random.randint(1000,9999)}"
-    
-    return note_id
+def _snapshot_cards(page, selector, timeout=0):
+    """在页面中执行一次脚本读取 selector 匹配的所有卡片，timeout>0 时等待卡片出现"""
+    if selector.startswith(("css:", "xpath:")):
+        kind, expr = selector.split(":", 1)
+    else:
+        kind, expr = "css", selector
+    result = {"cards": []}
+
+    def read():
+        result["cards"] = json.loads(page.run_js(_CARD_SNAPSHOT_JS, kind, expr) or "[]")
+        return result["cards"]
+
+    if timeout:
+        wait_until(read, timeout)
+    else:
+        read()
+    return result["cards"]
+
 
+def _card_element(page, card):
+    """按快照时写入的 data-crawl-key 找到卡片元素（点击时才需要）"""
+    return page.ele(f'css:[data-crawl-key="{card["key"]}"]', timeout=0)
 
-def _click_and_get_detail(page, note_element, keyword, index):
+
+def _click_and_get_detail(page, note_element, keyword, index, note_id=None, capturer=None, note_info=None):
     """
     点击笔记卡片进入详情页，获取内容和评论
+    传入 capturer 时优先使用弹窗加载时捕获的详情和评论接口数据
+    :param note_info: 卡片快照中的标题、作者、点赞数；未传入时从卡片元素读取
     """
+    wait_stats.begin_note()
     try:
         # 获取笔记基本信息（在列表页获取）
-        note_info = _get_note_basic_info(note_element)
+        note_info = note_info or _get_note_basic_info(note_element)
+        if capturer is not None:
+            capturer.poll()
+            note_info = _merge_feed_info(note_info, capturer.feed.get(note_id))
         
         print(f"\n[{index}] 点击进入笔记: {note_info.get('title', '无标题')[:30]}...")
         
         # 滚动到元素可见
         try:
             note_element.scroll.to_see()
-            time.sleep(0.5)
+            wait_stats.wait("card_visible", lambda: note_element.states.is_in_viewport, 1, 0.5)
         except:
             pass
         
         # 点击笔记卡片
+        since = capturer.mark() if capturer else None
         _click_note(page, note_element)
-        time.sleep(2.5)  # 等待详情页加载
+        captured = None
+        if capturer is not None:
+            # 等待详情和评论接口返回，评论不够时滚动评论区加载下一页
+            captured = capturer.collect_note(note_id, scroll=lambda: _scroll_comments(page), since=since,
+                                             max_comments=XHS_COMMENT_BUDGET)
+        else:
+            # 等待详情正文渲染且评论等请求结束（原为固定 2.5 秒）
+            ready = ele_present(page, *_DETAIL_SELECTORS)
+            idle = network_idle(page)
+            if not wait_stats.wait("detail_open", lambda: ready() and idle(), WAIT_DETAIL_CEILING, 2.5):
+                print(f"  [WARN] {WAIT_DETAIL_CEILING} 秒内详情页未就绪，继续读取")
         
         # 获取当前URL
         note_url = page.url
         
-        # 获取笔记正文
-        note_content = _get_note_content(page)
-        
-        # 获取发布时间
-        publish_time = _get_publish_time(page)
-        
-        # 滚动加载评论
-        print("  [INFO] 滚动加载评论...")
-        for _ in range(3):
-            time.sleep(random.uniform(0.2, 0.4))
-            page.scroll.down(300)
-        
-        # 获取评论
-        comments = _get_comments(page)
-        
-        print(f"  [INFO] 共获取 {len(comments)} 条评论")
+        note_data = _detail_row(page, note_info, note_url, captured)
+        print(f"  [INFO] 共获取 {len(note_data['comments'])} 条评论")
         
         # 关闭详情页
         _close_detail_page(page)
+        print(f"  [WAIT] 本篇比固定延时节省 {wait_stats.note_saved():.1f} 秒")
         
-        # 返回统一格式的数据
-        return {
-            "source": "小红书",
-            "title": note_info.get('title', '无标题'),
-            "author": note_info.get('author', '未知作者'),
-            "content": note_content,
-            "url": note_url,
-            "publish_time": publish_time,
-            "likes": note_info.get('like', '0'),
-            "comments": comments
-        }
+        return note_data
         
     except Exception as e:
         print(f"  [ERROR] 获取笔记详情失败: {e}")
@@ -205,6 +697,56 @@ def _click_and_get_detail(page, note_element, keyword, index):
         return None
 
 
+def _detail_row(page, info, url, captured=None, comment_seconds=None):
+    """
+    组装统一格式的结果：优先使用捕获到的接口数据，缺少的字段从 DOM 读取
+    :param info: 卡片/搜索接口中的基本信息（title/author/like）
+    :param captured: XhsCapture.collect_note 的返回值
+    :param comment_seconds: 没有接口评论时读取 DOM 评论的时间上限，默认 XHS_COMMENT_SECONDS；不大于 0 时不读取
+    
+    每篇笔记在评论读完后才产出一行，comments 是完整列表（下游清洗、保存、导出都按列表处理），
+    所以无论来自接口还是 DOM，都截断到 XHS_COMMENT_BUDGET 条，内存和耗时随预算而不是评论总数增长
+    """
+    note = (captured or {}).get("note") or {}
+    content = note.get("content") or _get_note_content(page)
+    publish_time = note.get("publish_time") or _get_publish_time(page)
+    
+    if captured and captured["pages"]:
+        comments = captured["comments"][:XHS_COMMENT_BUDGET]
+        print(f"  [CAPTURE] 接口评论 {len(comments)} 条（{captured['pages']} 页）")
+    elif comment_seconds is None or comment_seconds > 0:
+        seconds = XHS_COMMENT_SECONDS if comment_seconds is None else min(comment_seconds, XHS_COMMENT_SECONDS)
+        comments = _get_comments(page, max_seconds=seconds)
+    else:
+        comments = []
+    
+    title = info.get('title') or note.get('title')
+    if not title:
+        title_ele = page.ele('#detail-title', timeout=0.5)
+        title = (title_ele.text or "").strip() if title_ele else ""
+    
+    # 返回统一格式的数据
+    return {
+        "source": "小红书",
+        "title": title or '无标题',
+        "author": info.get('author') or note.get('author') or '未知作者',
+        "content": content,
+        "url": url,
+        "publish_time": publish_time,
+        "likes": info.get('like') or note.get('likes') or '0',
+        "comments": comments
+    }
+
+
+def _scroll_comments(page):
+    """滚动评论区（详情弹窗/详情页的 .note-scroller）到底部，触发下一页评论请求；找不到时滚动整个页面"""
+    scroller = page.ele('.note-scroller', timeout=0)
+    if scroller:
+        scroller.scroll.to_bottom()
+    else:
+        page.scroll.down(600)
+
+
 def _get_note_basic_info(note_element):
     """从列表页获取笔记基本信息"""
     info = {'title': '', 'author': '', 'like': '0'}
@@ -245,117 +787,89 @@ def _click_note(page, note_element):
 
 def _get_note_content(page):
     """获取笔记正文内容"""
-    content = ""
-    selectors = [
-        '#detail-desc .note-text',
-        '#detail-desc .desc',
-        '.note-scroller .desc',
-        '.note-content',
-        '.desc',
-        'xpath://div[contains(@class,"desc")]//span',
-        'xpath://div[@id="detail-desc"]',
-    ]
-    for selector in selectors:
-        try:
-            content_ele = page.ele(selector, timeout=1)
-            if content_ele:
-                text = content_ele.text
-                if text and len(text) > 3:
-                    content = text.strip()
-                    print(f"  [+] 正文: {content[:60]}...")
-                    break
-        except:
-            continue
+    def fetch(selector, timeout):
+        content_ele = page.ele(selector, timeout=timeout)
+        text = content_ele.text if content_ele else ""
+        return text.strip() if text and len(text) > 3 else None
+    
+    content = selector_cache.find("note_content", _CONTENT_SELECTORS, fetch, timeout=1) or ""
+    if content:
+        print(f"  [+] 正文: {content[:60]}...")
     return content
 
 
 def _get_publish_time(page):
     """获取发布时间"""
-    publish_time = ""
-    selectors = ['.date', '.bottom-container .date', 'xpath://span[contains(@class,"date")]']
-    for selector in selectors:
-        try:
-            time_ele = page.ele(selector, timeout=1)
-            if time_ele and time_ele.text:
-                publish_time = time_ele.text.strip()
-                break
-        except:
-            continue
-    return publish_time
-
-
-def _get_comments(page):
-    """获取评论列表"""
-    comments = []
-    selectors = [
-        '.comment-item',
-        '.parent-comment',
-        '.comments-container .comment',
-        'xpath://div[contains(@class,"comment-item")]',
-        'xpath://div[contains(@class,"commentItem")]',
-    ]
+    def fetch(selector, timeout):
+        time_ele = page.ele(selector, timeout=timeout)
+        return time_ele.text.strip() if time_ele and time_ele.text else None
     
-    for selector in selectors:
-        try:
-            comment_eles = page.eles(selector, timeout=2)
-            if comment_eles and len(comment_eles) > 0:
-                print(f"  [INFO] 找到 {len(comment_eles)} 条评论元素")
-                for ce in comment_eles[:10]:  # 最多取10条评论
-                    try:
-                        comment_text = ce.text.strip() if ce.text else ""
-                        if comment_text and len(comment_text) > 2:
-                            # 处理评论文本，提取实际内容
-                            lines = comment_text.split('\n')
-                            if len(lines) >= 2:
-                                content = '\n'.join(lines[1:]).strip()
-                            else:
-                                content = comment_text
-                            
-                            # 去重
-                            if content and content not in comments:
-                                comments.append(content)
-                                print(f"    [+] 评论: {content[:40]}...")
-                    except:
-                        continue
-                if comments:
-                    break
-        except:
-            continue
-    
-    return comments
+    return selector_cache.find("publish_time", _PUBLISH_TIME_SELECTORS, fetch, timeout=1) or ""
+
+
+def _get_comments(page, max_count=None, max_seconds=XHS_COMMENT_SECONDS):
+    """获取评论列表（滚动评论区、展开回复，直到读完或达到预算），条数不超过 XHS_COMMENT_BUDGET"""
+    limit = min(max_count or XHS_COMMENT_BUDGET, XHS_COMMENT_BUDGET)
+    return list(islice(_iter_comments(page, limit, max_seconds), limit))
+
+
+def _iter_comments(page, max_count=None, max_seconds=XHS_COMMENT_SECONDS):
+    """
+    逐条产出评论，边加载边去重
+    :param max_count: 条数预算，默认 XHS_COMMENT_BUDGET
+    :param max_seconds: 时间预算（秒）
+    """
+    harvester = CommentHarvester(page, scroll=lambda: _scroll_comments(page),
+                                 max_count=max_count or XHS_COMMENT_BUDGET, max_seconds=max_seconds, waits=wait_stats,
+                                 wait_ceiling=WAIT_COMMENTS_CEILING)
+    started = time.monotonic()
+    selector = selector_cache.find("comments", _COMMENT_SELECTORS, harvester.probe, timeout=2)
+    if not selector:
+        return
+    print("  [INFO] 加载评论...")
+    for comment in harvester.iter(selector):
+        if harvester.count <= 3:
+            print(f"    [+] 评论: {comment[:40]}...")
+        yield comment
+    stats = harvester.stats()
+    reasons = {"count": "达到条数上限", "time": "达到时间上限", "end": "已到底", "idle": "没有更多评论"}
+    print(f"  [INFO] 读取 {stats['count']} 条评论（{reasons.get(stats['stop_reason'], stats['stop_reason'])}，"
+          f"{stats['rounds']} 轮，展开回复 {stats['expanded']} 次，重复 {stats['duplicates']} 条，"
+          f"用时 {time.monotonic() - started:.1f} 秒）")
 
 
 def _close_detail_page(page):
     """关闭详情页弹窗，返回搜索列表"""
     try:
-        close_selectors = [
-            '.close-circle',
-            '.close',
-            'xpath://div[contains(@class,"close")]',
-            'xpath://*[contains(@class,"close")]',
-        ]
-        for selector in close_selectors:
-            try:
-                close_btn = page.ele(selector, timeout=1)
-                if close_btn:
-                    close_btn.click()
-                    time.sleep(0.5)
-                    return
-            except:
-                continue
+        # 点击关闭按钮；点击后弹窗确实消失才算该选择器命中
+        def click_close(selector, timeout):
+            close_btn = page.ele(selector, timeout=timeout)
+            if not close_btn:
+                return False
+            close_btn.click()
+            return _wait_detail_closed(page)
+        
+        if selector_cache.find("close_button", _CLOSE_SELECTORS, click_close, timeout=1):
+            return
         
         # 尝试按ESC键
         page.actions.key_down('ESCAPE').key_up('ESCAPE')
-        time.sleep(0.5)
+        if _wait_detail_closed(page):
+            return
         
         # 点击遮罩层
         try:
             mask = page.ele('.mask', timeout=0.5)
             if mask:
                 mask.click()
-                time.sleep(0.5)
+                _wait_detail_closed(page)
         except:
             pass
             
     except Exception as e:
-        print(f"  [WARN] 关闭详情页失败: {e}")
\ No newline at end of file
+        print(f"  [WARN] 关闭详情页失败: {e}")
+
+
+def _wait_detail_closed(page):
+    """等待详情弹窗消失（原为固定 0.5 秒）"""
+    return wait_stats.wait("detail_close", ele_absent(page, *_DETAIL_MODAL_SELECTORS), WAIT_CLOSE_CEILING, 0.5)
@@ -0,0 +1,230 @@
+# spiders/zhihu_detail.py
+"""
+知乎详情抓取（第二阶段）
+根据搜索结果的URL/ID并发获取回答或文章的完整正文，以及分页的评论（含楼中楼），
+替换搜索阶段只有摘要的 content/comments 字段
+- 请求复用 zhihu_spider 的 Session、响应缓存、代理池和按账号区分的速率控制器
+- 线程池限制同时处理的条目数；输入可以是搜索生成器，边搜索边抓详情（流水线）
+- 结果放入有界队列逐条 yield，可直接交给 iter_clean_comments
+"""
+import re
+import html
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from spiders.zhihu_spider import (
+    ZHIHU_API_BASE, REQUEST_TIMEOUT, STREAM_QUEUE_SIZE, rate_for, _fetch_json, _make_session,
+    _pool_for,
+)
+
+# ================= 配置区域 =================
+API_ANSWER = ZHIHU_API_BASE + "/api/v4/answers/{id}?include=content,voteup_count,comment_count,created_time,question,author"
+API_ARTICLE = ZHIHU_API_BASE + "/api/v4/articles/{id}"
+API_ROOT_COMMENTS = ZHIHU_API_BASE + "/api/v4/{kind}s/{id}/root_comments?order=normal&limit={limit}&offset={offset}"
+
+DETAIL_CONCURRENCY = 4       # 同时处理的条目数（请求频率仍由速率控制器统一限制）
+DETAIL_MAX_COMMENTS = 100    # 每条回答/文章最多获取的评论数（含楼中楼）
+COMMENT_PAGE_LIMIT = 20      # 评论每页条数
+
+_ANSWER_URL_RE = re.compile(r"/answers?/(\d+)")
+_ARTICLE_URL_RE = re.compile(r"(?:zhuanlan\.zhihu\.com/p/|/articles?/)(\d+)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_BLOCK_TAG_RE = re.compile(r"<(?:br|/p|/li|/h\d|/blockquote)[^>]*>", re.I)
+# ===========================================
+
+_STREAM_END = object()
+
+
+def parse_target(item):
+    """
+    从搜索结果/URL中识别抓取目标
+    :param item: 搜索结果字典（含 url）或 URL 字符串
+    :return: ("answer" | "article", id)，无法识别（如问题页）返回 None
+    """
+    url = item.get("url", "") if isinstance(item, dict) else str(item or "")
+    match = _ARTICLE_URL_RE.search(url)
+    if match:
+        return "article", match.group(1)
+    match = _ANSWER_URL_RE.search(url)
+    if match:
+        return "answer", match.group(1)
+    return None
+
+
+def html_to_text(content):
+    """回答/文章正文 HTML 转纯文本，段落之间保留换行"""
+    if not content:
+        return ""
+    text = _BLOCK_TAG_RE.sub("\n", content)
+    text = html.unescape(_HTML_TAG_RE.sub("", text))
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+class _DetailState:
+    """一次详情抓取的输出队列和取消标记"""
+
+    def __init__(self, queue_size=STREAM_QUEUE_SIZE, cookies=None):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.cookies = cookies
+        self.cancelled = False
+        self.fetched = 0
+        self.failed = 0
+        self.comments = 0
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def emit(self, row):
+        """放入输出队列；队列满时等待消费者，已取消则丢弃"""
+        while not self.cancelled:
+            try:
+                self.queue.put(row, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def fetch_zhihu_details(items, cookie_str=None, concurrency=DETAIL_CONCURRENCY, max_comments=DETAIL_MAX_COMMENTS,
+                        rate=None):
+    """参数见 iter_fetch_zhihu_details，收集全部结果后一次性返回"""
+    return list(iter_fetch_zhihu_details(items, cookie_str=cookie_str, concurrency=concurrency,
+                                         max_comments=max_comments, rate=rate))
+
+
+def iter_fetch_zhihu_details(items, cookie_str=None, concurrency=DETAIL_CONCURRENCY,
+                             max_comments=DETAIL_MAX_COMMENTS, rate=None):
+    """
+    并发抓取知乎回答/文章的完整正文和评论（流式版本）
+    :param items: 搜索结果（iter_search_zhihu 的输出）或 URL 的可迭代对象，按需读取，可以是生成器
+    :param cookie_str: 知乎Cookie字符串；不传时使用 Cookie 池
+    :param concurrency: 同时处理的条目数
+    :param max_comments: 每条最多获取的评论数，0 表示只抓正文
+    :param rate: 速率控制器，默认与搜索共用该 Cookie 的控制器（rate_for）
+    :return: 生成器，逐条产出统一格式的结果；content 为完整正文，comments 为评论列表；
+             无法识别或抓取失败的条目原样输出（保留搜索摘要）
+    """
+    cookies = _pool_for(cookie_str)
+    if cookies is False:
+        # 没有任何 Cookie 时原样输出，保留搜索摘要
+        for item in items:
+            yield dict(item) if isinstance(item, dict) else {"source": "知乎", "url": str(item)}
+        return
+    state = _DetailState(cookies=cookies)
+    producer = threading.Thread(
+        target=_run_details,
+        args=(items, cookie_str, max(1, concurrency), max_comments, rate or rate_for(cookie_str), state),
+        name="zhihu-detail", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            row = state.queue.get()
+            if row is _STREAM_END:
+                break
+            yield row
+    finally:
+        state.cancel()
+        # 输入是生成器时由生产线程负责关闭，这里只等待其退出
+        producer.join(timeout=REQUEST_TIMEOUT)
+
+
+def _run_details(items, cookie_str, concurrency, max_comments, rate, state):
+    """读取输入并提交到线程池；同时在途的条目不超过 concurrency，避免一次性读完上游生成器"""
+    slots = threading.BoundedSemaphore(concurrency)
+    session = _make_session(cookie_str)
+    items_iter = iter(items)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for item in items_iter:
+                slots.acquire()
+                if state.cancelled:
+                    slots.release()
+                    break
+                future = executor.submit(_fetch_one, session, item, max_comments, rate, state)
+                future.add_done_callback(lambda _: slots.release())
+        print(f"[DETAIL] 完成: 正文 {state.fetched} 条, 失败 {state.failed} 条, 评论 {state.comments} 条, "
+              f"速率状态: {rate.stats()}")
+    except Exception as e:
+        print(f"[ERROR] 知乎详情抓取异常: {e}")
+    finally:
+        close = getattr(items_iter, "close", None)
+        if close:
+            close()
+        state.emit(_STREAM_END)
+
+
+def _fetch_one(session, item, max_comments, rate, state):
+    """抓取单条回答/文章的正文和评论，放入输出队列"""
+    row = dict(item) if isinstance(item, dict) else {"source": "知乎", "url": str(item)}
+    target = parse_target(row)
+    if target is None or state.cancelled:
+        state.emit(row)
+        return
+    kind, object_id = target
+    try:
+        detail = _fetch_body(session, kind, object_id, rate, state)
+        if detail is None:
+            with state._lock:
+                state.failed += 1
+            print(f"[DETAIL] 正文获取失败: {kind} {object_id}")
+            state.emit(row)
+            return
+        row.update(detail)
+        comments = _fetch_comments(session, kind, object_id, max_comments, rate, state) if max_comments else []
+        # 没有评论时保留正文作为分析文本，与搜索阶段的格式一致
+        row["comments"] = comments or ([row["content"]] if row.get("content") else [])
+        with state._lock:
+            state.fetched += 1
+            state.comments += len(comments)
+        print(f"[DETAIL] {kind} {object_id}: 正文 {len(row.get('content', ''))} 字, 评论 {len(comments)} 条")
+    except Exception as e:
+        print(f"[WARN] 处理 {kind} {object_id} 失败: {e}")
+    state.emit(row)
+
+
+def _fetch_body(session, kind, object_id, rate, state):
+    """获取完整正文，返回需要覆盖的字段；失败返回 None"""
+    url = (API_ANSWER if kind == "answer" else API_ARTICLE).format(id=object_id)
+    data = _fetch_json(session, url, rate, cookies=state.cookies)
+    if not data or not data.get("content"):
+        return None
+    author = data.get("author") or {}
+    detail = {
+        "content": html_to_text(data.get("content")),
+        "likes": str(data.get("voteup_count", "") or ""),
+    }
+    title = data.get("title") or (data.get("question") or {}).get("title")
+    if title:
+        detail["title"] = title
+    if author.get("name"):
+        detail["author"] = author["name"]
+    if kind == "answer":
+        question_id = (data.get("question") or {}).get("id")
+        detail["url"] = (f"https://www.zhihu.com/question/{question_id}/answer/{object_id}" if question_id
+                         else f"https://www.zhihu.com/answer/{object_id}")
+    else:
+        detail["url"] = f"https://zhuanlan.zhihu.com/p/{object_id}"
+    return detail
+
+
+def _fetch_comments(session, kind, object_id, max_comments, rate, state):
+    """按页获取评论（含每条评论附带的楼中楼），达到 max_comments、最后一页或被取消时停止"""
+    comments = []
+    offset = 0
+    while len(comments) < max_comments and not state.cancelled:
+        url = API_ROOT_COMMENTS.format(kind=kind, id=object_id, limit=COMMENT_PAGE_LIMIT, offset=offset)
+        data = _fetch_json(session, url, rate, cookies=state.cookies)
+        if not data:
+            break
+        page = data.get("data") or []
+        for comment in page:
+            for c in [comment] + list(comment.get("child_comments") or []):
+                text = html_to_text(c.get("content", ""))
+                if text:
+                    comments.append(text)
+        if not page or (data.get("paging") or {}).get("is_end", True):
+            break
+        offset += len(page)
+    return comments[:max_comments]
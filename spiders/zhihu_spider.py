@@ -5,12 +5,34 @@
 使用知乎的 search_v3 JSON API
 增强版：支持多种搜索类型、时间范围筛选、代理IP池、速度控制
 """
+import os
+import re
+import json
+import hashlib
 import time
 import random
 import logging
-from datetime import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import zip_longest
 from urllib.parse import quote_plus, urljoin
 import requests
+from spiders.rate_controller import AIMDRateController
+from spiders.http_cache import ResponseCache
+from spiders.strategy_stats import StrategyStats
+from spiders.proxy_pool import ProxyPool
+from spiders.http_fixtures import FixtureRecorder
+from spiders.cookie_pool import CookiePool
+from utils.near_dup import NearDupIndex
+from utils.seen_index import seen_index
+
+# 可选的快速JSON解码器：安装了 orjson 时使用，否则退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # ------------------------- Config -------------------------
 # 多个User-Agent轮换
@@ -22,9 +44,15 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
 ]
 
+# 知乎API地址，可用环境变量指向本地回放服务器（benchmarks/zhihu_replay_server.py）做离线测试
+ZHIHU_API_BASE = os.environ.get("ZHIHU_API_BASE", "https://www.zhihu.com").rstrip("/")
+
 # 知乎搜索API - 支持多种类型和筛选参数
-API_SEARCH = "https://www.zhihu.com/api/v4/search_v3?t={search_type}&q={q}&offset={offset}&limit={limit}"
-API_SEARCH_WITH_FILTER = "https://www.zhihu.com/api/v4/search_v3?t={search_type}&q={q}&offset={offset}&limit={limit}&time_interval={time_interval}&sort={sort}"
+API_SEARCH = ZHIHU_API_BASE + "/api/v4/search_v3?t={search_type}&q={q}&offset={offset}&limit={limit}"
+API_SEARCH_WITH_FILTER = ZHIHU_API_BASE + "/api/v4/search_v3?t={search_type}&q={q}&offset={offset}&limit={limit}&time_interval={time_interval}&sort={sort}"
+
+# 搜索结果中的关键词高亮标签
+_EM_TAG_RE = re.compile(r"</?em>")
 
 # 搜索策略组合 - 多维度获取更多结果
 SEARCH_STRATEGIES = [
@@ -49,11 +77,36 @@ SEARCH_STRATEGIES = [
 REQUEST_TIMEOUT = 20
 MAX_RETRIES = 3
 
+# 前端回传的游标的取值上限，超出视为无效游标
+CURSOR_MAX_OFFSET = 10000     # 单个策略的最大 offset
+CURSOR_MAX_ITEMS = 50000      # 已见过的URL数、近似重复索引条数上限
+
 # ==================== 速度控制配置 ====================
-# 每次请求后的休息时间范围（秒）
-PAGE_SLEEP_RANGE = (2.0, 4.0)      # 每页之间休息2-4秒
-STRATEGY_SLEEP_RANGE = (3.0, 6.0)  # 切换策略时休息3-6秒
-ERROR_SLEEP_RANGE = (5.0, 10.0)    # 出错后休息5-10秒
+# 自适应速率（AIMD）：请求正常时逐步提速，遇到 403/429/超时 立即减半并冷却
+RATE_INITIAL = 0.33          # 初始速率（次/秒），约每3秒一次请求
+RATE_MIN = 0.05              # 速率下限，最慢每20秒一次请求
+RATE_MAX = 1.0               # 速率上限，最快每秒一次请求
+RATE_INCREASE_STEP = 0.02    # 每次成功请求后增加的速率
+RATE_DECREASE_FACTOR = 0.5   # 被限制后速率乘以该系数
+
+# 流式输出队列长度：消费者处理不及时时爬取线程在此等待，避免结果全部堆积在内存中
+STREAM_QUEUE_SIZE = 100
+
+# ==================== 响应缓存配置 ====================
+# 相同的 search_v3 页面在有效期内直接读取本地缓存，不发请求也不占用速率
+CACHE_ENABLED = True
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "resource", "cache", "zhihu_search.sqlite3")
+CACHE_TTL_SECONDS = 6 * 3600            # 缓存有效期6小时
+CACHE_MAX_BYTES = 200 * 1024 * 1024     # 缓存总大小上限200MB
+
+# ==================== 策略产出统计配置 ====================
+# 按关键词记录各策略的新增条数，后续爬取按产出排序并跳过近期低产出的策略
+ADAPTIVE_STRATEGIES = True
+STRATEGY_STATS_PATH = os.path.join(os.path.dirname(CACHE_PATH), "zhihu_strategy_stats.json")
+
+# 录制：设置目录后把每个成功的API响应写成 fixture 文件，供回放服务器和基准测试使用
+RECORD_FIXTURES_DIR = os.environ.get("ZHIHU_RECORD_DIR", "")
 
 # ==================== 代理IP池配置 ====================
 # 设置为True启用代理，需要配置PROXY_LIST或PROXY_API
@@ -73,217 +126,658 @@ PROXY_API = ""
 # 代理失败后的重试次数
 PROXY_RETRY_COUNT = 3
 
+# 代理连续失败多少次后熔断，以及熔断冷却时间（秒）
+PROXY_FAILURE_THRESHOLD = 3
+PROXY_COOLDOWN_SECONDS = 60
 
-class ProxyPool:
-    """代理IP池管理器"""
-    
-    def __init__(self):
-        self.proxies = list(PROXY_LIST) if PROXY_LIST else []
-        self.current_index = 0
-        self.failed_proxies = set()
-    
-    def get_proxy(self):
-        """获取一个代理IP"""
-        if not USE_PROXY:
-            return None
-        
-        # 优先从API获取
-        if PROXY_API:
-            try:
-                resp = requests.get(PROXY_API, timeout=5)
-                if resp.status_code == 200:
-                    proxy = resp.text.strip()
-                    if proxy and ":" in proxy:
-                        if not proxy.startswith("http"):
-                            proxy = f"http://{proxy}"
-                        print(f"[PROXY] 从API获取代理: {proxy}")
-                        return {"http": proxy, "https": proxy}
-            except Exception as e:
-                print(f"[PROXY] API获取代理失败: {e}")
+
+# ==================== Cookie池配置 ====================
+# 调用爬虫时没有传入 cookie_str 则使用 Cookie 池中的多个账号轮换请求（管理员也可通过 /api/crawler/cookies 接口添加）
+# Cookie 池模式下每个账号独立做 AIMD 限速，多个策略可以同时使用不同账号，总速率随账号数增加
+COOKIE_LIST = [
+    # "z_c0=...; d_c0=...",
+]
+COOKIE_BUDGET_PER_WINDOW = 300      # 每个账号每个窗口最多请求次数
+COOKIE_BUDGET_WINDOW_SECONDS = 3600
+COOKIE_COOLDOWN_SECONDS = 60        # 被限制后的基础冷却时间，连续被限制时翻倍
+
+
+# 全局代理池实例（API代理由后台线程预取，按成功率和延迟打分，连续失败的代理熔断冷却）
+proxy_pool = ProxyPool(PROXY_LIST, api_url=PROXY_API, enabled=USE_PROXY,
+                       failure_threshold=PROXY_FAILURE_THRESHOLD, cooldown=PROXY_COOLDOWN_SECONDS)
+
+# 速率控制器按账号（Cookie）区分：知乎按账号限流，同一账号的所有请求共享一个预算，不同账号互不影响；
+# 学到的速率在多次爬取之间保留
+_rate_controllers = {}
+_rate_lock = threading.Lock()
+
+# 全局 Cookie 池
+cookie_pool = CookiePool(
+    COOKIE_LIST, budget=COOKIE_BUDGET_PER_WINDOW, window=COOKIE_BUDGET_WINDOW_SECONDS, cooldown=COOKIE_COOLDOWN_SECONDS,
+    rate_options=dict(initial_rate=RATE_INITIAL, min_rate=RATE_MIN, max_rate=RATE_MAX,
+                      increase_step=RATE_INCREASE_STEP, decrease_factor=RATE_DECREASE_FACTOR)
+)
+
+# 全局响应缓存（按规范化URL缓存，忽略 User-Agent 和 Cookie）
+response_cache = ResponseCache(CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES)
+
+# 全局策略产出统计
+strategy_stats = StrategyStats(STRATEGY_STATS_PATH)
+
+# 响应录制器（未配置目录时为 None）
+fixture_recorder = FixtureRecorder(RECORD_FIXTURES_DIR) if RECORD_FIXTURES_DIR else None
+
+
+class CrawlCursor:
+    """
+    可恢复的爬取游标
+    记录当前策略序号、每个策略下一页的 offset、已结束的策略，以及已见过的URL和内容的近似重复索引，
+    下一批次传入同一个游标即可从上次停下的位置继续，不再重复请求和去重之前的页面
+    """
+
+    def __init__(self, keyword="", strategy_idx=0, offsets=None, exhausted=None,
+                 seen_urls=None, near_dup=None):
+        self.keyword = keyword
+        self.strategy_idx = strategy_idx  # 第一个尚未结束的策略
+        self.offsets = dict(offsets or {})  # {策略序号: 下一页offset}
+        self.exhausted = set(exhausted or [])  # 已无更多数据的策略序号
+        self.seen_urls = set(seen_urls or [])
+        self.near_dup = near_dup if near_dup is not None else NearDupIndex()
+        self._lock = threading.Lock()
+
+    def offset_for(self, strategy_idx):
+        return self.offsets.get(strategy_idx, 0)
+
+    def advance(self, strategy_idx, next_offset):
+        self.offsets[strategy_idx] = next_offset
+
+    def mark_exhausted(self, strategy_idx):
+        with self._lock:
+            self.exhausted.add(strategy_idx)
+            while self.strategy_idx in self.exhausted:
+                self.strategy_idx += 1
+
+    def is_exhausted(self, strategy_idx):
+        return strategy_idx in self.exhausted
+
+    @property
+    def done(self):
+        """所有策略都已结束"""
+        return self.strategy_idx >= len(SEARCH_STRATEGIES)
+
+    def to_dict(self):
+        return {
+            "keyword": self.keyword,
+            "strategy_idx": self.strategy_idx,
+            "offsets": {str(k): v for k, v in self.offsets.items()},
+            "exhausted": sorted(self.exhausted),
+            "seen_urls": list(self.seen_urls),
+            "near_dup": self.near_dup.dump(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 的结果恢复；数据可能来自前端回传，格式或取值不合法时抛出 ValueError"""
+        if not isinstance(data, dict):
+            raise ValueError("游标格式错误")
+        keyword = data.get("keyword", "")
+        seen_urls = data.get("seen_urls") or []
+        near_dup = data.get("near_dup") or {}
+        try:
+            strategy_idx = int(data.get("strategy_idx", 0))
+            offsets = {int(k): int(v) for k, v in (data.get("offsets") or {}).items()}
+            exhausted = [int(i) for i in data.get("exhausted") or []]
+        except (TypeError, ValueError, AttributeError, OverflowError) as e:
+            raise ValueError(f"游标格式错误: {e}")
         
-        # 从静态列表轮换
-        available = [p for p in self.proxies if p not in self.failed_proxies]
-        if not available:
-            # 重置失败列表，重新尝试
-            self.failed_proxies.clear()
-            available = self.proxies
+        total = len(SEARCH_STRATEGIES)
+        if not isinstance(keyword, str):
+            raise ValueError("游标关键词格式错误")
+        if not 0 <= strategy_idx <= total or any(not 0 <= i < total for i in exhausted):
+            raise ValueError("游标策略序号超出范围")
+        if any(not 0 <= k < total or not 0 <= v <= CURSOR_MAX_OFFSET for k, v in offsets.items()):
+            raise ValueError("游标 offset 超出范围")
+        if (not isinstance(seen_urls, list) or len(seen_urls) > CURSOR_MAX_ITEMS
+                or not all(isinstance(url, str) for url in seen_urls)):
+            raise ValueError("游标URL列表格式错误")
+        if isinstance(near_dup, dict):
+            if sum(len(v) for v in near_dup.values() if isinstance(v, list)) > CURSOR_MAX_ITEMS:
+                raise ValueError("游标近似重复索引过大")
+        return cls(keyword=keyword, strategy_idx=strategy_idx, offsets=offsets, exhausted=exhausted,
+                   seen_urls=seen_urls, near_dup=NearDupIndex.load(near_dup))
+
+
+class _CrawlState:
+    """
+    一次爬取的共享状态（线程安全）：已产出条数和输出队列，去重集合来自游标
+    新数据放入有界队列，由 iter_search_zhihu 逐条取出；消费者停止读取时调用 cancel() 让爬取线程尽快结束
+    """
+
+    def __init__(self, max_count, cursor, queue_size=STREAM_QUEUE_SIZE, out_queue=None, keyword=None,
+                 incremental=False, stop_on_seen_page=True, mark_seen=True, cookies=None):
+        """
+        :param out_queue: 输出队列，多关键词爬取时各关键词共用一个；默认新建
+        :param keyword: 设置后在每条结果中附带 keyword 字段，便于区分来自哪个关键词
+        :param incremental: 是否查询跨运行的 seen_index，只输出之前运行没有产出过的条目
+        :param stop_on_seen_page: 增量模式下某页条目全部已见过时结束该策略
+        :param mark_seen: 增量模式下是否把本次产出的条目写入 seen_index（调用方处理完再写入时传 False）
+        :param cookies: CookiePool，使用 Cookie 池轮换账号时传入
+        """
+        self.max_count = max_count
+        self.cursor = cursor
+        self.keyword = keyword
+        self.seen = seen_index if incremental else None
+        self.stop_on_seen_page = stop_on_seen_page
+        self.mark_seen = mark_seen
+        self.cookies = cookies
+        self.count = 0
+        self.seen_urls = cursor.seen_urls  # 用于URL去重
+        self.near_dup = cursor.near_dup  # 标题+摘要的近似重复检测（处理转载、轻微改动的相同内容）
+        self.queue = out_queue if out_queue is not None else queue.Queue(maxsize=queue_size)
+        self.cancelled = False
+        self.strategy_pages = {}  # 策略序号 -> [请求页数, 遍历条数]
+        self.returned = {}  # 条目URL -> 返回过该条目的策略序号集合
+        self._lock = threading.Lock()
+
+    def is_full(self):
+        return self.cancelled or self.count >= self.max_count
+
+    def cancel(self):
+        self.cancelled = True
+
+    def add(self, item):
+        """去重后输出，返回是否为新数据"""
+        item_url = item.get("url", "")
         
-        if available:
-            proxy = available[self.current_index % len(available)]
-            self.current_index += 1
-            print(f"[PROXY] 使用代理: {proxy}")
-            return {"http": proxy, "https": proxy}
+        with self._lock:
+            if self.is_full():
+                return False
+            # URL去重
+            if item_url and item_url in self.seen_urls:
+                return False
+            # 近似重复去重（处理相同内容不同URL的情况）
+            if not self.near_dup.add(f"{item.get('title', '')} {item.get('content', '')}"):
+                return False
+            
+            if item_url:
+                self.seen_urls.add(item_url)
+            self.count += 1
         
-        print("[PROXY] 无可用代理，使用直连")
-        return None
-    
-    def mark_failed(self, proxy_dict):
-        """标记代理失败"""
-        if proxy_dict:
-            proxy = proxy_dict.get("http", "")
-            if proxy:
-                self.failed_proxies.add(proxy)
-                print(f"[PROXY] 标记代理失败: {proxy}")
+        row = {
+            "source": "知乎",
+            "title": item.get("title", "无标题"),
+            "author": item.get("author_name", "匿名用户"),
+            "content": item.get("content", ""),
+            "url": item_url,
+            "publish_time": item.get("publish_time", ""),
+            "likes": item.get("likes", ""),
+            "comments": [item.get("content", "")] if item.get("content") else []
+        }
+        if self.keyword is not None:
+            row["keyword"] = self.keyword
+        self.emit(row)
+        return True
 
+    def emit(self, row):
+        """放入输出队列；队列满时等待消费者，已取消则丢弃"""
+        while not self.cancelled:
+            try:
+                self.queue.put(row, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def note_page(self, strategy_idx, fetched, items):
+        """记录某策略请求到的一页（items 为去掉之前运行已产出过的条目），用于计算策略产出"""
+        with self._lock:
+            pages = self.strategy_pages.setdefault(strategy_idx, [0, 0])
+            pages[0] += 1
+            pages[1] += fetched
+            for item in items:
+                key = item.get("url") or item.get("title")
+                if key:
+                    self.returned.setdefault(key, set()).add(strategy_idx)
+
+    def strategy_yields(self):
+        """
+        本次运行各策略的产出，与策略执行顺序无关：每个不同条目按返回它的策略数平分计入各策略，
+        排在后面的策略不会因为结果已被前面的策略取走而显得低产出
+        :return: {策略序号: (请求页数, 遍历条数, 新增条数)}
+        """
+        with self._lock:
+            credit = dict.fromkeys(self.strategy_pages, 0.0)
+            for strategies in self.returned.values():
+                share = 1.0 / len(strategies)
+                for strategy_idx in strategies:
+                    credit[strategy_idx] += share
+            return {idx: (pages, fetched, round(credit[idx], 2))
+                    for idx, (pages, fetched) in self.strategy_pages.items()}
 
-# 全局代理池实例
-proxy_pool = ProxyPool()
 
+# 流式输出结束标记
+_STREAM_END = object()
 
-def search_and_crawl_zhihu(keyword, max_count=5, cookie_str=None, offset=0):
+
+def search_and_crawl_zhihu(keyword, max_count=5, cookie_str=None, offset=0, concurrency=1, rate=None, cursor=None,
+                          adaptive=None, incremental=False, stop_on_seen_page=True, mark_seen=True):
     """
     知乎爬虫封装函数（Web版本）- 增强版
     使用多种搜索策略组合（类型+时间范围+排序方式）突破API限制
+    参数见 iter_search_zhihu，本函数收集全部结果后一次性返回
+    :return: 结果列表
+    """
+    return list(iter_search_zhihu(keyword, max_count=max_count, cookie_str=cookie_str, offset=offset,
+                                  concurrency=concurrency, rate=rate, cursor=cursor, adaptive=adaptive,
+                                  incremental=incremental, stop_on_seen_page=stop_on_seen_page, mark_seen=mark_seen))
+
+
+def iter_search_zhihu(keyword, max_count=5, cookie_str=None, offset=0, concurrency=1, rate=None, cursor=None,
+                      adaptive=None, incremental=False, stop_on_seen_page=True, mark_seen=True):
+    """
+    知乎爬虫（流式版本）：每解析出一条新数据立即 yield，下游清洗/分析/前端无需等待整个爬取结束
     :param keyword: 搜索关键词
     :param max_count: 限制爬取的数量（会内部分页获取直到达到此数量）
-    :param cookie_str: 知乎Cookie字符串（由前端传入，必填）
-    :param offset: 起始偏移量，用于分批爬取
-    :return: 结果列表
+    :param cookie_str: 知乎Cookie字符串（由前端传入）；不传时使用 Cookie 池
+    :param offset: 起始偏移量，用于分批爬取（仅作用于第一个策略；传入 cursor 时忽略）
+    :param concurrency: 同时执行的搜索策略数，1 为串行；不超过可用账号数（单个 Cookie 时为串行），
+                        各策略共享去重集合，Cookie 池模式下分别使用不同账号的速率预算
+    :param rate: 速率控制器（仅传入 cookie_str 时使用），默认为该 Cookie 的控制器（rate_for）
+    :param cursor: CrawlCursor，分批爬取时传入上一批的游标，会被原地更新
+    :param adaptive: 是否按历史产出排序/跳过策略，默认取 ADAPTIVE_STRATEGIES
+    :param incremental: 增量爬取，只输出之前运行没有产出过的条目（跨运行记录在 seen_index）
+    :param stop_on_seen_page: 增量模式下某页条目全部已见过时提前结束该策略
+    :param mark_seen: 增量模式下是否立即把产出的条目记为已见过
+    :return: 生成器，逐条产出统一格式的结果
     """
-    print(f"[DEBUG] search_and_crawl_zhihu called: keyword={keyword}, max_count={max_count}, offset={offset}")
-    results = []
-    seen_urls = set()  # 用于URL去重
-    seen_titles = set()  # 用于标题去重（处理不同URL但相同内容的情况）
+    print(f"[DEBUG] iter_search_zhihu called: keyword={keyword}, max_count={max_count}, offset={offset}, concurrency={concurrency}")
+    if cursor is None:
+        cursor = CrawlCursor(keyword)
+        if offset:
+            cursor.advance(0, offset)
     
-    # 构建请求头
-    headers = _make_headers(cookie_str)
+    # 检查Cookie：未传入时使用 Cookie 池
+    cookies = _pool_for(cookie_str)
+    if cookies is False:
+        return
+    state = _CrawlState(max_count, cursor, incremental=incremental, stop_on_seen_page=stop_on_seen_page,
+                        mark_seen=mark_seen, cookies=cookies)
     
-    # 检查Cookie
-    if not cookie_str or len(cookie_str) < 10:
-        print("[ERROR] 未检测到有效Cookie，知乎爬取需要Cookie！")
-        return results
+    # 爬取在后台线程执行，这里从队列中逐条取出
+    producer = threading.Thread(
+        target=_run_crawl, args=(keyword, cookie_str, _worker_count(concurrency, cookies), rate or rate_for(cookie_str),
+                                 adaptive, state),
+        name="zhihu-crawl", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            row = state.queue.get()
+            if row is _STREAM_END:
+                break
+            yield row
+    finally:
+        # 消费者提前停止时通知爬取线程退出，并等待其完成当前请求以保证游标一致
+        state.cancel()
+        producer.join(timeout=REQUEST_TIMEOUT)
+
+
+def search_and_crawl_zhihu_multi(keywords, max_count=5, cookie_str=None, concurrency=None, rate=None, cursors=None,
+                                adaptive=None, incremental=False, stop_on_seen_page=True, mark_seen=True):
+    """
+    多关键词知乎爬取：参数见 iter_search_zhihu_multi，收集全部结果后一次性返回
+    :return: 结果列表，每条附带 keyword 字段
+    """
+    return list(iter_search_zhihu_multi(keywords, max_count=max_count, cookie_str=cookie_str,
+                                        concurrency=concurrency, rate=rate, cursors=cursors, adaptive=adaptive,
+                                        incremental=incremental, stop_on_seen_page=stop_on_seen_page,
+                                        mark_seen=mark_seen))
+
+
+def iter_search_zhihu_multi(keywords, max_count=5, cookie_str=None, concurrency=None, rate=None, cursors=None,
+                            adaptive=None, incremental=False, stop_on_seen_page=True, mark_seen=True):
+    """
+    多关键词知乎爬取（流式版本）
+    所有关键词共用一个 Session（连接池）和同一组账号的速率预算，各关键词的策略交错排队执行：
+    Cookie 池模式下多个策略同时使用不同账号，单个 Cookie 时按交错顺序串行
+    :param keywords: 关键词列表
+    :param max_count: 每个关键词的爬取数量上限
+    :param cookie_str: 知乎Cookie字符串；不传时使用 Cookie 池
+    :param concurrency: 同时执行的策略数，默认等于关键词数，不超过可用账号数
+    :param rate: 速率控制器（仅传入 cookie_str 时使用），默认为该 Cookie 的控制器（rate_for）
+    :param cursors: {关键词: CrawlCursor}，分批爬取时传入上一批的游标，会被原地更新；缺少的关键词会新建游标并写回
+    :param adaptive: 是否按历史产出排序/跳过策略，默认取 ADAPTIVE_STRATEGIES
+    :param incremental, stop_on_seen_page, mark_seen: 增量爬取选项，见 iter_search_zhihu
+    :return: 生成器，逐条产出统一格式的结果（附带 keyword 字段）
+    """
+    keywords = list(dict.fromkeys(k for k in keywords if k))
+    print(f"[DEBUG] iter_search_zhihu_multi called: keywords={keywords}, max_count={max_count}, concurrency={concurrency}")
+    if not keywords:
+        return
+    cookies = _pool_for(cookie_str)
+    if cookies is False:
+        return
+    
+    cursors = cursors if cursors is not None else {}
+    out_queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    states = {}
+    for keyword in keywords:
+        cursor = cursors.setdefault(keyword, CrawlCursor(keyword))
+        states[keyword] = _CrawlState(max_count, cursor, out_queue=out_queue, keyword=keyword, incremental=incremental,
+                                      stop_on_seen_page=stop_on_seen_page, mark_seen=mark_seen, cookies=cookies)
     
-    # 创建Session
+    producer = threading.Thread(
+        target=_run_multi_crawl,
+        args=(states, cookie_str, _worker_count(concurrency or len(keywords), cookies), rate or rate_for(cookie_str),
+              adaptive, out_queue),
+        name="zhihu-crawl-multi", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            row = out_queue.get()
+            if row is _STREAM_END:
+                break
+            yield row
+    finally:
+        for state in states.values():
+            state.cancel()
+        producer.join(timeout=REQUEST_TIMEOUT)
+
+
+def _run_multi_crawl(states, cookie_str, concurrency, rate, adaptive, out_queue):
+    """在后台线程中交错执行各关键词的策略，结束时放入结束标记"""
+    try:
+        session = _make_session(cookie_str)
+        print(f"[INFO] 开始多关键词爬取知乎: {list(states)}, 每个关键词目标数量: "
+              f"{next(iter(states.values())).max_count}, 并发: {concurrency}")
+        
+        # 各关键词的策略计划轮流取一个，交错排成一个任务队列
+        plans = [[(keyword, idx, strategy) for idx, strategy in _plan_strategies(keyword, state.cursor, adaptive)]
+                 for keyword, state in states.items()]
+        tasks = []
+        for round_tasks in zip_longest(*plans):
+            tasks.extend(task for task in round_tasks if task is not None)
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [
+                executor.submit(_crawl_strategy, session, keyword, strategy_idx, strategy, states[keyword], rate)
+                for keyword, strategy_idx, strategy in tasks
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[WARN] 策略执行异常: {e}")
+        
+        for keyword, state in states.items():
+            _record_strategy_stats(keyword, state)
+        strategy_stats.flush()
+        counts = {keyword: state.count for keyword, state in states.items()}
+        suppressed = sum(state.near_dup.suppressed for state in states.values())
+        print(f"[DONE] 多关键词爬取完成: {counts}, 近似重复过滤 {suppressed} 条, "
+              f"速率状态: {_rate_report(rate, next(iter(states.values())).cookies)}")
+        if CACHE_ENABLED:
+            print(f"[CACHE] 缓存统计: {response_cache.stats()}")
+    except Exception as e:
+        print(f"[ERROR] 知乎多关键词爬取异常: {e}")
+    finally:
+        # 消费者已全部取消时不再等待队列
+        while not all(state.cancelled for state in states.values()):
+            try:
+                out_queue.put(_STREAM_END, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+
+def _pool_for(cookie_str):
+    """
+    决定本次爬取的 Cookie 来源
+    :return: None 表示使用传入的 cookie_str；CookiePool 表示使用 Cookie 池；False 表示都没有，无法爬取
+    """
+    if cookie_str and len(cookie_str) >= 10:
+        return None
+    if cookie_pool.usable_count():
+        print(f"[INFO] 未传入Cookie，使用Cookie池: {cookie_pool.usable_count()} 个账号")
+        return cookie_pool
+    print("[ERROR] 未检测到有效Cookie，且Cookie池为空，知乎爬取需要Cookie！")
+    return False
+
+
+def _normalize_cookie(cookie_str):
+    """去除前后空白和可能的 "cookie:" / "cookie=" 前缀"""
+    cookie_str = (cookie_str or "").strip()
+    if cookie_str.lower().startswith("cookie:"):
+        cookie_str = cookie_str.split(":", 1)[1].strip()
+    elif cookie_str.lower().startswith("cookie="):
+        cookie_str = cookie_str.split("=", 1)[1].strip()
+    return cookie_str
+
+
+def rate_for(cookie_str):
+    """返回该 Cookie（账号）的速率控制器，同一账号的所有爬取共享，不存在时创建"""
+    key = hashlib.sha1(_normalize_cookie(cookie_str).encode("utf-8")).hexdigest()[:12]
+    with _rate_lock:
+        rate = _rate_controllers.get(key)
+        if rate is None:
+            rate = AIMDRateController(
+                initial_rate=RATE_INITIAL, min_rate=RATE_MIN, max_rate=RATE_MAX,
+                increase_step=RATE_INCREASE_STEP, decrease_factor=RATE_DECREASE_FACTOR, name=f"zhihu:{key[:6]}"
+            )
+            _rate_controllers[key] = rate
+        return rate
+
+
+def _rate_report(rate, cookies):
+    """结束日志中的速率状态：Cookie 池模式下请求走各账号自己的控制器，报告各账号的状态"""
+    if cookies is not None:
+        return cookies.rate_stats()
+    return rate.stats()
+
+
+def _worker_count(concurrency, cookies):
+    """
+    实际同时执行的策略数，不超过可用的速率预算数（账号数）
+    单个 Cookie 时所有请求排队等待同一个预算，多开线程不会更快，反而会多发填满后被丢弃的请求；
+    Cookie 池模式下每个账号一个预算，多个策略同时执行时分别使用不同账号
+    """
+    concurrency = max(1, concurrency or 1)
+    budgets = cookies.usable_count() if cookies is not None else 1
+    workers = max(1, min(concurrency, budgets))
+    if workers < concurrency:
+        print(f"[INFO] 可用账号 {budgets} 个，并发策略数 {concurrency} 降为 {workers}")
+    return workers
+
+
+def _make_session(cookie_str):
+    """创建带公共请求头的 Session"""
     session = requests.Session()
-    session.headers.update(headers)
+    session.headers.update(_make_headers(cookie_str))
+    return session
+
+
+def _plan_strategies(keyword, cursor, adaptive):
+    """按历史产出安排策略顺序，近期低产出的策略直接在游标中标记为结束，返回尚未结束的 [(策略序号, 策略)]"""
+    if ADAPTIVE_STRATEGIES if adaptive is None else adaptive:
+        plan, skipped = strategy_stats.plan(keyword, SEARCH_STRATEGIES)
+        for strategy_idx, strategy in skipped:
+            if not cursor.is_exhausted(strategy_idx):
+                print(f"[INFO] [{keyword}] 跳过低产出策略: {strategy_idx + 1} {strategy}")
+                cursor.mark_exhausted(strategy_idx)
+    else:
+        plan = list(enumerate(SEARCH_STRATEGIES))
+    return [(idx, strategy) for idx, strategy in plan if not cursor.is_exhausted(idx)]
+
+
+def _run_crawl(keyword, cookie_str, concurrency, rate, adaptive, state):
+    """在后台线程中按计划执行各搜索策略，结束时放入结束标记"""
+    try:
+        cursor = state.cursor
+        session = _make_session(cookie_str)
+        
+        print(f"[INFO] 开始爬取知乎: {keyword}, 目标数量: {state.max_count}")
+        print(f"[INFO] 共有 {len(SEARCH_STRATEGIES)} 种搜索策略, 从策略 {cursor.strategy_idx + 1} 继续")
+        
+        plan = _plan_strategies(keyword, cursor, adaptive)
+        
+        if concurrency <= 1:
+            # 串行：逐个策略遍历
+            for strategy_idx, strategy in plan:
+                if state.is_full():
+                    break
+                _crawl_strategy(session, keyword, strategy_idx, strategy, state, rate)
+        else:
+            # 并发（Cookie 池）：多个策略同时执行，按计划顺序提交，每次请求取一个账号并使用其速率预算
+            print(f"[INFO] 并发模式: 同时执行 {concurrency} 个策略")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(_crawl_strategy, session, keyword, strategy_idx, strategy, state, rate)
+                    for strategy_idx, strategy in plan
+                ]
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"[WARN] 策略执行异常: {e}")
+        
+        _record_strategy_stats(keyword, state)
+        strategy_stats.flush()
+        print(f"[DONE] 共获取 {state.count} 条不重复数据, 近似重复过滤 {state.near_dup.suppressed} 条, "
+              f"速率状态: {_rate_report(rate, state.cookies)}")
+        if CACHE_ENABLED:
+            print(f"[CACHE] 缓存统计: {response_cache.stats()}")
+    except Exception as e:
+        print(f"[ERROR] 知乎爬取异常: {e}")
+    finally:
+        state.emit(_STREAM_END)
+
+
+def _record_strategy_stats(keyword, state):
+    """本次运行各策略的产出计入 strategy_stats"""
+    for strategy_idx, (pages, fetched, new) in state.strategy_yields().items():
+        strategy_stats.record(keyword, SEARCH_STRATEGIES[strategy_idx], pages, fetched, new)
+
+
+def _crawl_strategy(session, keyword, strategy_idx, strategy, state, rate):
+    """按单个搜索策略分页爬取，从游标记录的 offset 开始，新数据写入共享的 state；每页记入 state 用于计算产出"""
+    search_type, time_interval, sort = strategy
+    cursor = state.cursor
+    if state.is_full() or cursor.is_exhausted(strategy_idx):
+        return
+    
+    strategy_desc = f"{search_type}"
+    if time_interval:
+        strategy_desc += f"+{time_interval}"
+    if sort:
+        strategy_desc += f"+{sort}"
+    if state.keyword is not None:
+        strategy_desc = f"{keyword}:{strategy_desc}"
+    print(f"[INFO] 策略 {strategy_idx+1}/{len(SEARCH_STRATEGIES)}: {strategy_desc}")
     
-    print(f"[INFO] 开始爬取知乎: {keyword}, 目标数量: {max_count}")
-    print(f"[INFO] 共有 {len(SEARCH_STRATEGIES)} 种搜索策略")
+    # 分页爬取
+    current_offset = cursor.offset_for(strategy_idx)
+    limit = 20  # 知乎API每页最多20条
+    page = 1
+    empty_pages = 0  # 连续空页计数
+    max_empty_pages = 2  # 连续2页无新数据则切换策略
+    strategy_fetched = 0
+    strategy_new = 0  # 该策略获取的新数据数量
     
-    # 遍历不同的搜索策略以获取更多结果
-    for strategy_idx, (search_type, time_interval, sort) in enumerate(SEARCH_STRATEGIES):
-        if len(results) >= max_count:
+    while not state.is_full() and empty_pages < max_empty_pages:
+        q = quote_plus(keyword)
+        
+        # 构建URL
+        if time_interval or sort:
+            url = API_SEARCH_WITH_FILTER.format(
+                search_type=search_type, q=q, offset=current_offset, limit=limit,
+                time_interval=time_interval, sort=sort
+            )
+        else:
+            url = API_SEARCH.format(search_type=search_type, q=q, offset=current_offset, limit=limit)
+        
+        # 获取JSON数据（请求间隔由速率控制器决定）
+        json_data = _fetch_json(session, url, rate, cookies=state.cookies)
+        
+        if not json_data:
+            print(f"[WARN] [{strategy_desc}] 第 {page} 页获取失败")
             break
         
-        strategy_desc = f"{search_type}"
-        if time_interval:
-            strategy_desc += f"+{time_interval}"
-        if sort:
-            strategy_desc += f"+{sort}"
-        print(f"[INFO] 策略 {strategy_idx+1}/{len(SEARCH_STRATEGIES)}: {strategy_desc}")
+        # 解析数据
+        items = _parse_search_json(json_data)
         
-        # 分页爬取
-        current_offset = offset if strategy_idx == 0 else 0
-        limit = 20  # 知乎API每页最多20条
-        page = 1
-        empty_pages = 0  # 连续空页计数
-        max_empty_pages = 2  # 连续2页无新数据则切换策略
-        strategy_fetched = 0
-        strategy_new = 0  # 该策略获取的新数据数量
+        # 检查API分页结束标志
+        paging = json_data.get("paging", {})
+        is_end = paging.get("is_end", False)
         
-        while len(results) < max_count and empty_pages < max_empty_pages:
-            q = quote_plus(keyword)
-            
-            # 构建URL
-            if time_interval or sort:
-                url = API_SEARCH_WITH_FILTER.format(
-                    search_type=search_type, q=q, offset=current_offset, limit=limit,
-                    time_interval=time_interval, sort=sort
-                )
-            else:
-                url = API_SEARCH.format(search_type=search_type, q=q, offset=current_offset, limit=limit)
-            
-            # 获取JSON数据
-            json_data = _fetch_json(session, url)
-            
-            if not json_data:
-                print(f"[WARN] 第 {page} 页获取失败")
+        if not items:
+            state.note_page(strategy_idx, 0, [])
+            empty_pages += 1
+            current_offset += limit
+            cursor.advance(strategy_idx, current_offset)
+            if empty_pages >= max_empty_pages or is_end:
+                print(f"[INFO] [{strategy_desc}] 无更多数据")
+                cursor.mark_exhausted(strategy_idx)
                 break
-            
-            # 解析数据
-            items = _parse_search_json(json_data)
-            
-            # 检查API分页结束标志
-            paging = json_data.get("paging", {})
-            is_end = paging.get("is_end", False)
-            
-            if not items:
-                empty_pages += 1
-                if empty_pages >= max_empty_pages or is_end:
-                    print(f"[INFO] [{strategy_desc}] 无更多数据")
-                    break
-                current_offset += limit
-                page += 1
-                continue
-            
-            # 处理每条数据
-            new_items = 0
-            for item in items:
-                if len(results) >= max_count:
-                    break
-                
-                # URL去重
-                item_url = item.get("url", "")
-                if item_url and item_url in seen_urls:
-                    continue
-                
-                # 标题去重（处理相同内容不同URL的情况）
-                item_title = item.get("title", "").strip()
-                title_key = item_title[:50] if item_title else ""  # 用前50字符作为key
-                if title_key and title_key in seen_titles:
-                    continue
-                
-                if item_url:
-                    seen_urls.add(item_url)
-                if title_key:
-                    seen_titles.add(title_key)
-                
-                results.append({
-                    "source": "知乎",
-                    "title": item.get("title", "无标题"),
-                    "author": item.get("author_name", "匿名用户"),
-                    "content": item.get("content", ""),
-                    "url": item_url,
-                    "publish_time": item.get("publish_time", ""),
-                    "likes": item.get("likes", ""),
-                    "comments": [item.get("content", "")] if item.get("content") else []
-                })
+            page += 1
+            continue
+        
+        # 增量爬取：过滤掉之前运行已产出过的条目
+        fresh_items = items
+        if state.seen is not None:
+            new_urls = state.seen.filter_new("zhihu", keyword, [item.get("url") for item in items])
+            fresh_items = [item for item in items if not item.get("url") or item["url"] in new_urls]
+            if not fresh_items and state.stop_on_seen_page:
+                state.note_page(strategy_idx, len(items), [])
+                strategy_fetched += len(items)
+                cursor.advance(strategy_idx, current_offset + limit)
+                cursor.mark_exhausted(strategy_idx)
+                print(f"[INFO] [{strategy_desc}] 第{page}页全部在之前的运行中爬过，结束该策略")
+                break
+        
+        state.note_page(strategy_idx, len(items), fresh_items)
+        
+        # 处理每条数据；中途达到数量上限时本页未处理完，游标停留在本页，下一批次从本页继续
+        new_items = 0
+        page_done = True
+        added_urls = []
+        for item in fresh_items:
+            if state.is_full():
+                page_done = False
+                break
+            if state.add(item):
                 new_items += 1
                 strategy_new += 1
-            
-            strategy_fetched += len(items)
-            
-            if new_items == 0:
-                empty_pages += 1
-            else:
-                empty_pages = 0
-            
-            print(f"[INFO] [{strategy_desc}] 第{page}页: 获取{len(items)}条, 新增{new_items}条, 累计{len(results)}条")
-            
-            # 检查是否是最后一页
-            if is_end:
+                added_urls.append(item.get("url"))
+            elif state.is_full():
+                # 其他策略线程恰好填满了结果
+                page_done = False
                 break
-            
-            # 下一页
-            current_offset += limit
-            page += 1
-            
-            # 页间随机延时（降低速度）
-            if len(results) < max_count:
-                sleep_time = random.uniform(*PAGE_SLEEP_RANGE)
-                print(f"[SLEEP] 页间休息 {sleep_time:.1f} 秒...")
-                time.sleep(sleep_time)
+        if state.seen is not None and state.mark_seen:
+            state.seen.mark("zhihu", keyword, added_urls)
+        
+        strategy_fetched += len(items)
+        
+        if new_items == 0:
+            empty_pages += 1
+        else:
+            empty_pages = 0
         
-        print(f"[INFO] 策略 {strategy_desc} 完成: 遍历{strategy_fetched}条, 新增{strategy_new}条")
+        print(f"[INFO] [{strategy_desc}] 第{page}页: 获取{len(items)}条, 新增{new_items}条, 累计{state.count}条")
         
-        # 策略间较长休息
-        if len(results) < max_count and strategy_idx < len(SEARCH_STRATEGIES) - 1:
-            sleep_time = random.uniform(*STRATEGY_SLEEP_RANGE)
-            print(f"[SLEEP] 策略切换休息 {sleep_time:.1f} 秒...")
-            time.sleep(sleep_time)
+        if not page_done:
+            break
+        
+        # 下一页
+        current_offset += limit
+        cursor.advance(strategy_idx, current_offset)
+        page += 1
+        
+        # 检查是否是最后一页；连续多页无新数据也视为该策略结束
+        if is_end or empty_pages >= max_empty_pages:
+            cursor.mark_exhausted(strategy_idx)
+            break
     
-    print(f"[DONE] 共获取 {len(results)} 条不重复数据")
-    return results
+    print(f"[INFO] 策略 {strategy_desc} 完成: 遍历{strategy_fetched}条, 新增{strategy_new}条")
 
 
 def _make_headers(cookie_str):
@@ -304,13 +798,7 @@ def _make_headers(cookie_str):
         "x-requested-with": "fetch",
     }
     if cookie_str:
-        # 去除前后空白字符
-        cookie_str = cookie_str.strip()
-        # 处理可能的 "cookie=" 前缀
-        if cookie_str.lower().startswith("cookie:"):
-            cookie_str = cookie_str.split(":", 1)[1].strip()
-        elif cookie_str.lower().startswith("cookie="):
-            cookie_str = cookie_str.split("=", 1)[1].strip()
+        cookie_str = _normalize_cookie(cookie_str)
         headers["Cookie"] = cookie_str
         print(f"[DEBUG] Cookie长度: {len(cookie_str)}, 前30字符: {cookie_str[:30]}...")
     else:
@@ -318,33 +806,67 @@ def _make_headers(cookie_str):
     return headers
 
 
-def _fetch_json(session, url):
-    """获取JSON数据，支持代理池和重试"""
+def _fetch_json(session, url, rate=None, cookies=None):
+    """
+    获取JSON数据，支持响应缓存、代理池和重试；请求间隔和退避由速率控制器负责
+    传入 cookies（CookiePool）时每次请求从池中取一个账号，由该账号自己的速率控制器限速，被限制时换账号重试
+    """
     import urllib3
     import ssl
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
+    # 缓存命中：不发请求，也不等待速率控制器
+    if CACHE_ENABLED:
+        cached = response_cache.get(url)
+        if cached is not None:
+            print("[CACHE] 命中缓存")
+            return cached
+    
+    rate = rate or rate_for(session.headers.get("Cookie"))
     last_exc = None
     current_proxy = None
     
     for attempt in range(1, MAX_RETRIES + 1):
+        lease = None
+        if cookies is not None:
+            lease = cookies.acquire()
+            if lease is None:
+                break
+            lease.rate.acquire()
+        else:
+            # 每次请求（含重试）前等待速率控制器放行
+            rate.acquire()
         try:
-            # 每次请求更新User-Agent增加随机性
-            session.headers["User-Agent"] = random.choice(USER_AGENTS)
+            # 每次请求更新User-Agent增加随机性（按请求传入，避免并发时修改共享的 session.headers）
+            ua_header = {"User-Agent": random.choice(USER_AGENTS)}
+            if lease is not None:
+                ua_header["Cookie"] = lease.cookie
             
-            # 获取代理（如果启用）
-            if USE_PROXY:
-                current_proxy = proxy_pool.get_proxy()
-                r = session.get(url, timeout=REQUEST_TIMEOUT, verify=False, proxies=current_proxy)
+            # 获取代理（如果启用；池中无可用代理时直连）
+            current_proxy = proxy_pool.get_proxy() if USE_PROXY else None
+            started = time.monotonic()
+            if current_proxy:
+                r = session.get(url, headers=ua_header, timeout=REQUEST_TIMEOUT, verify=False, proxies=current_proxy)
             else:
                 # 不使用代理，禁用系统代理直连
-                r = session.get(url, timeout=REQUEST_TIMEOUT, verify=False, proxies={'http': None, 'https': None})
+                r = session.get(url, headers=ua_header, timeout=REQUEST_TIMEOUT, verify=False, proxies={'http': None, 'https': None})
             
             print(f"[DEBUG] 请求状态码: {r.status_code}")
             
             if r.status_code == 200:
+                if lease is not None:
+                    cookies.report_success(lease)
+                else:
+                    rate.on_success()
+                if current_proxy:
+                    proxy_pool.report_success(current_proxy, time.monotonic() - started)
                 try:
-                    return r.json()
+                    data = _json_loads(r.content)
+                    if CACHE_ENABLED and isinstance(data, dict) and "data" in data:
+                        response_cache.set(url, data)
+                    if fixture_recorder is not None:
+                        fixture_recorder.record(url, data)
+                    return data
                 except Exception as e:
                     print(f"[WARN] JSON解析失败: {e}")
                     print(f"[DEBUG] 响应长度: {len(r.text)} 字符")
@@ -352,98 +874,119 @@ def _fetch_json(session, url):
                     return None
             elif r.status_code == 400:
                 print(f"[DEBUG] 400响应内容: {r.text[:200] if r.text else 'empty'}")
+            elif r.status_code == 401 and lease is not None:
+                # 该账号登录失效，停用后换下一个账号重试
+                cookies.report_failure(lease, 401)
             elif r.status_code == 403 or r.status_code == 429:
-                # 被限制，标记代理失败并等待
+                # 被限制，标记代理失败并降速
                 if current_proxy:
                     proxy_pool.mark_failed(current_proxy)
-                print(f"[WARN] 请求被限制 {r.status_code}，休息后重试...")
-                time.sleep(random.uniform(*ERROR_SLEEP_RANGE))
+                print(f"[WARN] 请求被限制 {r.status_code}，降速后重试...")
+                if lease is not None:
+                    cookies.report_throttle(lease, r.status_code)
+                else:
+                    rate.on_throttle(r.status_code)
             else:
                 print(f"[WARN] 请求返回 {r.status_code} (尝试 {attempt})")
+        except requests.exceptions.RequestException as e:
+            last_exc = e
+            # 标记代理失败；超时和连接错误同样视为服务端压力，降速
+            if current_proxy:
+                proxy_pool.mark_failed(current_proxy)
+            if lease is not None:
+                cookies.report_failure(lease)
+            else:
+                rate.on_timeout()
+            print(f"[WARN] 请求失败 (尝试 {attempt}): {e}")
         except Exception as e:
             last_exc = e
-            # 标记代理失败
             if current_proxy:
                 proxy_pool.mark_failed(current_proxy)
             print(f"[WARN] 请求失败 (尝试 {attempt}): {e}")
-        
-        # 重试前休息
-        sleep_time = random.uniform(*ERROR_SLEEP_RANGE)
-        print(f"[SLEEP] 错误后休息 {sleep_time:.1f} 秒...")
-        time.sleep(sleep_time)
     
     print(f"[ERROR] 重试后仍然失败: {last_exc}")
     return None
 
 
 def _full_url(href):
-    """将相对URL转换为完整URL"""
+    """
+    将相对URL转换为完整URL
+    常见的 "//host/path" 和 "/path" 直接拼接（urljoin 是解析时的主要开销），含 "." 路径段等其他情况仍用 urljoin
+    """
     if not href:
         return ""
     if href.startswith("http"):
         return href
+    if href[:1] == "/" and "/." not in href:
+        if href[1:2] != "/":
+            return "https://www.zhihu.com" + href
+        if href[2:3] not in ("", "/"):
+            return "https:" + href
     return urljoin("https://www.zhihu.com", href)
 
 
 def _parse_search_json(data):
     """
     解析知乎搜索API返回的JSON数据
-    返回格式统一的数据列表
+    返回格式统一的数据列表；只读取需要保留的字段，<em> 标签用预编译正则一次去除
     """
     rows = []
     if not data or "data" not in data:
         return rows
     
-    for obj in data.get("data", []):
+    strip_em = _EM_TAG_RE.sub
+    append = rows.append
+    for obj in data.get("data") or []:
         try:
             # 很多条目有 'object' 子字段
             o = obj.get("object") or obj
+            get = o.get
             
             # ID和URL
-            weibo_id = o.get("id") or o.get("objectId") or ""
-            url = o.get("url") or o.get("target_url") or o.get("share_url") or ""
+            weibo_id = get("id") or get("objectId") or ""
+            url = get("url") or get("target_url") or get("share_url") or ""
             if not url and weibo_id:
                 url = f"https://www.zhihu.com/question/{weibo_id}"
             
-            # 标题和内容
-            title = o.get("title") or o.get("question", {}).get("name") or ""
-            # 清理HTML标签
-            title = title.replace("<em>", "").replace("</em>", "")
-            
-            excerpt = o.get("excerpt") or o.get("abstract") or ""
-            excerpt = excerpt.replace("<em>", "").replace("</em>", "")
-            
-            content = (title + " " + excerpt).strip() if excerpt else title
+            # 标题和内容（清理HTML高亮标签）
+            title = get("title") or (get("question") or {}).get("name") or ""
+            if "<" in title:
+                title = strip_em("", title)
+            excerpt = get("excerpt") or get("abstract") or ""
+            if "<" in excerpt:
+                excerpt = strip_em("", excerpt)
             
             # 作者信息
             author_name = ""
             author_home = ""
-            if "author" in o and isinstance(o.get("author"), dict):
-                author = o.get("author")
-                author_name = author.get("name") or author.get("member", {}).get("name", "")
-                author_home = _full_url(author.get("url") or author.get("member", {}).get("url", ""))
+            author = get("author")
+            if isinstance(author, dict):
+                member = author.get("member") or {}
+                author_name = author.get("name") or member.get("name", "")
+                author_home = _full_url(author.get("url") or member.get("url", ""))
             
-            if not author_name and "member" in o and isinstance(o.get("member"), dict):
-                m = o.get("member")
-                author_name = m.get("name") or ""
-                author_home = _full_url(m.get("url") or "")
+            if not author_name:
+                member = get("member")
+                if isinstance(member, dict):
+                    author_name = member.get("name") or ""
+                    author_home = _full_url(member.get("url") or "")
             
             # 发布时间
             publish_time = ""
-            if o.get("created_time"):
+            created_time = get("created_time")
+            if created_time:
                 try:
-                    ts = int(o.get("created_time"))
-                    publish_time = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    publish_time = str(o.get("created_time"))
-            elif o.get("published_time"):
-                publish_time = str(o.get("published_time"))
+                    publish_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(created_time)))
+                except (TypeError, ValueError, OverflowError, OSError):
+                    publish_time = str(created_time)
+            elif get("published_time"):
+                publish_time = str(get("published_time"))
             
             # 点赞数等
-            likes = str(o.get("voteup_count", "") or o.get("likes_count", "") or "")
-            comments_count = str(o.get("comment_count", "") or o.get("comments_count", "") or "")
+            likes = str(get("voteup_count", "") or get("likes_count", "") or "")
+            comments_count = str(get("comment_count", "") or get("comments_count", "") or "")
             
-            rows.append({
+            append({
                 "id": weibo_id,
                 "url": _full_url(url),
                 "title": title,
@@ -458,4 +1001,4 @@ def _parse_search_json(data):
             print(f"[WARN] 解析条目失败: {e}")
             continue
     
-    return rows
\ No newline at end of file
+    return rows
@@ -0,0 +1,6 @@
+# tests/conftest.py
+"""直接运行 pytest 时把项目根目录加入导入路径（与 benchmarks/ 中的脚本相同）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
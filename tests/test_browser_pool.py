@@ -0,0 +1,67 @@
+# tests/test_browser_pool.py
+import sys
+import time
+import types
+import multiprocessing
+
+from spiders.browser_pool import BrowserBudget, BrowserPool
+from spiders.xhs_runner import _SlotAllocator, _start_processes
+
+
+class _FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def _pool(budget, size=2):
+    return BrowserPool(max_size=size, idle_ttl=0, acquire_timeout=0.2, factory=lambda slot: _FakePage(),
+                       budget=budget)
+
+
+def test_pools_share_one_budget_and_reclaim_idle_browsers():
+    budget = BrowserBudget(2)
+    normal, light = _pool(budget), _pool(budget)
+    first, second = normal.acquire(), normal.acquire()
+    assert budget.in_use() == 2
+    normal.release(first)
+    # 额度用完时关闭普通池中空闲的浏览器，轻量池才能启动
+    lease = light.acquire()
+    assert lease is not None and first.page.closed
+    assert budget.in_use() == 2
+    # 两个浏览器都在使用中，再借只能等待超时
+    assert light.acquire(timeout=0.1) is None
+    light.release(lease)
+    normal.release(second)
+    normal.close_all()
+    light.close_all()
+    assert budget.in_use() == 0
+
+
+def test_shard_slots_count_against_pool_browsers():
+    budget = BrowserBudget(3)
+    pool = _pool(budget)
+    lease = pool.acquire()
+    allocator = _SlotAllocator(budget, 10)
+    slots = allocator.acquire(4, timeout=0.1)
+    assert slots == [10, 11]
+    assert allocator.acquire(1, timeout=0.1) == []
+    allocator.release(slots)
+    pool.release(lease)
+    assert allocator.acquire(4, timeout=0.1) == [10, 11, 12]
+
+
+def test_shard_workers_do_not_reimport_main_module(tmp_path, monkeypatch):
+    # 主模块在子进程中被导入就会失败（相当于 app.py 的副作用）
+    script = tmp_path / "fake_app.py"
+    script.write_text("raise SystemExit(3)\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(0,))
+    _start_processes([process])
+    process.join(timeout=30)
+    assert process.exitcode == 0
+    assert sys.modules["__main__"] is main
@@ -0,0 +1,31 @@
+# tests/test_cursor_store.py
+import pytest
+
+import services.in_memory_store as store
+from services.in_memory_store import load_or_create_cursor, save_cursor
+
+
+@pytest.fixture(autouse=True)
+def empty_cursors(monkeypatch):
+    monkeypatch.setattr(store, "CRAWL_CURSORS", store.OrderedDict())
+
+
+def test_owner_resumes_own_cursor():
+    cursor = load_or_create_cursor("AI", user_id=1)
+    cursor.seen_urls.add("https://www.zhihu.com/question/1")
+    cursor_id = save_cursor(cursor, user_id=1)
+    assert load_or_create_cursor("AI", cursor_id, user_id=1) is cursor
+    assert save_cursor(cursor, cursor_id, user_id=1) == cursor_id
+
+
+def test_other_user_gets_fresh_cursor_and_new_id():
+    cursor = load_or_create_cursor("AI", user_id=1)
+    cursor.seen_urls.add("https://www.zhihu.com/question/1")
+    cursor_id = save_cursor(cursor, user_id=1)
+
+    other = load_or_create_cursor("AI", cursor_id, user_id=2)
+    assert other is not cursor and not other.seen_urls
+    other_id = save_cursor(other, cursor_id, user_id=2)
+    # 不覆盖原用户的游标
+    assert other_id != cursor_id
+    assert load_or_create_cursor("AI", cursor_id, user_id=1) is cursor
@@ -0,0 +1,66 @@
+# tests/test_http_cache.py
+import pytest
+
+import spiders.http_cache as cache_module
+from spiders.http_cache import ResponseCache, normalize_url
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": 1_700_000_000.0}
+    monkeypatch.setattr(cache_module.time, "time", lambda: state["now"])
+    return state
+
+
+def test_normalize_url_sorts_query_and_drops_fragment():
+    assert normalize_url("HTTPS://WWW.Zhihu.com/api?b=2&a=1#x") == "https://www.zhihu.com/api?a=1&b=2"
+    assert normalize_url("https://h/p?q=%E4%B8%AD&t=") == normalize_url("https://h/p?t=&q=中")
+
+
+def test_set_then_get_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"))
+    assert cache.get("https://h/api?a=1") is None
+    cache.set("https://h/api?a=1", {"data": [1, "中文"]})
+    assert cache.get("https://h/api?a=1#f") == {"data": [1, "中文"]}
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["stores"] == 1
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    ResponseCache(path).set("https://h/a", {"data": 1})
+    assert ResponseCache(path).get("https://h/a") == {"data": 1}
+
+
+def test_expired_entries_miss(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), ttl=60)
+    cache.set("https://h/a", {"data": 1})
+    clock["now"] += 60
+    assert cache.get("https://h/a") == {"data": 1}
+    clock["now"] += 1
+    assert cache.get("https://h/a") is None
+    assert cache.stats()["total_bytes"] == 0
+
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path, clock):
+    body = {"data": "x" * 100}
+    size = len('{"data": "' + "x" * 100 + '"}')
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), max_bytes=size * 2)
+    cache.set("https://h/a", body)
+    clock["now"] += 1
+    cache.set("https://h/b", body)
+    clock["now"] += 1
+    assert cache.get("https://h/a") == body     # a 变为最近访问
+    clock["now"] += 1
+    cache.set("https://h/c", body)
+    assert cache.get("https://h/b") is None
+    assert cache.get("https://h/a") == body
+    assert cache.get("https://h/c") == body
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["total_bytes"] == size * 2
+
+
+def test_oversized_body_is_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), max_bytes=10)
+    cache.set("https://h/a", {"data": "x" * 100})
+    assert cache.get("https://h/a") is None
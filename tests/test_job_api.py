@@ -0,0 +1,46 @@
+# tests/test_job_api.py
+import pytest
+from flask import Flask
+from flask_restx import Api
+
+import api.job_api as job_api
+from config import Config
+from utils.jwt_utils import generate_token
+
+
+@pytest.fixture
+def client(monkeypatch):
+    submitted = []
+
+    def submit(**kwargs):
+        submitted.append(kwargs)
+        return {"id": "job1", "status": "queued"}
+
+    monkeypatch.setattr(job_api.JobService, "submit", staticmethod(submit))
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    Api(app).add_namespace(job_api.job_ns, path='/jobs')
+    with app.app_context():
+        token = generate_token(1, 'tester')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    client.submitted = submitted
+    return client
+
+
+@pytest.mark.parametrize("field", ["batch_size", "concurrency", "workers"])
+def test_non_integer_params_return_400(client, field):
+    res = client.post('/jobs', json={"keyword": "AI", "platform": "zhihu", field: "abc"})
+    assert res.status_code == 400
+    assert field in res.get_json()["message"]
+    assert client.submitted == []
+
+
+def test_params_are_clamped(client):
+    res = client.post('/jobs', json={"keyword": "AI", "platform": "xhs", "batch_size": 10 ** 9,
+                                     "concurrency": 0, "workers": "100"})
+    assert res.status_code == 200
+    params = client.submitted[0]
+    assert params["max_count"] == job_api.JOB_MAX_COUNT
+    assert params["concurrency"] == 1
+    assert params["workers"] == job_api.JOB_MAX_WORKERS
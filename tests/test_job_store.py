@@ -0,0 +1,48 @@
+# tests/test_job_store.py
+import threading
+
+import services.job_service as job_service
+from services.job_service import JobRunner, JobStore
+
+
+def test_opening_store_does_not_interrupt_running_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = store.create(1, "zhihu", ["AI"], {"max_count": 10})
+    assert store.start(job_id)
+    # 其他进程打开同一个数据库，不应影响正在执行的任务
+    assert JobStore(path).get(job_id)["status"] == "running"
+
+
+def test_recover_marks_unfinished_jobs_interrupted(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    running = store.create(1, "zhihu", ["AI"], {})
+    store.start(running)
+    queued = store.create(1, "xhs", ["AI"], {})
+    done = store.create(1, "xhs", ["AI"], {})
+    store.finish(done, "completed")
+    assert JobStore(path).recover() == 2
+    assert [store.get(j)["status"] for j in (running, queued, done)] == ["interrupted", "interrupted", "completed"]
+
+
+def test_cancel_from_another_process_stops_filtered_crawl(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create(1, "zhihu", ["AI"], {"max_count": 10})
+    store.start(job_id)
+    pulled = []
+
+    def crawl(platform, keywords, options):
+        # 全部是会被清洗过滤掉的空条目；第 3 条之后另一个进程把任务标记为已取消
+        for i in range(1000):
+            pulled.append(i)
+            if i == 3:
+                JobStore(store.path).finish(job_id, "cancelled", "已取消")
+            yield {"url": f"https://example.com/{i}", "title": "", "content": "", "comments": []}
+
+    monkeypatch.setattr(job_service, "_open_crawl", crawl)
+    monkeypatch.setattr(job_service, "JOB_STATUS_CHECK_SECONDS", 0)
+    cancel = threading.Event()
+    assert JobRunner(store)._crawl(job_id, store.get(job_id), {}, cancel) == 0
+    assert cancel.is_set()
+    assert len(pulled) < 10
@@ -0,0 +1,66 @@
+# tests/test_near_dup.py
+import pytest
+
+from utils.near_dup import NearDupIndex, minhash, normalize, similarity
+
+TEXT = "AI问诊到底靠不靠谱？我用了三个月，说说真实体验：挂号方便了很多，但是复杂的病情还是要去医院找医生当面看"
+
+
+def test_normalize_strips_punctuation_and_case():
+    assert normalize("Hello, 世界！ AI_问诊") == "hello世界ai问诊"
+
+
+def test_minhash_is_deterministic():
+    assert minhash(TEXT) == minhash(TEXT)
+    assert similarity(minhash(TEXT), minhash(TEXT)) == 1.0
+    assert minhash("ab") is None
+
+
+def test_add_suppresses_near_duplicates():
+    index = NearDupIndex()
+    assert index.add(TEXT)
+    assert not index.add(TEXT + "。")                      # 只差标点
+    assert not index.add(TEXT.replace("三个月", "3个月"))   # 轻微改动
+    assert index.add("今天天气很好，适合出去散步，公园里的花都开了，人也特别多")
+    assert index.added == 2
+    assert index.suppressed == 2
+    assert len(index) == 2
+
+
+def test_short_texts_use_exact_match():
+    index = NearDupIndex()
+    assert index.add("同问")
+    assert not index.add("同问！")
+    assert index.add("求链接")
+    assert index.add("")           # 空文本不收录
+    assert len(index) == 2
+
+
+def test_contains_does_not_insert_or_count():
+    index = NearDupIndex()
+    index.add(TEXT)
+    assert index.contains(TEXT + "！")
+    assert not index.contains("完全不同的一段文字内容，和上面没有关系")
+    assert index.added == 1 and index.suppressed == 0
+
+
+def test_dump_and_load_round_trip():
+    index = NearDupIndex()
+    index.add(TEXT)
+    index.add("同问")
+    restored = NearDupIndex.load(index.dump())
+    assert not restored.add(TEXT)
+    assert not restored.add("同问")
+    assert restored.add("完全不同的一段文字内容，和上面没有关系")
+
+
+@pytest.mark.parametrize("data", [
+    "x",
+    {"signatures": "x"},
+    {"signatures": [[1, 2, 3]]},
+    {"signatures": [["a"] * 32]},
+    {"exact": [1]},
+])
+def test_load_rejects_malformed_data(data):
+    with pytest.raises(ValueError):
+        NearDupIndex.load(data)
@@ -0,0 +1,68 @@
+# tests/test_rate_controller.py
+import pytest
+
+import spiders.rate_controller as rate_module
+from spiders.rate_controller import AIMDRateController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """用假时钟代替 time.monotonic/time.sleep，sleep 直接推进时间"""
+    state = {"now": 100.0, "slept": []}
+
+    def sleep(seconds):
+        state["slept"].append(seconds)
+        state["now"] += seconds
+
+    monkeypatch.setattr(rate_module.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(rate_module.time, "sleep", sleep)
+    return state
+
+
+def make(**kwargs):
+    options = dict(initial_rate=1.0, min_rate=0.25, max_rate=2.0, increase_step=0.5, decrease_factor=0.5, jitter=0.0)
+    options.update(kwargs)
+    return AIMDRateController(**options)
+
+
+def test_initial_rate_is_clamped():
+    assert make(initial_rate=10).rate == 2.0
+    assert make(initial_rate=0.01).rate == 0.25
+
+
+def test_success_increases_additively_up_to_max():
+    rate = make()
+    rate.on_success()
+    assert rate.rate == pytest.approx(1.5)
+    rate.on_success()
+    rate.on_success()
+    assert rate.rate == pytest.approx(2.0)
+    assert rate.stats()["successes"] == 3
+
+
+def test_throttle_and_timeout_decrease_multiplicatively_down_to_min(clock):
+    rate = make()
+    rate.on_throttle(429)
+    assert rate.rate == pytest.approx(0.5)
+    rate.on_timeout()
+    assert rate.rate == pytest.approx(0.25)
+    rate.on_throttle(403)
+    assert rate.rate == pytest.approx(0.25)
+    stats = rate.stats()
+    assert stats["throttles"] == 2 and stats["timeouts"] == 1
+
+
+def test_acquire_spaces_requests_by_interval(clock):
+    rate = make()
+    assert rate.acquire() == 0
+    assert rate.acquire() == pytest.approx(1.0)
+    clock["now"] += 5           # 空闲足够久后不需要等待
+    assert rate.acquire() == 0
+    assert clock["slept"] == [pytest.approx(1.0)]
+
+
+def test_backoff_pushes_next_slot_out(clock):
+    rate = make()
+    rate.acquire()
+    rate.on_throttle(429)       # 速率降为 0.5，冷却一个新间隔（2 秒）
+    assert rate.acquire() == pytest.approx(2.0)
@@ -0,0 +1,94 @@
+# tests/test_seen_index.py
+import pytest
+
+import utils.seen_index as seen_module
+from utils.seen_index import SeenIndex, item_key, xhs_note_id
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SeenIndex(str(tmp_path / "seen.sqlite3"), ttl=3600)
+
+
+def test_mark_then_seen_round_trip(index):
+    assert index.filter_new("zhihu", "AI", ["u1", "u2"]) == {"u1", "u2"}
+    index.mark("zhihu", "AI", ["u1"])
+    assert index.seen("zhihu", "AI", "u1")
+    assert not index.seen("zhihu", "AI", "u2")
+    assert index.filter_new("zhihu", "AI", ["u1", "u2", "u2", ""]) == {"u2"}
+
+
+def test_scopes_are_separate(index):
+    index.mark("zhihu", "AI", ["u1"])
+    assert not index.seen("zhihu", "医疗", "u1")
+    assert not index.seen("xhs", "AI", "u1")
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    SeenIndex(path).mark("xhs", "AI", ["n1"])
+    assert SeenIndex(path).seen("xhs", "AI", "n1")
+
+
+def test_expired_entries_are_new_again(index, monkeypatch):
+    now = 1_700_000_000.0
+    monkeypatch.setattr(seen_module.time, "time", lambda: now)
+    index.mark("zhihu", "AI", ["u1"])
+    now += 3599
+    assert index.seen("zhihu", "AI", "u1")
+    now += 2
+    assert not index.seen("zhihu", "AI", "u1")
+
+
+def test_clear_scope(index):
+    index.mark("zhihu", "AI", ["u1"])
+    index.mark("zhihu", "医疗", ["u1"])
+    index.clear("zhihu", "AI")
+    assert not index.seen("zhihu", "AI", "u1")
+    assert index.seen("zhihu", "医疗", "u1")
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.xiaohongshu.com/explore/64f0a1b2c3d4e5f6a7b8c9d0?xsec_token=AAA",
+    "https://www.xiaohongshu.com/search_result/64f0a1b2c3d4e5f6a7b8c9d0?xsec_token=BBB&xsec_source=pc_search",
+    "https://www.xiaohongshu.com/discovery/item/64f0a1b2c3d4e5f6a7b8c9d0",
+])
+def test_xhs_item_key_ignores_path_and_token(url):
+    assert xhs_note_id(url) == "64f0a1b2c3d4e5f6a7b8c9d0"
+    assert item_key("xhs", {"url": url}) == "64f0a1b2c3d4e5f6a7b8c9d0"
+
+
+def test_item_key_falls_back_to_url():
+    assert item_key("zhihu", {"url": "https://www.zhihu.com/question/1"}) == "https://www.zhihu.com/question/1"
+    assert item_key("xhs", {"url": "https://example.com/x"}) == "https://example.com/x"
+    assert item_key("xhs", "n1") == "n1"
+
+
+def test_watch_marked_xhs_row_is_seen_by_spider(index, monkeypatch):
+    """定时监控按 item_key 记录的笔记，爬虫按卡片中的笔记ID查询时应视为已见过"""
+    import watch.task as task
+
+    note_id = "64f0a1b2c3d4e5f6a7b8c9d0"
+    calls = []
+
+    def fake_crawler(keyword, **kwargs):
+        calls.append(kwargs)
+        return [{
+            "source": "小红书",
+            "title": "AI问诊体验",
+            "author": "用户",
+            "content": "这次用AI问诊的体验还不错，回答很详细",
+            "url": f"https://www.xiaohongshu.com/search_result/{note_id}?xsec_token=ABC&xsec_source=pc_search",
+            "comments": ["回答很详细，推荐大家试试"],
+        }]
+
+    monkeypatch.setattr(task, "seen_index", index)
+    monkeypatch.setattr(task, "search_and_crawl_xhs", fake_crawler, raising=False)
+    monkeypatch.setattr(task, "batch_analyze_csv_by_coze", lambda cleaned, **kwargs: [], raising=False)
+
+    result = task.run_watch_once({"keyword": "AI问诊", "platform": "xhs", "max_count": 5})
+
+    assert result["ok"]
+    assert calls[0]["incremental"] and calls[0]["mark_seen"] is False
+    # 与 xhs_spider 增量模式的查询相同：seen_index.seen("xhs", keyword, note_id)
+    assert index.seen("xhs", "AI问诊", note_id)
@@ -0,0 +1,75 @@
+# tests/test_xhs_capture.py
+import spiders.xhs_capture as capture_module
+from spiders.xhs_capture import XhsCapture, XHS_API_FEED, XHS_API_COMMENTS
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+
+class _Packet:
+    def __init__(self, url, data):
+        self.url = url
+        self.response = _Response({"success": True, "data": data})
+
+
+class _Listen:
+    def __init__(self):
+        self.queue = []
+
+    def start(self, targets):
+        pass
+
+    def stop(self):
+        pass
+
+    def steps(self, timeout=None):
+        packets, self.queue = self.queue, []
+        return iter(packets)
+
+
+class _Page:
+    def __init__(self):
+        self.listen = _Listen()
+
+
+def _feed(note_id, title):
+    return _Packet(f"https://edith.xiaohongshu.com{XHS_API_FEED}",
+                   {"items": [{"id": note_id, "note_card": {"title": title, "desc": title}}]})
+
+
+def _comments(note_id, *texts):
+    comments = [{"id": f"{note_id}-{i}", "content": text} for i, text in enumerate(texts)]
+    return _Packet(f"https://edith.xiaohongshu.com{XHS_API_COMMENTS}?note_id={note_id}",
+                   {"comments": comments, "has_more": False})
+
+
+def _capture(monkeypatch):
+    monkeypatch.setattr(capture_module, "CAPTURE_IDLE_TIMEOUT", 0)
+    capturer = XhsCapture(_Page())
+    assert capturer.start()
+    return capturer
+
+
+def test_since_stays_valid_after_other_notes_are_collected(monkeypatch):
+    capturer = _capture(monkeypatch)
+    capturer.page.listen.queue += [_feed("a", "A"), _feed("b", "B")]
+    capturer.poll()
+    since = capturer.mark()
+    capturer.page.listen.queue += [_feed("c", "C")]
+    capturer.poll()
+    # 取走较早的笔记后，since 仍然指向之后出现的 c
+    assert capturer.collect_note("a")["note"]["title"] == "A"
+    assert capturer.collect_note(since=since)["note"]["title"] == "C"
+
+
+def test_late_packets_for_collected_note_are_ignored(monkeypatch):
+    capturer = _capture(monkeypatch)
+    capturer.page.listen.queue += [_feed("a", "A"), _comments("a", "好看")]
+    assert capturer.collect_note("a")["comments"] == ["好看"]
+    since = capturer.mark()
+    capturer.page.listen.queue += [_comments("a", "迟到的评论"), _feed("b", "B")]
+    captured = capturer.collect_note(since=since)
+    assert captured["note"]["title"] == "B"
+    assert capturer.collect_note("a") is None
@@ -0,0 +1,49 @@
+# tests/test_xhs_comments.py
+import json
+
+from spiders.xhs_comments import CommentHarvester
+
+
+class _Page:
+    """按轮次返回预设评论的假页面，第二轮之后到底"""
+
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+
+    def run_js(self, script, *args):
+        if "comments.push" not in script:
+            return 0
+        comments = self.rounds.pop(0) if self.rounds else []
+        return json.dumps({"comments": comments, "pending": 0, "expanded": 0, "end": not self.rounds})
+
+
+def _harvest(*rounds):
+    harvester = CommentHarvester(_Page(rounds), scroll=lambda: None, wait_ceiling=0)
+    return list(harvester.iter(".comment-item")), harvester
+
+
+def test_same_text_with_different_ids_is_kept():
+    comments, harvester = _harvest([["c1", "用户A\n好看"], ["c2", "用户B\n好看"]])
+    assert comments == ["好看", "好看"]
+    assert harvester.duplicates == 0
+
+
+def test_same_id_is_yielded_once():
+    comments, harvester = _harvest([["c1", "用户A\n好看"]], [["c1", "用户A\n好看"], ["c3", "用户C\n不错"]])
+    assert comments == ["好看", "不错"]
+    assert harvester.duplicates == 1
+
+
+def test_text_dedupe_only_without_id():
+    comments, harvester = _harvest([["", "用户A\n好看"], ["", "用户A\n好看"], ["", "用户B\n不错"]])
+    assert comments == ["好看", "不错"]
+    assert harvester.duplicates == 1
+
+
+def test_detail_row_caps_captured_comments(monkeypatch):
+    import spiders.xhs_spider as xhs_spider
+    monkeypatch.setattr(xhs_spider, "XHS_COMMENT_BUDGET", 3)
+    captured = {"note": {"content": "正文", "publish_time": "2024-01-01"}, "pages": 2,
+                "comments": [f"评论{i}" for i in range(10)]}
+    row = xhs_spider._detail_row(None, {"title": "标题"}, "https://example.com", captured=captured)
+    assert row["comments"] == ["评论0", "评论1", "评论2"]
@@ -1,5 +1,7 @@
 import re
 
+from utils.near_dup import NearDupIndex
+
 # 省份/地区列表
 PROVINCES = '北京|上海|天津|重庆|河北|山西|辽宁|吉林|黑龙江|江苏|浙江|安徽|福建|江西|山东|河南|湖北|湖南|广东|海南|四川|贵州|云南|陕西|甘肃|青海|台湾|内蒙古|广西|西藏|宁夏|新疆|香港|澳门|美国|英国|日本|韩国|澳大利亚|加拿大|新加坡|马来西亚|泰国|越南|印度|法国|德国|意大利|西班牙|俄罗斯|巴西'
 
@@ -38,22 +40,35 @@ def clean_text_content(text):
     return text.strip()
 
 
-def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=True):
+def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=True, near_dup=None):
     """
     清洗评论数据
     1. 去除过短的无效评论
     2. 去除官方账号评论
     3. 支持自定义过滤关键词
-    4. 支持基于URL/内容的去重
+    4. 支持基于URL/内容的去重，以及转载、轻微改动内容的近似重复去重
     5. 清理评论中的日期、地区等冗余信息
     
     :param data_list: 数据列表
     :param custom_keywords: 用户自定义的过滤关键词列表
     :param min_length: 最短评论长度，默认4
     :param deduplicate: 是否进行去重，默认True
+    :param near_dup: 条目级的 NearDupIndex，分批清洗时传入同一个索引可跨批次去重；默认每次新建
+    """
+    return list(iter_clean_comments(data_list, custom_keywords=custom_keywords,
+                                    min_length=min_length, deduplicate=deduplicate, near_dup=near_dup))
+
+
+def iter_clean_comments(data_iter, custom_keywords=None, min_length=4, deduplicate=True, near_dup=None):
+    """
+    清洗评论数据（流式版本）：逐条消费爬虫生成器的输出，清洗通过的数据立即 yield
+    参数同 clean_comments
     """
-    cleaned_data = []
     seen_keys = set()  # 用于去重
+    if deduplicate and near_dup is None:
+        near_dup = NearDupIndex()
+    item_suppressed = near_dup.suppressed if deduplicate else 0
+    comment_suppressed = 0
     
     # 官方关键词列表（默认）
     official_keywords = ['小助手', '官方', '客服', '团队', '从不胡说', '医生助理']
@@ -62,7 +77,7 @@ def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=Tr
     if custom_keywords:
         official_keywords = official_keywords + custom_keywords
     
-    for item in data_list:
+    for item in data_iter:
         # 去重检查
         if deduplicate:
             # 使用URL或内容作为去重键
@@ -83,8 +98,13 @@ def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=Tr
         if isinstance(raw_comments, str):
             raw_comments = [raw_comments]
         
-        # 评论去重
-        seen_comments = set()
+        # 条目近似重复（标题+正文）
+        if deduplicate and item.get('content') and not near_dup.add(
+                f"{item.get('title', '')} {clean_text_content(item['content'])}"):
+            continue
+        
+        # 评论去重（近似重复，同一条目内）
+        seen_comments = NearDupIndex()
         for c in raw_comments:
             if not c: continue
             
@@ -94,9 +114,9 @@ def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=Tr
                 continue
             
             # 评论去重（使用清理后的内容）
-            if c_cleaned in seen_comments:
+            if not seen_comments.add(c_cleaned):
+                comment_suppressed += 1
                 continue
-            seen_comments.add(c_cleaned)
             
             # 规则1: 长度过短视为无效（使用用户设置的最小长度）
             if len(c_cleaned) < min_length:
@@ -127,6 +147,7 @@ def clean_comments(data_list, custom_keywords=None, min_length=4, deduplicate=Tr
             # 清理title字段
             if new_item.get('title'):
                 new_item['title'] = clean_text_content(new_item['title'])
-            cleaned_data.append(new_item)
-            
-    return cleaned_data
\ No newline at end of file
+            yield new_item
+    
+    if deduplicate:
+        print(f"[CLEAN] 近似重复过滤: 条目 {near_dup.suppressed - item_suppressed} 条, 评论 {comment_suppressed} 条")
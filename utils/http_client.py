@@ -0,0 +1,190 @@
+# utils/http_client.py
+"""
+共享 HTTP 客户端（Gitee OAuth、COS 下载、代理API等对外请求统一使用）
+- 全进程共用一个连接池，同一主机的请求复用 keep-alive 连接
+- 默认连接/读取超时，单个挂起的外部请求不会一直占住 Flask worker
+- 幂等请求（GET/HEAD）遇到连接错误、超时、502/503/504 时按指数退避重试；POST 默认不重试
+- 安装了 httpx 和 h2 且 HTTP_CLIENT_HTTP2=1 时使用 HTTP/2，否则使用 requests
+- 按主机统计请求数、错误数、状态码分布和延迟
+
+知乎爬虫的 Session 带 Cookie 和代理，且有自己的速率控制，不使用这里的客户端
+"""
+import os
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+except ImportError:
+    httpx = None
+
+# ================= 配置区域 =================
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))     # 建立连接超时（秒）
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 20))          # 读取响应超时（秒）
+HTTP_POOL_SIZE = 20                 # 每个主机保持的连接数
+HTTP_MAX_RETRIES = 2                # 幂等请求失败后的重试次数
+HTTP_RETRY_BACKOFF = 0.5            # 重试退避基数（秒），第 n 次重试等待 backoff * 2^(n-1)
+HTTP_RETRY_STATUSES = (502, 503, 504)
+HTTP_RETRY_METHODS = ("GET", "HEAD", "OPTIONS")
+HTTP2_ENABLED = os.environ.get("HTTP_CLIENT_HTTP2", "0") == "1"
+# ===========================================
+
+
+class HostMetrics:
+    """单个主机的请求统计"""
+
+    def __init__(self, host):
+        self.host = host
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses = {}
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_error = None
+
+    def to_dict(self):
+        completed = self.requests - self.errors
+        return {
+            "host": self.host,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "avg_latency": round(self.total_latency / completed, 4) if completed else None,
+            "max_latency": round(self.max_latency, 4),
+            "last_error": self.last_error,
+        }
+
+
+class HttpClient:
+    """带连接池、默认超时、重试和按主机统计的 HTTP 客户端（线程安全）"""
+
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, backoff=HTTP_RETRY_BACKOFF,
+                 http2=HTTP2_ENABLED):
+        """
+        :param connect_timeout: 默认连接超时（秒）
+        :param read_timeout: 默认读取超时（秒）
+        :param pool_size: 每个主机的连接池大小
+        :param max_retries: 幂等请求的重试次数
+        :param backoff: 重试退避基数（秒）
+        :param http2: 是否使用 HTTP/2（需要 httpx 和 h2，未安装时忽略）
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.http2 = bool(http2 and httpx is not None)
+        if http2 and httpx is None:
+            print("[HTTP] 未安装 httpx/h2，使用 HTTP/1.1")
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_size * 4, max_keepalive_connections=pool_size),
+            )
+        else:
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._client.mount("http://", adapter)
+            self._client.mount("https://", adapter)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    # ---------------- 请求 ----------------
+
+    def request(self, method, url, timeout=None, retries=None, **kwargs):
+        """
+        发送请求，参数与 requests.request 相同
+        :param timeout: 秒数或 (连接超时, 读取超时)，默认使用客户端配置
+        :param retries: 重试次数，默认幂等请求为 max_retries，其他请求为 0
+        :return: 响应对象（requests.Response 或 httpx.Response，都有 status_code/content/text/json()）
+        :raises requests.RequestException: 重试后仍然失败（HTTP/2 模式下同样转换为 requests 的异常）
+        """
+        method = method.upper()
+        timeout = timeout or self.timeout
+        if retries is None:
+            retries = self.max_retries if method in HTTP_RETRY_METHODS else 0
+        host = urlsplit(url).netloc or "-"
+
+        for attempt in range(retries + 1):
+            if attempt:
+                self._record_retry(host)
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2))
+            started = time.monotonic()
+            try:
+                resp = self._send(method, url, timeout, **kwargs)
+            except requests.RequestException as e:
+                self._record(host, time.monotonic() - started, error=e)
+                if attempt >= retries:
+                    raise
+                print(f"[HTTP] {method} {host} 失败，重试 ({attempt + 1}/{retries}): {e}")
+                continue
+            self._record(host, time.monotonic() - started, status=resp.status_code)
+            if resp.status_code in HTTP_RETRY_STATUSES and attempt < retries:
+                print(f"[HTTP] {method} {host} 返回 {resp.status_code}，重试 ({attempt + 1}/{retries})")
+                continue
+            return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _send(self, method, url, timeout, **kwargs):
+        if not self.http2:
+            return self._client.request(method, url, timeout=timeout, **kwargs)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            return self._client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e))
+
+    # ---------------- 统计 ----------------
+
+    def _host(self, host):
+        metrics = self._metrics.get(host)
+        if metrics is None:
+            metrics = self._metrics[host] = HostMetrics(host)
+        return metrics
+
+    def _record(self, host, latency, status=None, error=None):
+        with self._lock:
+            metrics = self._host(host)
+            metrics.requests += 1
+            if error is not None:
+                metrics.errors += 1
+                metrics.last_error = f"{type(error).__name__}: {error}"[:200]
+                return
+            key = f"{status // 100}xx"
+            metrics.statuses[key] = metrics.statuses.get(key, 0) + 1
+            metrics.total_latency += latency
+            metrics.max_latency = max(metrics.max_latency, latency)
+
+    def _record_retry(self, host):
+        with self._lock:
+            self._host(host).retries += 1
+
+    def stats(self):
+        with self._lock:
+            hosts = [m.to_dict() for m in self._metrics.values()]
+        hosts.sort(key=lambda h: h["requests"], reverse=True)
+        return {
+            "http2": self.http2,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+            "hosts": hosts,
+        }
+
+
+# 全局实例：进程内共享连接池
+http_client = HttpClient()
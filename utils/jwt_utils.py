@@ -98,6 +98,30 @@ def token_required(f):
     return decorated
 
 
+def admin_required(f):
+    """
+    管理员校验装饰器（Flask-RESTX 接口），需放在 token_required 之后
+    管理员为配置 ADMIN_USER_IDS 中的用户；返回字典以便经过 marshal_with 输出
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not is_admin():
+            return {
+                'code': 403,
+                'message': '需要管理员权限',
+                'data': None
+            }, 403
+        return f(*args, **kwargs)
+    
+    return decorated
+
+
+def is_admin():
+    """当前登录用户是否为管理员"""
+    user_id = get_current_user_id()
+    return user_id is not None and str(user_id) in current_app.config.get('ADMIN_USER_IDS', ())
+
+
 def get_current_user_id():
     """获取当前登录用户 ID"""
     return getattr(g, 'current_user_id', None)
@@ -0,0 +1,203 @@
+# utils/near_dup.py
+"""
+近似重复检测（MinHash-LSH）
+- 文本规范化（小写、去掉标点空白）后按字切分为 3 字 shingle，适合没有空格分词的中文
+- 一次置换 MinHash（OPH，带旋转补全）：一次遍历得到 NUM_BINS 个值的签名
+- LSH：签名分成 BANDS 段，任一段完全相同的文本才作为候选，再用签名估计 Jaccard 相似度确认，
+  查找时间与已收录条数基本无关
+- 规范化后过短的文本只做精确去重
+shingle 哈希使用 crc32，签名在不同进程间一致，可以随游标保存和恢复
+"""
+import re
+import zlib
+import threading
+
+SHINGLE_SIZE = 3          # shingle 长度（字）
+NUM_BINS = 32             # 签名长度
+BANDS = 8                 # LSH 分段数，每段 NUM_BINS // BANDS 个值
+JACCARD_THRESHOLD = 0.7   # 估计相似度不低于该值视为近似重复
+MIN_CHARS = 8             # 规范化后短于该长度的文本只做精确去重
+
+_NORMALIZE_RE = re.compile(r"[\W_]+")
+_MASK32 = 0xFFFFFFFF
+_GOLDEN = 0x9E3779B1  # 乘法散列，打散 crc32 的线性结构
+_EMPTY = _MASK32
+
+
+def normalize(text):
+    """小写并去掉标点、空白和下划线"""
+    return _NORMALIZE_RE.sub("", str(text or "").lower())
+
+
+def minhash(text, shingle_size=SHINGLE_SIZE, num_bins=NUM_BINS):
+    """
+    计算文本的 MinHash 签名（元组）；规范化后短于 shingle_size 返回 None
+    num_bins 必须是 2 的幂
+    """
+    norm = normalize(text)
+    if len(norm) < shingle_size:
+        return None
+    bin_bits = num_bins.bit_length() - 1
+    value_bits = 32 - bin_bits
+    value_mask = (1 << value_bits) - 1
+    crc32 = zlib.crc32
+    mins = [_EMPTY] * num_bins
+    for shingle in {norm[i:i + shingle_size] for i in range(len(norm) - shingle_size + 1)}:
+        h = (crc32(shingle.encode("utf-8")) * _GOLDEN) & _MASK32
+        b = h >> value_bits
+        v = h & value_mask
+        if v < mins[b]:
+            mins[b] = v
+    # 空桶用右侧第一个非空桶的值补全（加上距离偏移），短文本的签名也能比较
+    if _EMPTY in mins:
+        for b in range(num_bins):
+            if mins[b] != _EMPTY:
+                continue
+            for dist in range(1, num_bins):
+                v = mins[(b + dist) % num_bins]
+                if v <= value_mask:  # 跳过已补全的桶
+                    mins[b] = v + (dist << value_bits)
+                    break
+    return tuple(mins)
+
+
+def similarity(sig_a, sig_b):
+    """用签名估计两段文本的 Jaccard 相似度"""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class NearDupIndex:
+    """近似重复索引（线程安全）"""
+
+    def __init__(self, threshold=JACCARD_THRESHOLD, shingle_size=SHINGLE_SIZE, num_bins=NUM_BINS,
+                 bands=BANDS, min_chars=MIN_CHARS, signatures=None, exact=None):
+        """
+        :param threshold: 估计相似度不低于该值视为近似重复
+        :param shingle_size: shingle 长度（字）
+        :param num_bins: 签名长度（2 的幂）
+        :param bands: LSH 分段数，需整除 num_bins
+        :param min_chars: 规范化后短于该长度的文本只做精确去重
+        :param signatures: 已有的签名列表（见 dump），用于恢复
+        :param exact: 已有的短文本列表（见 dump），用于恢复
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.min_chars = min_chars
+        self.added = 0
+        self.suppressed = 0
+        self._signatures = []
+        self._buckets = {}
+        self._exact = set()
+        self._lock = threading.Lock()
+        for sig in signatures or []:
+            self._insert(tuple(sig))
+        self._exact.update(exact or [])
+
+    def __len__(self):
+        return len(self._signatures) + len(self._exact)
+
+    def _band_keys(self, sig):
+        rows = self.rows
+        return [hash((band, sig[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def _find(self, sig, keys):
+        """返回第一个估计相似度达到阈值的已收录签名序号，没有返回 -1（调用方持有锁）"""
+        checked = set()
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            for idx in (bucket if isinstance(bucket, list) else (bucket,)):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                if similarity(sig, self._signatures[idx]) >= self.threshold:
+                    return idx
+        return -1
+
+    def _insert(self, sig, keys=None):
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        for key in keys or self._band_keys(sig):
+            bucket = self._buckets.get(key)
+            # 大部分桶只有一条，直接存序号以节省内存
+            if bucket is None:
+                self._buckets[key] = idx
+            elif isinstance(bucket, list):
+                bucket.append(idx)
+            else:
+                self._buckets[key] = [bucket, idx]
+
+    def add(self, text):
+        """
+        收录一段文本
+        :return: True 表示新文本；False 表示与已收录文本近似重复（计入 suppressed），空文本也返回 True 且不收录
+        """
+        norm = normalize(text)
+        if not norm:
+            return True
+        if len(norm) < self.min_chars:
+            with self._lock:
+                if norm in self._exact:
+                    self.suppressed += 1
+                    return False
+                self._exact.add(norm)
+                self.added += 1
+            return True
+        sig = minhash(norm, self.shingle_size, self.num_bins)
+        keys = self._band_keys(sig)
+        with self._lock:
+            if self._find(sig, keys) >= 0:
+                self.suppressed += 1
+                return False
+            self._insert(sig, keys)
+            self.added += 1
+        return True
+
+    def contains(self, text):
+        """是否与已收录文本近似重复（不收录、不计数）"""
+        norm = normalize(text)
+        if not norm:
+            return False
+        if len(norm) < self.min_chars:
+            return norm in self._exact
+        sig = minhash(norm, self.shingle_size, self.num_bins)
+        with self._lock:
+            return self._find(sig, self._band_keys(sig)) >= 0
+
+    def dump(self):
+        """导出签名和短文本，用于保存游标"""
+        with self._lock:
+            return {"signatures": [list(sig) for sig in self._signatures], "exact": list(self._exact)}
+
+    @classmethod
+    def load(cls, data, **kwargs):
+        """从 dump 的结果恢复；数据可能来自前端回传，格式不对时抛出 ValueError"""
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ValueError("近似重复索引格式错误")
+        signatures = data.get("signatures") or []
+        exact = data.get("exact") or []
+        if not isinstance(signatures, list) or not isinstance(exact, list):
+            raise ValueError("近似重复索引格式错误")
+        num_bins = kwargs.get("num_bins", NUM_BINS)
+        for sig in signatures:
+            if (not isinstance(sig, list) or len(sig) != num_bins
+                    or not all(type(v) is int and 0 <= v <= _MASK32 for v in sig)):
+                raise ValueError("近似重复索引签名格式错误")
+        if not all(isinstance(text, str) for text in exact):
+            raise ValueError("近似重复索引文本格式错误")
+        return cls(signatures=signatures, exact=exact, **kwargs)
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "added": self.added,
+            "suppressed": self.suppressed,
+            "buckets": len(self._buckets),
+        }
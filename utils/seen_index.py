@@ -0,0 +1,167 @@
+# utils/seen_index.py
+"""
+跨运行的已爬取条目索引（SQLite）
+按 (平台, 关键词, 条目ID) 记录已经产出过的条目，增量爬取/定时监控只输出上次运行之后的新条目
+- 平台+关键词、条目ID 都存 64 位哈希，每条记录固定几十字节，数据在磁盘上，内存占用与条目数无关
+- 超过 ttl 未再见到的记录会被清理，避免文件无限增长
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+SEEN_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "resource", "cache", "seen_items.sqlite3")
+SEEN_TTL_SECONDS = 90 * 24 * 3600   # 90天未再见到的条目视为新条目
+
+# 小红书笔记链接中的笔记ID（详情页、搜索结果页点开后的链接、发现页），爬虫查询和定时监控记录共用，保证键一致
+XHS_NOTE_ID_RE = re.compile(r"/(?:explore|search_result|discovery/item)/([0-9a-zA-Z]+)")
+
+
+def _hash64(text):
+    """稳定的 63 位哈希（SQLite INTEGER 为有符号 64 位）"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def xhs_note_id(url):
+    """小红书笔记URL -> 笔记ID，不是笔记链接时返回空字符串"""
+    match = XHS_NOTE_ID_RE.search(url or "")
+    return match.group(1) if match else ""
+
+
+def item_key(platform, item):
+    """
+    条目ID：小红书取笔记ID（URL 中的 xsec_token 等参数每次不同），其他平台取 URL
+    :param item: 统一格式的结果字典或ID字符串
+    """
+    if not isinstance(item, dict):
+        return str(item or "")
+    url = item.get("url", "") or ""
+    if platform == "xhs":
+        return xhs_note_id(url) or url
+    return url
+
+
+class SeenIndex:
+    """已爬取条目索引（线程安全，首次使用时才创建数据库文件）"""
+
+    def __init__(self, path=SEEN_INDEX_PATH, ttl=SEEN_TTL_SECONDS):
+        """
+        :param path: SQLite 文件路径
+        :param ttl: 记录有效期（秒），超过后该条目重新视为新条目
+        """
+        self.path = path
+        self.ttl = ttl
+        self.lookups = 0
+        self.hits = 0
+        self.marked = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "  scope INTEGER NOT NULL,"
+                "  item INTEGER NOT NULL,"
+                "  seen_at REAL NOT NULL,"
+                "  PRIMARY KEY (scope, item)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scopes ("
+                "  scope INTEGER PRIMARY KEY,"
+                "  platform TEXT NOT NULL,"
+                "  keyword TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_at ON seen (seen_at)")
+            self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _scope(platform, keyword):
+        return _hash64(f"{platform}\x00{keyword}")
+
+    def filter_new(self, platform, keyword, item_ids):
+        """
+        批量查询
+        :return: item_ids 中尚未记录（或已过期）的ID集合
+        """
+        item_ids = [i for i in dict.fromkeys(item_ids) if i]
+        if not item_ids:
+            return set()
+        scope = self._scope(platform, keyword)
+        hashed = {_hash64(i): i for i in item_ids}
+        deadline = time.time() - self.ttl
+        with self._lock:
+            db = self._db()
+            seen = set()
+            keys = list(hashed)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT item FROM seen WHERE scope = ? AND seen_at >= ? AND item IN ({','.join('?' * len(chunk))})",
+                    (scope, deadline, *chunk),
+                ).fetchall()
+                seen.update(row[0] for row in rows)
+            self.lookups += len(item_ids)
+            self.hits += len(seen)
+        return {item_id for h, item_id in hashed.items() if h not in seen}
+
+    def seen(self, platform, keyword, item_id):
+        """单条查询：是否已记录"""
+        return bool(item_id) and not self.filter_new(platform, keyword, [item_id])
+
+    def mark(self, platform, keyword, item_ids):
+        """记录（或刷新）一批条目"""
+        item_ids = [i for i in dict.fromkeys(item_ids) if i]
+        if not item_ids:
+            return
+        scope = self._scope(platform, keyword)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR IGNORE INTO scopes (scope, platform, keyword) VALUES (?, ?, ?)",
+                       (scope, platform, keyword))
+            db.executemany("INSERT OR REPLACE INTO seen (scope, item, seen_at) VALUES (?, ?, ?)",
+                           [(scope, _hash64(i), now) for i in item_ids])
+            db.commit()
+            self.marked += len(item_ids)
+
+    def clear(self, platform=None, keyword=None):
+        """清空某个平台+关键词（都不传则全部清空）的记录"""
+        with self._lock:
+            db = self._db()
+            if platform is None and keyword is None:
+                db.execute("DELETE FROM seen")
+                db.execute("DELETE FROM scopes")
+            else:
+                scope = self._scope(platform, keyword)
+                db.execute("DELETE FROM seen WHERE scope = ?", (scope,))
+                db.execute("DELETE FROM scopes WHERE scope = ?", (scope,))
+            db.commit()
+
+    def stats(self):
+        """各平台+关键词的记录数和查询命中统计"""
+        with self._lock:
+            db = self._db()
+            rows = db.execute(
+                "SELECT s.platform, s.keyword, COUNT(seen.item) FROM scopes s "
+                "LEFT JOIN seen ON seen.scope = s.scope GROUP BY s.scope"
+            ).fetchall()
+        return {
+            "scopes": [{"platform": p, "keyword": k, "items": n} for p, k, n in rows],
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "marked": self.marked,
+            "ttl": self.ttl,
+        }
+
+
+# 全局实例：爬虫和定时监控共用
+seen_index = SeenIndex()
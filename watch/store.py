@@ -17,6 +17,7 @@ def create_watch(data: Dict[str, Any], user_id: str = "demo_user") -> Dict[str,
         "keyword": data["keyword"].strip(),
         "platform": data.get("platform", "xhs").strip(),   # xhs / zhihu
         "max_count": int(data.get("max_count", 50)),       # 每次爬取最多多少条
+        "incremental": bool(data.get("incremental", True)),  # 只分析上次运行之后的新条目
 
         "interval_seconds": int(data.get("interval_minutes", 60)) * 60,
         "positive_threshold": data.get("positive_threshold"),  # int or None
@@ -2,6 +2,7 @@
 from typing import Dict, Any, List, Tuple
 from utils.cleaner import clean_comments
 from watch.ai_parse import normalize_ai_output
+from utils.seen_index import seen_index, item_key
 
 def notify_user(watch, subject, content, sms_params=None):
     """
@@ -47,19 +48,21 @@ def run_watch_once(watch: Dict[str, Any]) -> Dict[str, Any]:
     keyword = watch["keyword"]
     platform = watch["platform"]
     max_count = int(watch.get("max_count", 50))
+    # 增量：只处理上次运行之后出现的新条目；分析完成后才记为已见过，分析失败的条目下次会重试
+    incremental = bool(watch.get("incremental", True))
 
     # 1) 爬取（✅ 延迟导入，避免 import watch.task 时就拉起爬虫依赖）
     if platform == "xhs":
         crawler = globals().get("search_and_crawl_xhs")
         if crawler is None:
             from spiders.xhs_spider import search_and_crawl_xhs as crawler
-        raw = crawler(keyword, max_count=max_count)
+        raw = crawler(keyword, max_count=max_count, incremental=incremental, mark_seen=False)
 
     elif platform == "zhihu":
         crawler = globals().get("search_and_crawl_zhihu")
         if crawler is None:
             from spiders.zhihu_spider import search_and_crawl_zhihu as crawler
-        raw = crawler(keyword, max_count=max_count)
+        raw = crawler(keyword, max_count=max_count, incremental=incremental, mark_seen=False)
 
     else:
         return {"ok": False, "msg": f"未知平台: {platform}"}
@@ -69,7 +72,10 @@ def run_watch_once(watch: Dict[str, Any]) -> Dict[str, Any]:
     # 2) 清洗（你们 cleaner 已经做了去重、过滤等）:contentReference[oaicite:12]{index=12}
     cleaned = clean_comments(raw)
     if not cleaned:
-        return {"ok": True, "msg": "本次无可用数据", "triggered": False}
+        if incremental and raw:
+            # 新条目都被清洗掉了，同样记为已见过，下次不再重复爬取
+            seen_index.mark(platform, keyword, [item_key(platform, x) for x in raw])
+        return {"ok": True, "msg": "本次无新数据" if incremental else "本次无可用数据", "triggered": False}
 
     # 3) AI 批量分析（返回每批一个 result）:contentReference[oaicite:13]{index=13}
     ai_runner = globals().get("batch_analyze_csv_by_coze")
@@ -77,6 +83,8 @@ def run_watch_once(watch: Dict[str, Any]) -> Dict[str, Any]:
         from utils.ai_agent import batch_analyze_csv_by_coze as ai_runner
 
     batch_results = ai_runner(cleaned, batch_size=50, delay=2.0)
+    if incremental:
+        seen_index.mark(platform, keyword, [item_key(platform, x) for x in raw])
 
 
 
@@ -115,6 +123,7 @@ def run_watch_once(watch: Dict[str, Any]) -> Dict[str, Any]:
         "triggered": triggered,
         "keyword": keyword,
         "platform": platform,
+        "new_items": len(raw),
         "total": total,
         "valid": valid,
         "positive": pos,